@@ -1,12 +1,35 @@
-from flask import Flask, jsonify, request, Response
-from flask_mysqldb import MySQL
+from flask import Flask, jsonify, request, Response, stream_with_context, g, send_file
+from db_pool import MySQLPool, PoolExhausted
+from MySQLdb import IntegrityError
+from MySQLdb.cursors import SSDictCursor
 import jwt
-import dicttoxml
-from datetime import datetime, timedelta
+import xml_encoder
+from json_provider import FastJSONProvider
+import migrate
+from cache import LRUCache
+from metrics import Metrics, RequestTiming, TimedConnection
+import profiling
+import compression
+import exports
+import bulk_import
+import shifts
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
 from functools import wraps
+import base64
+import csv
+import click
+import io
+import os
+import uuid
+import re
+import hashlib
+import time
 
 
 app = Flask(__name__)
+# Encodes Decimal/datetime/timedelta row values directly (orjson when installed)
+app.json = FastJSONProvider(app)
 
 
 app.config['MYSQL_HOST'] = 'localhost'
@@ -15,15 +38,165 @@ app.config['MYSQL_PASSWORD'] = 'root'
 app.config['MYSQL_DB'] = 'maid_cafe'
 app.config['SECRET_KEY'] = 'maid-cafe-secret-key-12345'
 app.config['MYSQL_CURSORCLASS'] = 'DictCursor'  
+app.config['MYSQL_POOL_MIN_SIZE'] = 2
+app.config['MYSQL_POOL_MAX_SIZE'] = 10
+app.config['MYSQL_POOL_MAX_LIFETIME'] = 3600
+app.config['MYSQL_POOL_WAIT_TIMEOUT'] = 5.0
+app.config['MYSQL_POOL_PRE_PING_AFTER'] = 1.0
+# Read replicas for GET/HEAD requests: ['replica-1', 'replica-2:3307'] or dicts with
+# host/port/user/password; a replica that fails to connect is skipped for RETRY_AFTER seconds
+app.config['MYSQL_REPLICAS'] = []
+app.config['MYSQL_REPLICA_RETRY_AFTER'] = 30.0
+app.config['STREAM_BATCH_SIZE'] = 1000
+app.config['BATCH_MAX_ROWS'] = 1000
+app.config['INSERT_CHUNK_ROWS'] = 500
+app.config['CACHE_MAX_ENTRIES'] = 1024
+app.config['CACHE_TTL_SECONDS'] = 30
+app.config['JWT_CACHE_MAX_ENTRIES'] = 4096
+app.config['JWT_CACHE_MAX_TTL'] = 300
+# Needs migrations/0002_fulltext_search.sql and changes which rows match (see README);
+# False keeps the LIKE '%q%' scans
+app.config['SEARCH_FULLTEXT'] = False
+# Apply pending migrations/ files when started with `python app.py`
+app.config['MIGRATE_ON_STARTUP'] = False
+# Needs migrations/0001_table_version.sql; lets collection GETs answer 304 before querying
+app.config['ETAG_TABLE_VERSIONS'] = False
+# Needs migrations/0004_daily_sales.sql; order writes keep daily_sales current for /orders/daily-sales
+app.config['SALES_SUMMARY'] = False
+# Per-request query/serialization timing, Server-Timing headers and /metrics
+app.config['METRICS_ENABLED'] = True
+# Opt-in profiling: SQL log, query-count/DB-time/N+1 warnings, sampled cProfile dumps
+# (PROFILE_MAX_QUERIES, PROFILE_MAX_DB_SECONDS, PROFILE_SAMPLE_RATE, ... see profiling.py)
+app.config.update(profiling.DEFAULTS)
+# gzip/br/zstd bodies negotiated from Accept-Encoding
+# (COMPRESS_MIN_SIZE, COMPRESS_GZIP_LEVEL, ... see compression.py)
+app.config.update(compression.DEFAULTS)
+# Background CSV/Parquet exports (EXPORT_DIR, EXPORT_WORKERS, EXPORT_BATCH_SIZE; see exports.py)
+app.config.update(exports.DEFAULTS)
+# Bulk CSV import (IMPORT_CHUNK_ROWS, IMPORT_LOAD_DATA, IMPORT_MAX_BYTES, ... see bulk_import.py)
+app.config.update(bulk_import.DEFAULTS)
+# Max age of the in-process shift index behind /maids/on-shift (SHIFT_INDEX_TTL; see shifts.py)
+app.config.update(shifts.DEFAULTS)
 
-mysql = MySQL(app)
+# Pooled connections; mysql.connection is borrowed per app context.
+# Its cursors report query time to the current request's timing (if any).
+mysql = MySQLPool(app, wrap_connection=lambda connection: TimedConnection(connection, current_timing))
+
+# Per-route latency histograms and DB/serialization totals served by /metrics
+metrics = Metrics()
+
+# Read-through cache for single-resource GETs; any cache.CacheBackend can replace it.
+# Invalidation only reaches this process, so the TTL bounds staleness across workers.
+resource_cache = LRUCache(app.config['CACHE_MAX_ENTRIES'], app.config['CACHE_TTL_SECONDS'])
+
+# Verified JWT claims keyed by token, so repeat requests skip HMAC verification.
+# Entries never outlive the token's own exp.
+token_cache = LRUCache(app.config['JWT_CACHE_MAX_ENTRIES'], app.config['JWT_CACHE_MAX_TTL'])
+
+# Maid shifts as an interval index for /maids/on-shift; maid writes invalidate it
+shift_index = shifts.ShiftIndex(app.config['SHIFT_INDEX_TTL'])
 
 
 DEMO_USER = {'username': 'admin', 'password': 'password'}
 
+# ========== INSTRUMENTATION ==========
+def current_timing():
+    """The RequestTiming of the current request, or None when metrics are off"""
+    return g.get('request_timing')
+
+# SQL log and slow-request warnings go to the 'app.profile' logger
+profile_log = app.logger.getChild('profile')
+
+@app.before_request
+def start_timing():
+    if app.config['METRICS_ENABLED'] or app.config['PROFILE_ENABLED']:
+        g.request_timing = RequestTiming()
+    if app.config['PROFILE_ENABLED']:
+        profile_log.setLevel('INFO')
+        g.profiler = profiling.begin(app.config, g.request_timing)
+
+@app.after_request
+def finish_timing(response):
+    """
+    Add the Server-Timing header and record the request in metrics
+    Streamed bodies are still being generated here, so only their setup is counted
+    """
+    timing = g.pop('request_timing', None)
+    if timing is None:
+        return response
+    
+    total = time.perf_counter() - timing.started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if timing.statements is not None:
+        profiling.finish(app.config, profile_log, request.method, request.path,
+                         route, timing, total, g.pop('profiler', None))
+    if app.config['METRICS_ENABLED']:
+        response.headers['Server-Timing'] = timing.server_timing(total)
+        metrics.observe(request.method, route, response.status_code, total, timing)
+    return response
+
+@app.teardown_request
+def stop_profiler(exception):
+    """Disable a sampled profiler left running by a request that raised"""
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+
+def pool_gauges():
+    """Current connection pool figures exported with /metrics"""
+    stats = mysql.pool.stats()
+    return {
+        'db_pool_size': stats['size'],
+        'db_pool_in_use': stats['in_use'],
+        'db_pool_idle': stats['idle'],
+    }
+
+def pool_counters():
+    """Connection pool totals since startup exported with /metrics"""
+    stats = mysql.pool.stats()
+    return {
+        'db_pool_exhausted_total': stats['exhausted'],
+        'db_pool_wait_seconds_total': stats['wait_seconds_total'],
+        'db_replica_failovers_total': mysql.replicas.failovers if mysql.replicas else 0,
+    }
+
+metrics.add_gauges(pool_gauges)
+metrics.add_counters(pool_counters)
+
+# ========== RESPONSE COMPRESSION ==========
+@app.after_request
+def compress(response):
+    """Compress JSON/XML/NDJSON bodies for the client's Accept-Encoding"""
+    return compression.compress_response(response, request.accept_encodings, app.config)
+
 # ========== JWT AUTHENTICATION DECORATOR ==========
+def decode_token(token, secret):
+    """
+    Verify a token and return its claims, using token_cache for repeat tokens
+    Raises jwt.ExpiredSignatureError / jwt.InvalidTokenError like jwt.decode
+    """
+    cached = token_cache.get(token)
+    
+    # Entries remember the key they were verified with, so rotating it invalidates them
+    if cached is not None and cached[0] == secret:
+        claims = cached[1]
+        if 'exp' in claims and claims['exp'] <= time.time():
+            token_cache.delete(token)
+            raise jwt.ExpiredSignatureError('Signature has expired')
+        return claims
+    
+    claims = jwt.decode(token, secret, algorithms=["HS256"])
+    
+    ttl = token_cache.ttl
+    if 'exp' in claims:
+        ttl = min(ttl, claims['exp'] - time.time())
+    if ttl > 0:
+        token_cache.set(token, (secret, claims), ttl)
+    
+    return claims
+
 def token_required(f):
-    """Protect routes with JWT token"""
+    """Protect routes with JWT token; the decoded claims are stored on g.jwt_claims"""
     @wraps(f)
     def decorated(*args, **kwargs):
         
@@ -33,7 +206,7 @@ def token_required(f):
         
         try:
            
-            jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
+            g.jwt_claims = decode_token(token, app.config['SECRET_KEY'])
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'Token has expired!'}), 401
         except jwt.InvalidTokenError:
@@ -42,32 +215,374 @@ def token_required(f):
         return f(*args, **kwargs)
     return decorated
 
+# ========== WRITE HELPERS ==========
+# MySQL error codes for foreign key violations
+ER_ROW_IS_REFERENCED = 1451   # delete/update of a parent row that has children
+ER_NO_REFERENCED_ROW = 1452   # insert/update of a child row pointing at a missing parent
+
+def mysql_errno(error):
+    """Return the MySQL error code carried by a MySQLdb exception"""
+    return error.args[0] if error.args else None
+
+def update_assignments(data, columns):
+    """
+    Build the SET clause for a partial update from the provided JSON fields
+    Returns ("col = %s, ...", params); both empty when no known field was sent
+    """
+    fields = [column for column in columns if column in data]
+    return ", ".join(f"{column} = %s" for column in fields), [data[c] for c in fields]
+
+# ========== RESOURCE CACHE HELPERS ==========
+def cache_key(table, row_id):
+    """Cache key for one row, e.g. 'customer:42'"""
+    return f"{table}:{row_id}"
+
+def fetch_row(table, key, row_id):
+    """Read one row by primary key through resource_cache (misses are not cached)"""
+    cache_id = cache_key(table, row_id)
+    row = resource_cache.get(cache_id)
+    if row is None:
+        cur = mysql.connection.cursor()
+        cur.execute(f"SELECT * FROM {table} WHERE {key} = %s", (row_id,))
+        row = cur.fetchone()
+        cur.close()
+        if row:
+            resource_cache.set(cache_id, row)
+    return row
+
 # ========== XML/JSON RESPONSE FORMATTER ==========
-def format_response(data, status_code=200):
+def format_response(data, status_code=200, etag=None):
     """
     Return response in JSON or XML based on 'format' query parameter
     Example: /customers?format=xml  or  /customers?format=json
+    Successful GETs carry an ETag (a hash of the body unless one is passed in)
     """
     fmt = request.args.get('format', 'json').lower()
+    started = time.perf_counter()
     
     if fmt == 'xml':
         
-        xml = dicttoxml.dicttoxml(
-            data, 
-            custom_root='response', 
-            attr_type=False,  
-            root=True
-        )
-        return Response(
+        xml = xml_encoder.to_xml(data, root='response')
+        response = Response(
             xml, 
             status=status_code, 
             mimetype='application/xml',
             headers={'Content-Type': 'application/xml'}
         )
+    else:
+        response = jsonify(data)
+        response.status_code = status_code
+    
+    timing = current_timing()
+    if timing is not None:
+        timing.serialize_seconds += time.perf_counter() - started
+    
+    return make_conditional(response, etag)
+
+# ========== CONDITIONAL GET (ETAG) HELPERS ==========
+def make_conditional(response, etag=None):
+    """
+    Attach a strong ETag to a successful GET and turn it into a 304
+    when it matches If-None-Match
+    """
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+        return response
+    
+    if etag:
+        response.set_etag(etag)
+    elif response.is_streamed:
+        return response
+    else:
+        response.add_etag()
+    
+    return response.make_conditional(request)
+
+def table_versions_etag(*tables):
+    """
+    Build a collection ETag from the per-table version markers
+    (one primary-key lookup instead of the full query)
+    Returns None unless ETAG_TABLE_VERSIONS is enabled
+    """
+    if not app.config['ETAG_TABLE_VERSIONS']:
+        return None
+    
+    placeholders = ", ".join(["%s"] * len(tables))
+    cur = mysql.connection.cursor()
+    cur.execute(
+        f"SELECT table_name, version FROM table_version WHERE table_name IN ({placeholders})",
+        tables
+    )
+    versions = sorted((row['table_name'], row['version']) for row in cur.fetchall())
+    cur.close()
+    
+    return versions_etag(request.path, request.args, versions)
+
+def version_bump(tables):
+    """The statement and params that advance the version markers of tables"""
+    placeholders = ", ".join(["%s"] * len(tables))
+    return (f"UPDATE table_version SET version = version + 1 WHERE table_name IN ({placeholders})",
+            tables)
+
+def bump_versions(cur, *tables):
+    """
+    Advance the version markers of tables in the caller's transaction
+    Write paths call it once per statement, not per row; a no-op unless ETAG_TABLE_VERSIONS is enabled
+    """
+    if app.config['ETAG_TABLE_VERSIONS']:
+        cur.execute(*version_bump(tables))
+
+def versions_etag(path, args, versions):
+    """Hash a request path, its query arguments and the table versions into an ETag"""
+    # The token rotates independently of the data, so it is not part of the tag
+    args = sorted((k, v) for k, v in args.items(multi=True) if k != 'token')
+    return hashlib.sha1(repr((path, args, versions)).encode()).hexdigest()
+
+def not_modified(etag):
+    """
+    Return a 304 response when the client already has etag, otherwise None
+    It carries the 200's mimetype so compression gives it the same Vary/ETag headers
+    """
+    if etag and request.if_none_match.contains_weak(etag):
+        response = Response(status=304, mimetype=variant_mimetype(request.args))
+        response.set_etag(etag)
+        return response
+    return None
+
+def variant_mimetype(args):
+    """The mimetype of a successful GET for these query arguments"""
+    if args.get('format', '').lower() == 'xml':
+        return 'application/xml'
+    return 'application/x-ndjson' if wants_stream(args) else 'application/json'
+
+# ========== STREAMING RESPONSES ==========
+def wants_stream(args):
+    """True when the client asked for ?format=ndjson or ?stream=1"""
+    return args.get('format', '').lower() == 'ndjson' or args.get('stream') == '1'
+
+def iter_rows(cur, batch_size):
+    """Yield rows from a cursor batch_size at a time with fetchmany"""
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield row
+
+def stream_collection(name, query, params, etag=None):
+    """
+    Stream a list endpoint from a server-side cursor in constant memory
+    ?format=ndjson      -> one JSON object per line, then a {"count": N} line
+    ?stream=1           -> the usual {name: [...], "count": N} envelope, built incrementally
+    ?stream=1&format=xml -> the usual XML document, one <item> at a time
+    """
+    cur = mysql.connection.cursor(SSDictCursor)
+    cur.execute(query, params)
+    batch_size = app.config['STREAM_BATCH_SIZE']
+    fmt = request.args.get('format', 'json').lower()
+    ndjson = fmt == 'ndjson'
+    dumps = app.json.dumps
+    
+    if fmt == 'xml':
+        def generate_xml():
+            try:
+                yield from xml_encoder.iter_xml_collection(name, iter_rows(cur, batch_size))
+            finally:
+                cur.close()
+        
+        response = Response(stream_with_context(generate_xml()), mimetype='application/xml')
+        return make_conditional(response, etag)
+    
+    def generate():
+        count = 0
+        try:
+            if not ndjson:
+                yield '{"%s": [' % name
+            for row in iter_rows(cur, batch_size):
+                if ndjson:
+                    yield dumps(row) + '\n'
+                else:
+                    yield (',' if count else '') + dumps(row)
+                count += 1
+            if ndjson:
+                yield dumps({'count': count}) + '\n'
+            else:
+                yield '], "count": %d}' % count
+        finally:
+            cur.close()
+    
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return make_conditional(Response(stream_with_context(generate()), mimetype=mimetype), etag)
+
+# ========== SEARCH HELPERS ==========
+# innodb ngram_token_size (MySQL default); shorter words are matched as prefixes
+NGRAM_TOKEN_SIZE = 2
+BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]')
+
+def fulltext_query(term):
+    """
+    Turn user input into a FULLTEXT BOOLEAN MODE query where every word must match
+    With the ngram parser a quoted word matches anywhere in the column, like LIKE '%word%'
+    """
+    terms = []
+    for word in term.split():
+        if len(word) >= NGRAM_TOKEN_SIZE:
+            word = word.replace('"', '')
+            if word:
+                terms.append(f'+"{word}"')
+        else:
+            word = BOOLEAN_OPERATORS.sub('', word)
+            if word:
+                terms.append(f'+{word}*')
+    return ' '.join(terms)
+
+def search_filter(columns, term, fulltext=True):
+    """
+    Build the condition for a ?q= search over columns
+    Returns (condition, params, rank); rank is the relevance expression
+    to ORDER BY (taking the same params) or None for LIKE search
+    """
+    boolean = fulltext_query(term) if fulltext else ''
+    
+    if not boolean:
+        condition = " OR ".join(f"{column} LIKE %s" for column in columns)
+        if len(columns) > 1:
+            condition = f"({condition})"
+        return condition, [f"%{term}%"] * len(columns), None
+    
+    match = f"MATCH({', '.join(columns)}) AGAINST (%s IN BOOLEAN MODE)"
+    return match, [boolean], match
+
+# ========== KEYSET PAGINATION HELPERS ==========
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(last_id):
+    """Turn the last primary key of a page into an opaque cursor string"""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Turn a cursor from encode_cursor back into a primary key (ValueError if bad)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def parse_pagination(args):
+    """
+    Read the opt-in 'limit' and 'after' query parameters
+    Returns (limit, after_id); limit is None when pagination was not requested
+    Raises ValueError with a client-facing message on bad input
+    """
+    limit = args.get('limit')
+    after = args.get('after')
+    
+    if limit is None:
+        if after is not None:
+            raise ValueError("'after' requires 'limit'")
+        return None, None
+    
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError("'limit' must be an integer")
+    
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}")
+    
+    return limit, (decode_cursor(after) if after else None)
+
+def apply_keyset(query, params, key, page):
+    """
+    Append the keyset condition, ordering and LIMIT for a page to a query
+    One extra row is requested so we know whether a next page exists
+    """
+    limit, after_id = page
+    if limit is None:
+        return query
     
+    if after_id is not None:
+        query += (" AND " if " WHERE " in query else " WHERE ") + f"{key} > %s"
+        params.append(after_id)
     
-    return jsonify(data), status_code
+    query += f" ORDER BY {key} LIMIT %s"
+    params.append(limit + 1)
+    return query
+
+def page_envelope(name, rows, key, page):
+    """Build the {name: rows, count, next_cursor} envelope for a list endpoint"""
+    limit = page[0]
+    if limit is None:
+        return {name: rows, 'count': len(rows)}
+    
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][key])
+    
+    return {name: rows, 'count': len(rows), 'next_cursor': next_cursor}
+
+
+# ========== SPARSE FIELDSETS ==========
+# Columns each resource can be narrowed to with ?fields=; the primary key comes first
+TABLE_COLUMNS = {
+    'customer': ('customer_id', 'name', 'email', 'phone_number'),
+    'maid': ('maid_id', 'name', 'shift_start_time', 'shift_end_time'),
+    'orders': ('order_id', 'customer_id', 'maid_id', 'order_date', 'total_amount'),
+}
+
+def parse_fields(args, table):
+    """
+    Read ?fields=a,b for table; the primary key is always included (cursors need it)
+    Returns the columns in table order, or None when every column was asked for
+    Raises ValueError with a client-facing message on unknown fields
+    """
+    fields = args.get('fields')
+    if fields is None:
+        return None
+    
+    allowed = TABLE_COLUMNS[table]
+    requested = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. "
+                         f"Allowed: {', '.join(allowed)}")
+    
+    return [c for c in allowed if c == allowed[0] or c in requested]
+
+def select_list(columns):
+    """SQL select list for parse_fields' result"""
+    return ", ".join(columns) if columns else "*"
 
+def project(row, columns):
+    """Narrow a full row (e.g. from resource_cache) to the requested columns"""
+    if not columns:
+        return row
+    return {column: row[column] for column in columns if column in row}
+
+def collection_query(table, key, search_columns, search_term, page, fulltext=True, columns=None):
+    """
+    Build the list query for a table with an optional ?q= search, keyset page
+    and ?fields= projection
+    Returns (query, params)
+    """
+    query = f"SELECT {select_list(columns)} FROM {table}"
+    params = []
+    
+    rank = None
+    if search_term:
+        condition, search_params, rank = search_filter(search_columns, search_term, fulltext)
+        query += " WHERE " + condition
+        params.extend(search_params)
+    
+    query = apply_keyset(query, params, key, page)
+    
+    # Keyset pages keep primary-key order; unpaged searches are ranked by relevance
+    if rank and page[0] is None:
+        query += f" ORDER BY {rank} DESC"
+        params.extend(search_params)
+    
+    return query, params
 # ========== AUTHENTICATION ENDPOINTS ==========
 @app.route('/login', methods=['POST'])
 def login():
@@ -103,7 +618,7 @@ def login():
 @token_required
 def auth_test():
     """Test endpoint to verify JWT is working"""
-    return jsonify({'message': 'JWT authentication successful!'})
+    return jsonify({'message': 'JWT authentication successful!', 'user': g.jwt_claims.get('user')})
 
 # ========== CUSTOMER CRUD ENDPOINTS ==========
 @app.route('/customers', methods=['GET'])
@@ -114,44 +629,55 @@ def get_customers():
     GET /customers?token=YOUR_TOKEN
     GET /customers?token=YOUR_TOKEN&q=search_term
     GET /customers?token=YOUR_TOKEN&format=xml
+    GET /customers?token=YOUR_TOKEN&limit=50&after=CURSOR
+    GET /customers?token=YOUR_TOKEN&format=ndjson  (or &stream=1)
     """
-    cur = mysql.connection.cursor()
+    try:
+        page = parse_pagination(request.args)
+        fields = parse_fields(request.args, 'customer')
+    except ValueError as e:
+        return format_response({'error': str(e)}, 400)
     
-   
-    search_term = request.args.get('q')
+    etag = table_versions_etag('customer')
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
     
-    if search_term:
-        
-        cur.execute("""
-            SELECT * FROM customer 
-            WHERE name LIKE %s 
-            OR email LIKE %s 
-            OR phone_number LIKE %s
-        """, (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
-    else:
-        cur.execute("SELECT * FROM customer")
+    query, params = collection_query(
+        'customer', 'customer_id', ('name', 'email', 'phone_number'),
+        request.args.get('q'), page, app.config['SEARCH_FULLTEXT'], fields
+    )
+    
+    # Pages are already bounded, so only unpaged lists are streamed
+    if page[0] is None and wants_stream(request.args):
+        return stream_collection('customers', query, tuple(params), etag=etag)
+    
+    cur = mysql.connection.cursor()
+    cur.execute(query, tuple(params))
     
     customers = cur.fetchall()
     cur.close()
     
-    return format_response({
-        'customers': customers,
-        'count': len(customers)
-    })
+    return format_response(
+        page_envelope('customers', customers, 'customer_id', page), etag=etag
+    )
 
 @app.route('/customers/<int:customer_id>', methods=['GET'])
 @token_required
 def get_customer(customer_id):
     """Get a specific customer by ID"""
-    cur = mysql.connection.cursor()
-    cur.execute("SELECT * FROM customer WHERE customer_id = %s", (customer_id,))
-    customer = cur.fetchone()
-    cur.close()
+    try:
+        fields = parse_fields(request.args, 'customer')
+    except ValueError as e:
+        return format_response({'error': str(e)}, 400)
+    
+    # Full rows are cached, so single GETs project after the lookup
+    customer = fetch_row('customer', 'customer_id', customer_id)
     
     if not customer:
         return format_response({'error': 'Customer not found'}, 404)
     
-    return format_response(customer)
+    return format_response(project(customer, fields))
 
 @app.route('/customers', methods=['POST'])
 @token_required
@@ -177,8 +703,9 @@ def create_customer():
             "INSERT INTO customer (name, email, phone_number) VALUES (%s, %s, %s)",
             (name, email, phone)
         )
-        mysql.connection.commit()
         new_id = cur.lastrowid
+        bump_versions(cur, 'customer')
+        mysql.connection.commit()
         cur.close()
         
         # Return the created customer
@@ -192,42 +719,45 @@ def create_customer():
 @app.route('/customers/<int:customer_id>', methods=['PUT'])
 @token_required
 def update_customer(customer_id):
-    """Update an existing customer"""
+    """
+    Update an existing customer
+    Only the fields sent are written; existence is only checked when nothing changed
+    """
     data = request.get_json()
     
     if not data:
         return format_response({'error': 'No data provided'}, 400)
     
-    cur = mysql.connection.cursor()
-    
-    # Check if customer exists
-    cur.execute("SELECT * FROM customer WHERE customer_id = %s", (customer_id,))
-    existing = cur.fetchone()
-    
-    if not existing:
-        cur.close()
-        return format_response({'error': 'Customer not found'}, 404)
-    
-    # Get new values or keep existing ones
-    name = data.get('name', existing['name'])
-    email = data.get('email', existing['email'])
-    phone = data.get('phone_number', existing['phone_number'])
+    assignments, params = update_assignments(data, ('name', 'email', 'phone_number'))
     
+    cur = mysql.connection.cursor()
     try:
-        cur.execute(
-            """UPDATE customer 
-               SET name = %s, email = %s, phone_number = %s 
-               WHERE customer_id = %s""",
-            (name, email, phone, customer_id)
-        )
-        mysql.connection.commit()
-        rows_affected = cur.rowcount
+        rows_affected = 0
+        if assignments:
+            cur.execute(
+                f"UPDATE customer SET {assignments} WHERE customer_id = %s",
+                (*params, customer_id)
+            )
+            rows_affected = cur.rowcount
+            if rows_affected:
+                bump_versions(cur, 'customer')
+            mysql.connection.commit()
+        
+        cur.execute("SELECT * FROM customer WHERE customer_id = %s", (customer_id,))
+        customer = cur.fetchone()
         cur.close()
         
+        if not customer:
+            resource_cache.delete(cache_key('customer', customer_id))
+            return format_response({'error': 'Customer not found'}, 404)
+        
+        # Write-through: the row we just read is the freshest copy
+        resource_cache.set(cache_key('customer', customer_id), customer)
+        
         if rows_affected == 0:
             return format_response({'error': 'No changes made'}, 400)
         
-        return get_customer(customer_id)
+        return format_response(customer)
         
     except Exception as e:
         mysql.connection.rollback()
@@ -237,33 +767,20 @@ def update_customer(customer_id):
 @app.route('/customers/<int:customer_id>', methods=['DELETE'])
 @token_required
 def delete_customer(customer_id):
-    """Delete a customer"""
+    """
+    Delete a customer
+    The orders foreign key rejects the delete (errno 1451) when the customer has orders
+    """
     cur = mysql.connection.cursor()
     
-    # Check if customer exists
-    cur.execute("SELECT * FROM customer WHERE customer_id = %s", (customer_id,))
-    existing = cur.fetchone()
-    
-    if not existing:
-        cur.close()
-        return format_response({'error': 'Customer not found'}, 404)
-    
-    # Check if customer has orders (foreign key constraint)
-    cur.execute("SELECT COUNT(*) as order_count FROM orders WHERE customer_id = %s", (customer_id,))
-    result = cur.fetchone()
-    
-    if result['order_count'] > 0:
-        cur.close()
-        return format_response(
-            {'error': 'Cannot delete customer with existing orders. Delete orders first.'}, 
-            400
-        )
-    
     try:
         cur.execute("DELETE FROM customer WHERE customer_id = %s", (customer_id,))
-        mysql.connection.commit()
         rows_affected = cur.rowcount
+        if rows_affected:
+            bump_versions(cur, 'customer')
+        mysql.connection.commit()
         cur.close()
+        resource_cache.delete(cache_key('customer', customer_id))
         
         if rows_affected == 0:
             return format_response({'error': 'Customer not found'}, 404)
@@ -272,6 +789,16 @@ def delete_customer(customer_id):
             'message': 'Customer deleted successfully',
             'customer_id': customer_id
         })
+    
+    except IntegrityError as e:
+        mysql.connection.rollback()
+        cur.close()
+        if mysql_errno(e) == ER_ROW_IS_REFERENCED:
+            return format_response(
+                {'error': 'Cannot delete customer with existing orders. Delete orders first.'}, 
+                400
+            )
+        return format_response({'error': f'Database error: {str(e)}'}, 500)
         
     except Exception as e:
         mysql.connection.rollback()
@@ -282,48 +809,55 @@ def delete_customer(customer_id):
 @app.route('/maids', methods=['GET'])
 @token_required
 def get_maids():
-    """Get all maids with optional search"""
-    cur = mysql.connection.cursor()
+    """
+    Get all maids with optional search
+    Supports keyset pagination with limit and after
+    Supports streaming with format=ndjson or stream=1
+    """
+    try:
+        page = parse_pagination(request.args)
+        fields = parse_fields(request.args, 'maid')
+    except ValueError as e:
+        return format_response({'error': str(e)}, 400)
     
-    search_term = request.args.get('q')
+    etag = table_versions_etag('maid')
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
     
-    if search_term:
-        cur.execute("SELECT * FROM maid WHERE name LIKE %s", (f"%{search_term}%",))
-    else:
-        cur.execute("SELECT * FROM maid")
+    query, params = collection_query(
+        'maid', 'maid_id', ('name',),
+        request.args.get('q'), page, app.config['SEARCH_FULLTEXT'], fields
+    )
+    
+    if page[0] is None and wants_stream(request.args):
+        return stream_collection('maids', query, tuple(params), etag=etag)
+    
+    cur = mysql.connection.cursor()
+    cur.execute(query, tuple(params))
     
     maids = cur.fetchall()
     cur.close()
     
-    # Convert timedelta to string
-    formatted_maids = []
-    for maid in maids:
-        maid_dict = dict(maid)
-        # Convert time fields to string
-        if maid_dict.get('shift_start_time'):
-            maid_dict['shift_start_time'] = str(maid_dict['shift_start_time'])
-        if maid_dict.get('shift_end_time'):
-            maid_dict['shift_end_time'] = str(maid_dict['shift_end_time'])
-        formatted_maids.append(maid_dict)
-    
-    return format_response({
-        'maids': formatted_maids,
-        'count': len(formatted_maids)
-    })
+    return format_response(
+        page_envelope('maids', maids, 'maid_id', page), etag=etag
+    )
 
 @app.route('/maids/<int:maid_id>', methods=['GET'])
 @token_required
 def get_maid(maid_id):
     """Get a specific maid by ID"""
-    cur = mysql.connection.cursor()
-    cur.execute("SELECT * FROM maid WHERE maid_id = %s", (maid_id,))
-    maid = cur.fetchone()
-    cur.close()
+    try:
+        fields = parse_fields(request.args, 'maid')
+    except ValueError as e:
+        return format_response({'error': str(e)}, 400)
+    
+    maid = fetch_row('maid', 'maid_id', maid_id)
     
     if not maid:
         return format_response({'error': 'Maid not found'}, 404)
     
-    return format_response(maid)
+    return format_response(project(maid, fields))
 
 @app.route('/maids', methods=['POST'])
 @token_required
@@ -348,9 +882,11 @@ def create_maid():
                VALUES (%s, %s, %s)""",
             (name, start_time, end_time)
         )
-        mysql.connection.commit()
         new_id = cur.lastrowid
+        bump_versions(cur, 'maid')
+        mysql.connection.commit()
         cur.close()
+        shift_index.invalidate()
         
         return get_maid(new_id)
         
@@ -362,38 +898,40 @@ def create_maid():
 @app.route('/maids/<int:maid_id>', methods=['PUT'])
 @token_required
 def update_maid(maid_id):
-    """Update an existing maid"""
+    """Update an existing maid (only the fields sent are written)"""
     data = request.get_json()
     
     if not data:
         return format_response({'error': 'No data provided'}, 400)
     
-    cur = mysql.connection.cursor()
-    
-    # Check if maid exists
-    cur.execute("SELECT * FROM maid WHERE maid_id = %s", (maid_id,))
-    existing = cur.fetchone()
-    
-    if not existing:
-        cur.close()
-        return format_response({'error': 'Maid not found'}, 404)
-    
-    # Get new values
-    name = data.get('name', existing['name'])
-    start_time = data.get('shift_start_time', existing['shift_start_time'])
-    end_time = data.get('shift_end_time', existing['shift_end_time'])
+    assignments, params = update_assignments(
+        data, ('name', 'shift_start_time', 'shift_end_time')
+    )
     
+    cur = mysql.connection.cursor()
     try:
-        cur.execute(
-            """UPDATE maid 
-               SET name = %s, shift_start_time = %s, shift_end_time = %s 
-               WHERE maid_id = %s""",
-            (name, start_time, end_time, maid_id)
-        )
-        mysql.connection.commit()
+        if assignments:
+            cur.execute(
+                f"UPDATE maid SET {assignments} WHERE maid_id = %s",
+                (*params, maid_id)
+            )
+            if cur.rowcount:
+                bump_versions(cur, 'maid')
+            mysql.connection.commit()
+            shift_index.invalidate()
+        
+        cur.execute("SELECT * FROM maid WHERE maid_id = %s", (maid_id,))
+        maid = cur.fetchone()
         cur.close()
         
-        return get_maid(maid_id)
+        if not maid:
+            resource_cache.delete(cache_key('maid', maid_id))
+            return format_response({'error': 'Maid not found'}, 404)
+        
+        # Write-through: the row we just read is the freshest copy
+        resource_cache.set(cache_key('maid', maid_id), maid)
+        
+        return format_response(maid)
         
     except Exception as e:
         mysql.connection.rollback()
@@ -403,111 +941,351 @@ def update_maid(maid_id):
 @app.route('/maids/<int:maid_id>', methods=['DELETE'])
 @token_required
 def delete_maid(maid_id):
-    """Delete a maid"""
+    """
+    Delete a maid
+    The orders foreign key rejects the delete (errno 1451) when the maid has orders
+    """
     cur = mysql.connection.cursor()
     
-    # Check if maid exists
-    cur.execute("SELECT * FROM maid WHERE maid_id = %s", (maid_id,))
-    existing = cur.fetchone()
-    
-    if not existing:
-        cur.close()
-        return format_response({'error': 'Maid not found'}, 404)
-    
-    # Check if maid has orders
-    cur.execute("SELECT COUNT(*) as order_count FROM orders WHERE maid_id = %s", (maid_id,))
-    result = cur.fetchone()
-    
-    if result['order_count'] > 0:
-        cur.close()
-        return format_response(
-            {'error': 'Cannot delete maid with existing orders. Delete orders first.'}, 
-            400
-        )
-    
     try:
         cur.execute("DELETE FROM maid WHERE maid_id = %s", (maid_id,))
+        rows_affected = cur.rowcount
+        if rows_affected:
+            bump_versions(cur, 'maid')
         mysql.connection.commit()
         cur.close()
+        resource_cache.delete(cache_key('maid', maid_id))
+        shift_index.invalidate()
+        
+        if rows_affected == 0:
+            return format_response({'error': 'Maid not found'}, 404)
         
         return format_response({
             'message': 'Maid deleted successfully',
             'maid_id': maid_id
         })
+    
+    except IntegrityError as e:
+        mysql.connection.rollback()
+        cur.close()
+        if mysql_errno(e) == ER_ROW_IS_REFERENCED:
+            return format_response(
+                {'error': 'Cannot delete maid with existing orders. Delete orders first.'}, 
+                400
+            )
+        return format_response({'error': f'Database error: {str(e)}'}, 500)
         
     except Exception as e:
         mysql.connection.rollback()
         cur.close()
         return format_response({'error': f'Database error: {str(e)}'}, 500)
 
-# ========== ORDER CRUD ENDPOINTS ==========
-@app.route('/orders', methods=['GET'])
+# ========== ON-SHIFT LOOKUPS ==========
+def parse_time_of_day(args, name):
+    """Read an optional HH:MM:SS query parameter as seconds after midnight"""
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return shifts.seconds_of_day(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a HH:MM:SS time')
+
+def parse_shift_window(args):
+    """
+    Read ?at= or ?from=&to= for /maids/on-shift as (start, end) seconds after midnight
+    start == end is an instant; no parameters means now (server local time)
+    """
+    at = parse_time_of_day(args, 'at')
+    start, end = parse_time_of_day(args, 'from'), parse_time_of_day(args, 'to')
+    if at is not None and (start is not None or end is not None):
+        raise ValueError('Use either at or from/to, not both')
+    if (start is None) != (end is None):
+        raise ValueError('from and to must be given together')
+    if start is not None:
+        return start, end
+    if at is None:
+        at = shifts.seconds_of_day(datetime.now().time())
+    return at, at
+
+def shift_window(start, end):
+    """The query window echoed back by /maids/on-shift"""
+    if start == end:
+        return {'at': shifts.format_seconds(start)}
+    return {'from': shifts.format_seconds(start), 'to': shifts.format_seconds(end)}
+
+def load_shift_index():
+    """shift_index, reloaded from the maid table first when stale"""
+    if shift_index.stale():
+        generation = shift_index.generation
+        cur = mysql.connection.cursor()
+        cur.execute("SELECT maid_id, name, shift_start_time, shift_end_time FROM maid")
+        shift_index.load(cur.fetchall(), generation)
+        cur.close()
+    return shift_index
+
+@app.route('/maids/on-shift', methods=['GET'])
 @token_required
-def get_orders():
+def maids_on_shift():
     """
-    Get all orders with advanced filtering
-    Supports: customer_id, maid_id, start_date, end_date, min_amount, max_amount
+    Maids working at a time of day, or at any point of a range
+    GET /maids/on-shift?token=YOUR_TOKEN&at=14:30:00
+    GET /maids/on-shift?token=YOUR_TOKEN&from=22:00:00&to=02:00:00  (ranges may wrap past midnight)
+    Shifts ending before they start run past midnight; no time means now
     """
-    cur = mysql.connection.cursor()
+    try:
+        start, end = parse_shift_window(request.args)
+    except ValueError as e:
+        return format_response({'error': str(e)}, 400)
     
-    # Get filter parameters
-    customer_id = request.args.get('customer_id')
-    maid_id = request.args.get('maid_id')
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    min_amount = request.args.get('min_amount')
-    max_amount = request.args.get('max_amount')
+    maids = load_shift_index().overlapping(start, end)
     
-    # Build dynamic query
-    query = "SELECT * FROM orders WHERE 1=1"
+    return format_response({**shift_window(start, end), 'maids': maids, 'count': len(maids)})
+
+# ========== ORDER CRUD ENDPOINTS ==========
+def order_filters(args):
+    """
+    Build the WHERE clause for the order filter query parameters
+    Shared by get_orders and order_stats
+    Returns (" WHERE 1=1 AND ...", params)
+    """
+    # Get filter parameters
+    customer_id = args.get('customer_id')
+    maid_id = args.get('maid_id')
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
+    min_amount = args.get('min_amount')
+    max_amount = args.get('max_amount')
+    
+    where = " WHERE 1=1"
     params = []
     
     if customer_id:
-        query += " AND customer_id = %s"
+        where += " AND customer_id = %s"
         params.append(customer_id)
     
     if maid_id:
-        query += " AND maid_id = %s"
+        where += " AND maid_id = %s"
         params.append(maid_id)
     
     if start_date:
-        query += " AND order_date >= %s"
+        where += " AND order_date >= %s"
         params.append(start_date)
     
     if end_date:
-        query += " AND order_date <= %s"
+        where += " AND order_date <= %s"
         params.append(end_date)
     
     if min_amount:
-        query += " AND total_amount >= %s"
+        where += " AND total_amount >= %s"
         params.append(float(min_amount))
     
     if max_amount:
-        query += " AND total_amount <= %s"
+        where += " AND total_amount <= %s"
         params.append(float(max_amount))
     
+    return where, params
+
+# Relations ?include= can embed in an order: name -> (table, foreign key)
+ORDER_INCLUDES = {
+    'customer': ('customer', 'customer_id'),
+    'maid': ('maid', 'maid_id'),
+}
+
+def parse_include(args):
+    """
+    Read ?include=customer,maid for the order endpoints
+    Returns the relation names in ORDER_INCLUDES order (empty when not given)
+    Raises ValueError with a client-facing message on unknown names
+    """
+    requested = [name.strip() for name in args.get('include', '').split(',') if name.strip()]
+    unknown = [name for name in requested if name not in ORDER_INCLUDES]
+    if unknown:
+        raise ValueError(f"Unknown include(s): {', '.join(unknown)}. "
+                         f"Allowed: {', '.join(ORDER_INCLUDES)}")
+    
+    return [name for name in ORDER_INCLUDES if name in requested]
+
+def include_fields(fields, include):
+    """Add the foreign keys the included relations join on to a ?fields= projection"""
+    if not fields or not include:
+        return fields
+    keys = {ORDER_INCLUDES[name][1] for name in include}
+    return [c for c in TABLE_COLUMNS['orders'] if c in fields or c in keys]
+
+def related_query(name, orders):
+    """The single IN (...) query for the rows one relation of orders points at"""
+    table, key = ORDER_INCLUDES[name]
+    return ids_query(table, key, [order[key] for order in orders if order[key] is not None], '*')
+
+def attach_related(orders, name, rows):
+    """Copy orders with the matching related row (or None) stored under name"""
+    key = ORDER_INCLUDES[name][1]
+    by_id = {row[key]: row for row in rows}
+    return [dict(order, **{name: by_id.get(order[key])}) for order in orders]
+
+def embed_includes(orders, include):
+    """Attach each included relation to orders with one batched lookup per relation"""
+    for name in include:
+        rows = ()
+        lookup = related_query(name, orders)
+        if lookup:
+            cur = mysql.connection.cursor()
+            cur.execute(*lookup)
+            rows = cur.fetchall()
+            cur.close()
+        orders = attach_related(orders, name, rows)
+    return orders
+
+@app.route('/orders', methods=['GET'])
+@token_required
+def get_orders():
+    """
+    Get all orders with advanced filtering
+    Supports: customer_id, maid_id, start_date, end_date, min_amount, max_amount
+    Supports keyset pagination with limit and after
+    Supports streaming with format=ndjson or stream=1
+    Supports include=customer,maid to embed the related rows
+    """
+    try:
+        page = parse_pagination(request.args)
+        include = parse_include(request.args)
+        fields = include_fields(parse_fields(request.args, 'orders'), include)
+    except ValueError as e:
+        return format_response({'error': str(e)}, 400)
+    
+    streaming = page[0] is None and wants_stream(request.args)
+    if streaming and include:
+        return format_response(
+            {'error': 'include cannot be combined with streaming; page with limit/after instead'}, 400
+        )
+    
+    etag = table_versions_etag('orders', *(ORDER_INCLUDES[name][0] for name in include))
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
+    # Build dynamic query
+    where, params = order_filters(request.args)
+    query = f"SELECT {select_list(fields)} FROM orders" + where
+    
+    query = apply_keyset(query, params, 'order_id', page)
+    
+    if streaming:
+        return stream_collection('orders', query, tuple(params), etag=etag)
+    
     # Execute query
+    cur = mysql.connection.cursor()
     cur.execute(query, tuple(params) if params else ())
     orders = cur.fetchall()
     cur.close()
     
-    return format_response({
-        'orders': orders,
-        'count': len(orders)
-    })
+    envelope = page_envelope('orders', orders, 'order_id', page)
+    if include:
+        envelope['orders'] = embed_includes(envelope['orders'], include)
+    
+    return format_response(envelope, etag=etag)
 
-@app.route('/orders/<int:order_id>', methods=['GET'])
+# Group-by keys accepted by /orders/stats and the SQL expression for each
+STATS_GROUPS = {
+    'customer_id': 'customer_id',
+    'maid_id': 'maid_id',
+    'day': 'DATE(order_date)',
+    # Monday of the order's week
+    'week': 'DATE_SUB(DATE(order_date), INTERVAL WEEKDAY(order_date) DAY)',
+    # First day of the order's month
+    'month': 'DATE_SUB(DATE(order_date), INTERVAL DAYOFMONTH(order_date) - 1 DAY)',
+}
+
+def parse_group_by(args):
+    """Return (group_by, unknown) for the comma-separated ?group_by= parameter"""
+    group_by = [g.strip() for g in args.get('group_by', '').split(',') if g.strip()]
+    return group_by, [g for g in group_by if g not in STATS_GROUPS]
+
+def stats_query(group_by, where):
+    """Build the aggregate query over orders for the given groups and WHERE clause"""
+    columns = [f"{STATS_GROUPS[g]} AS {g}" for g in group_by]
+    columns += [
+        "COUNT(*) AS order_count",
+        "SUM(total_amount) AS total_amount",
+        "AVG(total_amount) AS avg_amount",
+        "MIN(total_amount) AS min_amount",
+        "MAX(total_amount) AS max_amount",
+    ]
+    query = "SELECT " + ", ".join(columns) + " FROM orders" + where
+    if group_by:
+        query += " GROUP BY " + ", ".join(group_by) + " ORDER BY " + ", ".join(group_by)
+    return query
+
+def stats_envelope(group_by, stats):
+    """Wrap the aggregate rows, writing date buckets as YYYY-MM-DD rather than HTTP dates"""
+    buckets = [g for g in group_by if g in ('day', 'week', 'month')]
+    if buckets:
+        stats = [dict(row) for row in stats]
+        for row in stats:
+            for bucket in buckets:
+                if row[bucket] is not None:
+                    row[bucket] = row[bucket].isoformat()
+    
+    return {
+        'group_by': group_by,
+        'stats': stats,
+        'count': len(stats)
+    }
+
+@app.route('/orders/stats', methods=['GET'])
 @token_required
-def get_order(order_id):
-    """Get a specific order by ID"""
+def order_stats():
+    """
+    Aggregate orders in MySQL instead of shipping every row to the client
+    GET /orders/stats?token=YOUR_TOKEN&group_by=maid_id,month
+    group_by: any of customer_id, maid_id, day, week, month (optional)
+    Accepts the same filters as GET /orders
+    Returns order_count, total_amount, avg_amount, min_amount, max_amount per group
+    """
+    group_by, unknown = parse_group_by(request.args)
+    if unknown:
+        return format_response({
+            'error': f"Unknown group_by value(s): {', '.join(unknown)}",
+            'allowed': sorted(STATS_GROUPS)
+        }, 400)
+    
+    etag = table_versions_etag('orders')
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
+    where, params = order_filters(request.args)
+    
     cur = mysql.connection.cursor()
-    cur.execute("SELECT * FROM orders WHERE order_id = %s", (order_id,))
-    order = cur.fetchone()
+    cur.execute(stats_query(group_by, where), tuple(params))
+    stats = cur.fetchall()
     cur.close()
     
+    return format_response(stats_envelope(group_by, stats), etag=etag)
+
+@app.route('/orders/<int:order_id>', methods=['GET'])
+@token_required
+def get_order(order_id):
+    """Get a specific order by ID, with include=customer,maid to embed the related rows"""
+    try:
+        include = parse_include(request.args)
+        fields = include_fields(parse_fields(request.args, 'orders'), include)
+    except ValueError as e:
+        return format_response({'error': str(e)}, 400)
+    
+    order = fetch_row('orders', 'order_id', order_id)
+    
     if not order:
         return format_response({'error': 'Order not found'}, 404)
     
+    order = project(order, fields)
+    # One cached primary-key read per relation
+    for name in include:
+        table, key = ORDER_INCLUDES[name]
+        related = fetch_row(table, key, order[key])
+        order = attach_related([order], name, [related] if related else [])[0]
+    
     return format_response(order)
 
 @app.route('/orders', methods=['POST'])
@@ -550,8 +1328,10 @@ def create_order():
                VALUES (%s, %s, %s)""",
             (customer_id, maid_id, total_amount)
         )
-        mysql.connection.commit()
         new_id = cur.lastrowid
+        record_new_orders(cur, [new_id])
+        bump_versions(cur, 'orders')
+        mysql.connection.commit()
         cur.close()
         
         return get_order(new_id)
@@ -561,54 +1341,75 @@ def create_order():
         cur.close()
         return format_response({'error': f'Database error: {str(e)}'}, 500)
 
+def null_reference(data):
+    """
+    The 404 message for an explicit null customer_id/maid_id, or None
+    (NULL passes the foreign keys but matches no customer or maid)
+    """
+    for column, label in (('customer_id', 'Customer'), ('maid_id', 'Maid')):
+        if column in data and data[column] is None:
+            return f'{label} not found'
+    return None
+
 @app.route('/orders/<int:order_id>', methods=['PUT'])
 @token_required
 def update_order(order_id):
-    """Update an existing order"""
+    """
+    Update an existing order (only the fields sent are written)
+    Unknown customer_id/maid_id values are reported by the foreign keys (errno 1452)
+    """
     data = request.get_json()
     
     if not data:
         return format_response({'error': 'No data provided'}, 400)
     
-    cur = mysql.connection.cursor()
-    
-    # Check if order exists
-    cur.execute("SELECT * FROM orders WHERE order_id = %s", (order_id,))
-    existing = cur.fetchone()
-    
-    if not existing:
-        cur.close()
-        return format_response({'error': 'Order not found'}, 404)
-    
-    # Validate foreign keys if provided
-    if 'customer_id' in data:
-        cur.execute("SELECT * FROM customer WHERE customer_id = %s", (data['customer_id'],))
-        if not cur.fetchone():
-            cur.close()
-            return format_response({'error': 'Customer not found'}, 404)
-    
-    if 'maid_id' in data:
-        cur.execute("SELECT * FROM maid WHERE maid_id = %s", (data['maid_id'],))
-        if not cur.fetchone():
-            cur.close()
-            return format_response({'error': 'Maid not found'}, 404)
+    missing = null_reference(data)
+    if missing:
+        return format_response({'error': missing}, 404)
     
-    # Get new values
-    customer_id = data.get('customer_id', existing['customer_id'])
-    maid_id = data.get('maid_id', existing['maid_id'])
-    total_amount = data.get('total_amount', existing['total_amount'])
+    assignments, params = update_assignments(
+        data, ('customer_id', 'maid_id', 'total_amount')
+    )
     
+    cur = mysql.connection.cursor()
     try:
-        cur.execute(
-            """UPDATE orders 
-               SET customer_id = %s, maid_id = %s, total_amount = %s 
-               WHERE order_id = %s""",
-            (customer_id, maid_id, total_amount, order_id)
-        )
-        mysql.connection.commit()
+        if assignments:
+            locked = lock_order(cur, order_id)
+            cur.execute(
+                f"UPDATE orders SET {assignments} WHERE order_id = %s",
+                (*params, order_id)
+            )
+            rows_affected = cur.rowcount
+        
+        cur.execute("SELECT * FROM orders WHERE order_id = %s", (order_id,))
+        order = cur.fetchone()
+        
+        if assignments:
+            # Moves between days/maids/customers and amount changes net out per key
+            record_sales(cur, removed=locked, added=[order] if order else [])
+            if rows_affected:
+                bump_versions(cur, 'orders')
+            mysql.connection.commit()
         cur.close()
         
-        return get_order(order_id)
+        if not order:
+            resource_cache.delete(cache_key('orders', order_id))
+            return format_response({'error': 'Order not found'}, 404)
+        
+        # Write-through: the row we just read is the freshest copy
+        resource_cache.set(cache_key('orders', order_id), order)
+        
+        return format_response(order)
+    
+    except IntegrityError as e:
+        mysql.connection.rollback()
+        cur.close()
+        if mysql_errno(e) == ER_NO_REFERENCED_ROW:
+            # The message names the failing constraint column
+            if 'customer_id' in str(e):
+                return format_response({'error': 'Customer not found'}, 404)
+            return format_response({'error': 'Maid not found'}, 404)
+        return format_response({'error': f'Database error: {str(e)}'}, 500)
         
     except Exception as e:
         mysql.connection.rollback()
@@ -621,18 +1422,19 @@ def delete_order(order_id):
     """Delete an order"""
     cur = mysql.connection.cursor()
     
-    # Check if order exists
-    cur.execute("SELECT * FROM orders WHERE order_id = %s", (order_id,))
-    existing = cur.fetchone()
-    
-    if not existing:
-        cur.close()
-        return format_response({'error': 'Order not found'}, 404)
-    
     try:
+        locked = lock_order(cur, order_id)
         cur.execute("DELETE FROM orders WHERE order_id = %s", (order_id,))
+        rows_affected = cur.rowcount
+        record_sales(cur, removed=locked)
+        if rows_affected:
+            bump_versions(cur, 'orders')
         mysql.connection.commit()
         cur.close()
+        resource_cache.delete(cache_key('orders', order_id))
+        
+        if rows_affected == 0:
+            return format_response({'error': 'Order not found'}, 404)
         
         return format_response({
             'message': 'Order deleted successfully',
@@ -644,44 +1446,727 @@ def delete_order(order_id):
         cur.close()
         return format_response({'error': f'Database error: {str(e)}'}, 500)
 
+# ========== DAILY SALES SUMMARY ==========
+# daily_sales (migrations/0004) keeps order_count/total_amount per
+# (day, maid_id, customer_id); with SALES_SUMMARY on, every order write
+# applies its deltas in its own transaction
+SALES_COLUMNS = ('day', 'maid_id', 'customer_id', 'order_count', 'total_amount')
+SALES_GROUPS = ('day', 'maid_id', 'customer_id')
+# Orders without a date, maid or customer have no summary row
+SALES_SUMMARIZED = "order_date IS NOT NULL AND maid_id IS NOT NULL AND customer_id IS NOT NULL"
+SALES_FROM_ORDERS = (
+    "SELECT DATE(order_date) AS day, maid_id, customer_id, COUNT(*) AS order_count, "
+    "COALESCE(SUM(total_amount), 0) AS total_amount FROM orders "
+    f"WHERE {SALES_SUMMARIZED} GROUP BY DATE(order_date), maid_id, customer_id"
+)
+CENT = Decimal('0.01')
+
+def sales_deltas(removed=(), added=()):
+    """
+    Net {(day, maid_id, customer_id): (order_count, total_amount)} change when
+    the removed order rows are replaced by the added ones; keys that net to zero are dropped
+    """
+    deltas = {}
+    for orders, sign in ((removed, -1), (added, 1)):
+        for order in orders:
+            if None in (order['order_date'], order['maid_id'], order['customer_id']):
+                continue
+            key = (order['order_date'].date(), order['maid_id'], order['customer_id'])
+            # Rounded like the DECIMAL(10,2) column, so imported floats add up to what is stored
+            amount = Decimal(str(order['total_amount'] or 0)).quantize(CENT, ROUND_HALF_UP)
+            count, total = deltas.get(key, (0, Decimal(0)))
+            deltas[key] = (count + sign, total + sign * amount)
+    return {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+
+def sales_statements(deltas, chunk_rows):
+    """
+    Yield (statement, params) upserts adding deltas to daily_sales
+    Keys are sorted so concurrent writers lock summary rows in the same order
+    """
+    rows = [key + delta for key, delta in sorted(deltas.items())]
+    for statement, params, _ in insert_chunks('daily_sales', SALES_COLUMNS, rows, chunk_rows):
+        yield (statement + " ON DUPLICATE KEY UPDATE order_count = order_count + VALUES(order_count), "
+               "total_amount = total_amount + VALUES(total_amount)"), params
+
+def record_sales(cur, removed=(), added=()):
+    """Apply the daily_sales deltas of an order write inside its transaction (no-op unless SALES_SUMMARY)"""
+    if not app.config['SALES_SUMMARY']:
+        return
+    for statement, params in sales_statements(sales_deltas(removed, added),
+                                              app.config['INSERT_CHUNK_ROWS']):
+        cur.execute(statement, params)
+
+def record_new_orders(cur, ids):
+    """record_sales for just-inserted orders, read back for their defaulted order_date"""
+    if not app.config['SALES_SUMMARY']:
+        return
+    cur.execute(*ids_query('orders', 'order_id', ids, '*'))
+    record_sales(cur, added=cur.fetchall())
+
+def lock_order(cur, order_id):
+    """
+    Read an order FOR UPDATE before changing it, so its old values can be subtracted
+    Returns [] or [row]; always [] unless SALES_SUMMARY is on
+    """
+    if not app.config['SALES_SUMMARY']:
+        return []
+    cur.execute("SELECT * FROM orders WHERE order_id = %s FOR UPDATE", (order_id,))
+    order = cur.fetchone()
+    return [order] if order else []
+
+def sales_differences(cur):
+    """Keys whose daily_sales totals differ from orders: [(key, stored, actual)], None for missing"""
+    cur.execute(SALES_FROM_ORDERS)
+    actual = {(row['day'], row['maid_id'], row['customer_id']): (row['order_count'], row['total_amount'])
+              for row in cur.fetchall()}
+    cur.execute("SELECT * FROM daily_sales")
+    stored = {(row['day'], row['maid_id'], row['customer_id']): (row['order_count'], row['total_amount'])
+              for row in cur.fetchall()}
+    # Rows that netted to zero are left behind by deletes and moves
+    stored = {key: totals for key, totals in stored.items() if totals != (0, 0)}
+    return [(key, stored.get(key), actual.get(key))
+            for key in sorted(set(stored) | set(actual)) if stored.get(key) != actual.get(key)]
+
+def rebuild_sales(connection):
+    """
+    Recompute daily_sales from orders in one transaction; returns the summary row count
+    The INSERT ... SELECT share-locks orders, so order writes wait for it to finish
+    """
+    cur = connection.cursor()
+    try:
+        cur.execute("DELETE FROM daily_sales")
+        cur.execute(f"INSERT INTO daily_sales ({', '.join(SALES_COLUMNS)}) {SALES_FROM_ORDERS}")
+        count = cur.rowcount
+        # /orders/daily-sales ETags follow the orders marker
+        bump_versions(cur, 'orders')
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cur.close()
+    return count
+
+def parse_day(args, name):
+    """Read an optional YYYY-MM-DD query parameter"""
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a YYYY-MM-DD date')
+
+def sales_query(group_by, args, summary):
+    """
+    Build the /orders/daily-sales query: order_count and total_amount per group,
+    read from daily_sales when summary is set, otherwise aggregated from orders
+    Filters: start_date/end_date (inclusive days), maid_id, customer_id
+    Returns (query, params); raises ValueError for malformed filters
+    """
+    if summary:
+        table, day, count, where = 'daily_sales', 'day', 'SUM(order_count)', ['1=1']
+    else:
+        table, day, count, where = 'orders', 'DATE(order_date)', 'COUNT(*)', [SALES_SUMMARIZED]
+    params = []
+    
+    for name in ('maid_id', 'customer_id'):
+        if args.get(name):
+            try:
+                params.append(int(args[name]))
+            except ValueError:
+                raise ValueError(f'{name} must be an integer')
+            where.append(f"{name} = %s")
+    
+    start, end = parse_day(args, 'start_date'), parse_day(args, 'end_date')
+    if start:
+        where.append("day >= %s" if summary else "order_date >= %s")
+        params.append(start)
+    if end:
+        # Whole days: orders are compared on the raw column so its indexes apply
+        where.append("day <= %s" if summary else "order_date < %s")
+        params.append(end if summary else end + timedelta(days=1))
+    
+    columns = [f"{day} AS day" if g == 'day' else g for g in group_by]
+    columns += [f"{count} AS order_count", "COALESCE(SUM(total_amount), 0) AS total_amount"]
+    query = f"SELECT {', '.join(columns)} FROM {table} WHERE {' AND '.join(where)}"
+    if group_by:
+        query += f" GROUP BY {', '.join(group_by)}"
+    query += " HAVING order_count > 0"
+    if group_by:
+        query += f" ORDER BY {', '.join(group_by)}"
+    return query, tuple(params)
+
+@app.route('/orders/daily-sales', methods=['GET'])
+@token_required
+def daily_sales():
+    """
+    Order count and revenue per day, maid and/or customer
+    GET /orders/daily-sales?token=YOUR_TOKEN&group_by=day,maid_id&start_date=2024-01-01&end_date=2024-01-31
+    group_by: any of day, maid_id, customer_id (default day; empty for one total)
+    Reads the daily_sales summary when SALES_SUMMARY is on, otherwise scans orders
+    """
+    group_by = [g.strip() for g in request.args.get('group_by', 'day').split(',') if g.strip()]
+    unknown = [g for g in group_by if g not in SALES_GROUPS]
+    if unknown:
+        return format_response({
+            'error': f"Unknown group_by value(s): {', '.join(unknown)}",
+            'allowed': list(SALES_GROUPS)
+        }, 400)
+    
+    try:
+        query, params = sales_query(group_by, request.args, app.config['SALES_SUMMARY'])
+    except ValueError as e:
+        return format_response({'error': str(e)}, 400)
+    
+    etag = table_versions_etag('orders')
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
+    cur = mysql.connection.cursor()
+    cur.execute(query, params)
+    sales = cur.fetchall()
+    cur.close()
+    
+    return format_response(stats_envelope(group_by, sales), etag=etag)
+
+# ========== BATCH CREATE ENDPOINTS ==========
+def read_batch():
+    """
+    Read a JSON array of rows from the request body
+    Returns (rows, None) or (None, error_response)
+    """
+    data = request.get_json(silent=True)
+    
+    error = check_batch(data, app.config['BATCH_MAX_ROWS'])
+    if error:
+        return None, format_response({'error': error}, 400)
+    
+    return data, None
+
+def check_batch(data, max_rows):
+    """Return the client-facing error for a batch body, or None if it is usable"""
+    if not isinstance(data, list):
+        return 'Expected a JSON array of objects'
+    
+    if not data:
+        return 'No data provided'
+    
+    if len(data) > max_rows:
+        return f'Batch is limited to {max_rows} rows'
+    
+    return None
+
+def validate_rows(rows, validate):
+    """
+    Run validate(row) over every row up front
+    Returns (valid, errors) where valid is a list of (index, values)
+    """
+    valid = []
+    errors = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'index': index, 'error': 'Row must be a JSON object'})
+            continue
+        try:
+            valid.append((index, validate(row)))
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+    return valid, errors
+
+def ids_query(table, key, ids, columns=None):
+    """
+    Build the single IN (...) lookup for a set of ids; None when there are none
+    Selects just the key unless columns (e.g. '*') is given
+    """
+    ids = list(set(ids))
+    if not ids:
+        return None
+    placeholders = ", ".join(["%s"] * len(ids))
+    return f"SELECT {columns or key} FROM {table} WHERE {key} IN ({placeholders})", tuple(ids)
+
+def existing_ids(cur, table, key, ids):
+    """Return the subset of ids present in table, using one IN (...) query"""
+    lookup = ids_query(table, key, ids)
+    if lookup is None:
+        return set()
+    cur.execute(*lookup)
+    return {row[key] for row in cur.fetchall()}
+
+def insert_chunks(table, columns, rows, chunk_rows):
+    """Yield (statement, params, row_count) for multi-row INSERTs of chunk_rows rows each"""
+    row_sql = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    
+    for start in range(0, len(rows), chunk_rows):
+        chunk = rows[start:start + chunk_rows]
+        params = [value for row in chunk for value in row]
+        yield prefix + ", ".join([row_sql] * len(chunk)), tuple(params), len(chunk)
+
+# The primary's auto-increment settings, read by the first batch insert
+autoinc_settings = {}
+AUTOINC_QUERY = ("SELECT @@innodb_autoinc_lock_mode AS lock_mode, "
+                 "@@auto_increment_increment AS increment")
+
+def autoinc_step(settings):
+    """
+    The gap between the IDs of the rows of one multi-row INSERT, or None when
+    they may not be evenly spaced (innodb_autoinc_lock_mode 2, the MySQL 8 default)
+    """
+    return settings['increment'] if settings['lock_mode'] in (0, 1) else None
+
+def batch_ids(first_id, count, step):
+    """The IDs of a count-row INSERT whose first row got first_id"""
+    return list(range(first_id, first_id + count * step, step))
+
+def insert_rows(cur, table, columns, rows):
+    """
+    Insert rows and return their new auto-increment IDs in row order
+    Uses multi-row INSERTs of INSERT_CHUNK_ROWS rows when autoinc_step() says the
+    IDs follow from lastrowid, otherwise one INSERT per row so every ID is exact
+    """
+    if not autoinc_settings:
+        cur.execute(AUTOINC_QUERY)
+        autoinc_settings.update(cur.fetchone())
+    step = autoinc_step(autoinc_settings)
+    
+    new_ids = []
+    for statement, params, count in insert_chunks(table, columns, rows,
+                                                  app.config['INSERT_CHUNK_ROWS'] if step else 1):
+        cur.execute(statement, params)
+        new_ids.extend(batch_ids(cur.lastrowid, count, step or 1))
+    return new_ids
+
+def create_batch(table, key, columns, valid, errors, cur=None, after_insert=None):
+    """
+    Insert the valid rows in one transaction and build the batch response
+    after_insert(cur, new_ids) runs in the same transaction before the commit
+    """
+    if not valid:
+        return format_response({'created': [], 'errors': errors, 'count': 0}, 400)
+    
+    cur = cur or mysql.connection.cursor()
+    try:
+        new_ids = insert_rows(cur, table, columns, [values for _, values in valid])
+        if after_insert:
+            after_insert(cur, new_ids)
+        bump_versions(cur, table)
+        mysql.connection.commit()
+        cur.close()
+    except Exception as e:
+        mysql.connection.rollback()
+        cur.close()
+        return format_response({'error': f'Database error: {str(e)}'}, 500)
+    
+    return format_response(batch_envelope(key, valid, new_ids, errors))
+
+def batch_envelope(key, valid, new_ids, errors):
+    """Pair each inserted input index with its new ID"""
+    created = [{'index': index, key: new_id}
+               for (index, _), new_id in zip(valid, new_ids)]
+    return {'created': created, 'errors': errors, 'count': len(created)}
+
+def validate_customer(data):
+    """Validate a customer row for insertion"""
+    if not data.get('name'):
+        raise ValueError('Name is required')
+    return (data['name'], data.get('email', ''), data.get('phone_number', ''))
+
+def validate_maid(data):
+    """Validate a maid row for insertion"""
+    if not data.get('name'):
+        raise ValueError('Name is required')
+    return (data['name'],
+            data.get('shift_start_time', '09:00:00'),
+            data.get('shift_end_time', '17:00:00'))
+
+def validate_order(data):
+    """Validate an order row for insertion (references are checked separately)"""
+    if not data.get('customer_id') or not data.get('maid_id'):
+        raise ValueError('Both customer_id and maid_id are required')
+    try:
+        return (int(data['customer_id']),
+                int(data['maid_id']),
+                float(data.get('total_amount', 0.0)))
+    except (TypeError, ValueError):
+        raise ValueError('customer_id, maid_id and total_amount must be numbers')
+
+@app.route('/customers/batch', methods=['POST'])
+@token_required
+def create_customers_batch():
+    """
+    Create many customers in one transaction
+    POST /customers/batch with JSON: [{"name": ...}, ...]
+    Returns created IDs by input index plus per-row errors
+    """
+    rows, error = read_batch()
+    if error:
+        return error
+    
+    valid, errors = validate_rows(rows, validate_customer)
+    return create_batch('customer', 'customer_id',
+                        ('name', 'email', 'phone_number'), valid, errors)
+
+@app.route('/maids/batch', methods=['POST'])
+@token_required
+def create_maids_batch():
+    """
+    Create many maids in one transaction
+    POST /maids/batch with JSON: [{"name": ..., "shift_start_time": ...}, ...]
+    """
+    rows, error = read_batch()
+    if error:
+        return error
+    
+    valid, errors = validate_rows(rows, validate_maid)
+    response = create_batch('maid', 'maid_id',
+                            ('name', 'shift_start_time', 'shift_end_time'), valid, errors)
+    shift_index.invalidate()
+    return response
+
+@app.route('/orders/batch', methods=['POST'])
+@token_required
+def create_orders_batch():
+    """
+    Create many orders in one transaction
+    POST /orders/batch with JSON: [{"customer_id": 1, "maid_id": 2, "total_amount": 30.0}, ...]
+    Customer and maid references are checked with one query per table for the whole batch
+    """
+    rows, error = read_batch()
+    if error:
+        return error
+    
+    valid, errors = validate_rows(rows, validate_order)
+    
+    cur = mysql.connection.cursor()
+    customers = existing_ids(cur, 'customer', 'customer_id', [v[0] for _, v in valid])
+    maids = existing_ids(cur, 'maid', 'maid_id', [v[1] for _, v in valid])
+    checked = check_references(valid, errors, customers, maids)
+    
+    if not checked:
+        cur.close()
+    return create_batch('orders', 'order_id',
+                        ('customer_id', 'maid_id', 'total_amount'), checked, errors, cur,
+                        after_insert=record_new_orders)
+
+def check_references(valid, errors, customers, maids):
+    """Keep the order rows whose customer and maid exist, adding errors for the rest"""
+    checked = []
+    for index, values in valid:
+        if values[0] not in customers:
+            errors.append({'index': index, 'error': 'Customer not found'})
+        elif values[1] not in maids:
+            errors.append({'index': index, 'error': 'Maid not found'})
+        else:
+            checked.append((index, values))
+    errors.sort(key=lambda e: e['index'])
+    return checked
+
+# ========== BULK CSV IMPORT ==========
+def validate_import_order(data):
+    """validate_order plus the order_date historic imports carry (blank means now)"""
+    values = validate_order(data)
+    order_date = data.get('order_date')
+    if not order_date:
+        return values + (datetime.now(),)
+    try:
+        return values + (datetime.fromisoformat(order_date),)
+    except ValueError:
+        raise ValueError('order_date must be an ISO date or date/time')
+
+def record_imported_orders(cur, rows):
+    """Add a loaded chunk of validate_import_order tuples to daily_sales"""
+    record_sales(cur, added=[dict(zip(IMPORTS['orders'].columns, values)) for values in rows])
+
+# Tables /imports/<name> and `flask import-csv` load
+IMPORTS = {
+    'customers': bulk_import.ImportSpec(
+        'customer', ('name', 'email', 'phone_number'), validate_customer, ()
+    ),
+    'orders': bulk_import.ImportSpec(
+        'orders', ('customer_id', 'maid_id', 'total_amount', 'order_date'), validate_import_order,
+        ((0, 'customer', 'customer_id', 'Customer not found'), (1, 'maid', 'maid_id', 'Maid not found')),
+        record_imported_orders
+    ),
+}
+
+def load_chunk(connection, cur, spec, rows, load_data):
+    """
+    Insert one chunk's rows in the open transaction; raises unless every row was stored
+    LOAD DATA LOCAL turns row errors (e.g. duplicate keys) into warnings and skips
+    the row, so a short count is rolled back and the chunk retried with INSERTs,
+    which raise the error instead
+    """
+    if load_data:
+        if bulk_import.load_data(cur, spec.table, spec.columns, rows) == len(rows):
+            return
+        connection.rollback()
+    
+    for statement, params, _ in insert_chunks(spec.table, spec.columns, rows,
+                                              app.config['INSERT_CHUNK_ROWS']):
+        cur.execute(statement, params)
+
+def import_csv(connection, spec, reader, rejects, chunk_rows, load_data=False):
+    """
+    Load a csv.DictReader into spec.table one chunk per transaction
+    References are checked with one IN (...) query per table and chunk; ids
+    already found are remembered. Rejected rows go to rejects (RejectWriter)
+    Returns the number of rows inserted
+    """
+    known = {table: set() for _, table, _, _ in spec.references}
+    inserted = 0
+    cur = connection.cursor()
+    try:
+        for chunk in bulk_import.read_chunks(reader, chunk_rows):
+            valid = []
+            for line, row in chunk:
+                try:
+                    valid.append((line, row, spec.validate(row)))
+                except ValueError as e:
+                    rejects.write(line, row, str(e))
+            
+            for position, table, key, error in spec.references:
+                wanted = {values[position] for _, _, values in valid} - known[table]
+                known[table] |= existing_ids(cur, table, key, wanted)
+                for line, row, values in valid:
+                    if values[position] not in known[table]:
+                        rejects.write(line, row, error)
+                valid = [item for item in valid if item[2][position] in known[table]]
+            
+            if not valid:
+                continue
+            
+            rows = [values for _, _, values in valid]
+            try:
+                load_chunk(connection, cur, spec, rows, load_data)
+                if spec.on_load:
+                    spec.on_load(cur, rows)
+                bump_versions(cur, spec.table)
+                connection.commit()
+                inserted += len(rows)
+            except Exception as e:
+                connection.rollback()
+                for line, row, _ in valid:
+                    rejects.write(line, row, f'Database error: {str(e)}')
+    finally:
+        cur.close()
+    
+    return inserted
+
+def run_import(name, stream, rejects_path):
+    """
+    Import a CSV text stream into the IMPORTS table called name on a dedicated connection
+    Returns the summary dict; raises ValueError for an unusable file
+    """
+    spec = IMPORTS[name]
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames:
+        raise ValueError('CSV file is empty')
+    
+    load_data = app.config['IMPORT_LOAD_DATA']
+    connection = mysql.open_connection(**({'local_infile': 1} if load_data else {}))
+    rejects = bulk_import.RejectWriter(rejects_path, reader.fieldnames)
+    started = time.perf_counter()
+    try:
+        inserted = import_csv(connection, spec, reader, rejects,
+                              app.config['IMPORT_CHUNK_ROWS'], load_data)
+    finally:
+        rejects.close()
+        connection.close()
+    
+    return {
+        'table': spec.table,
+        'inserted': inserted,
+        'rejected': rejects.count,
+        'rejects_file': rejects.path if rejects.count else None,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+def import_rejects_path(name):
+    """A new side file under IMPORT_REJECTS_DIR for one /imports/<name> request"""
+    return os.path.join(
+        app.config['IMPORT_REJECTS_DIR'],
+        f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.rejects.csv"
+    )
+
+@app.route('/imports/<name>', methods=['POST'])
+@token_required
+def create_import(name):
+    """
+    Bulk-load customers or orders from a CSV upload (multipart field "file" or a text/csv body)
+    The header row names the columns; orders may carry order_date for historic data
+    Returns inserted/rejected counts; rejected rows are written to a side file
+    """
+    if name not in IMPORTS:
+        return format_response({'error': f"Unknown import: {name}. Allowed: {', '.join(IMPORTS)}"}, 404)
+    
+    request.max_content_length = app.config['IMPORT_MAX_BYTES']
+    upload = request.files.get('file')
+    raw = upload.stream if upload else request.stream
+    stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+    
+    try:
+        summary = run_import(name, stream, import_rejects_path(name))
+    except ValueError as e:
+        return format_response({'error': str(e)}, 400)
+    except Exception as e:
+        return format_response({'error': f'Database error: {str(e)}'}, 500)
+    
+    return format_response(summary)
+
+@app.cli.command('import-csv')
+@click.argument('name', type=click.Choice(sorted(IMPORTS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--rejects', help='Side file for rejected rows (default: PATH.rejects.csv)')
+@click.option('--load-data/--insert', default=None, help='Override IMPORT_LOAD_DATA')
+def import_csv_command(name, path, rejects, load_data):
+    """Bulk-load customers or orders from a CSV file (flask --app app import-csv orders data.csv)"""
+    if load_data is not None:
+        app.config['IMPORT_LOAD_DATA'] = load_data
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        summary = run_import(name, f, rejects or path + '.rejects.csv')
+    print(f"Inserted {summary['inserted']} row(s) into {summary['table']} in {summary['seconds']}s, "
+          f"rejected {summary['rejected']}" +
+          (f" (see {summary['rejects_file']})" if summary['rejects_file'] else ""))
+
+# ========== EXPORT JOBS ==========
+# Exports read on their own connection (a replica when configured), outside the request pool
+export_jobs = exports.ExportManager(
+    app.config['EXPORT_DIR'],
+    lambda: mysql.open_connection(read=True),
+    SSDictCursor,
+    workers=app.config['EXPORT_WORKERS'],
+    batch_size=app.config['EXPORT_BATCH_SIZE'],
+)
+
+def export_query(data):
+    """
+    Read an export request body: a format plus any /orders filter and fields
+    Returns (format, query, params); raises ValueError with a client-facing message
+    """
+    fmt = str(data.get('format', 'csv')).lower()
+    if fmt not in exports.available_formats():
+        raise ValueError(f"Unsupported export format: {fmt}. "
+                         f"Allowed: {', '.join(exports.available_formats())}")
+    
+    if not isinstance(data.get('fields', ''), str):
+        raise ValueError('fields must be a comma-separated string')
+    unusable = [name for name, value in data.items()
+                if name not in ('format', 'fields') and not isinstance(value, (str, int, float))]
+    if unusable:
+        raise ValueError(f"Expected a string or number for: {', '.join(sorted(unusable))}")
+    
+    fields = parse_fields(data, 'orders')
+    where, params = order_filters(data)
+    return fmt, f"SELECT {select_list(fields)} FROM orders{where} ORDER BY order_id", tuple(params)
+
+def export_status(job):
+    """A job's state as returned by the API, with its download link once done"""
+    status = {key: value for key, value in job.items() if key != 'owner'}
+    if job['status'] == 'done':
+        status['download'] = f"/exports/{job['id']}/download"
+    return status
+
+@app.route('/exports', methods=['POST'])
+@token_required
+def create_export():
+    """
+    Start a background export of orders
+    POST /exports with JSON: {"format": "csv" or "parquet", "customer_id": 1, "start_date": ..., "fields": ...}
+    Returns 202 with the job; poll GET /exports/<id>, then GET /exports/<id>/download
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return format_response({'error': 'Expected a JSON object'}, 400)
+    
+    try:
+        fmt, query, params = export_query(data)
+    except ValueError as e:
+        return format_response({'error': str(e)}, 400)
+    
+    job = export_jobs.submit(query, params, fmt)
+    response = format_response(export_status(job), 202)
+    response.headers['Location'] = f"/exports/{job['id']}"
+    return response
+
+@app.route('/exports/<job_id>', methods=['GET'])
+@token_required
+def get_export(job_id):
+    """Status of an export job: queued, running (with rows written so far), done or failed"""
+    job = export_jobs.get(job_id)
+    if not job:
+        return format_response({'error': 'Export not found'}, 404)
+    return format_response(export_status(job))
+
+@app.route('/exports/<job_id>/download', methods=['GET'])
+@token_required
+def download_export(job_id):
+    """Download a finished export file"""
+    job = export_jobs.get(job_id)
+    if not job:
+        return format_response({'error': 'Export not found'}, 404)
+    if job['status'] != 'done':
+        return format_response({'error': 'Export is not finished', 'status': job['status']}, 409)
+    
+    return send_file(export_jobs.file_path(job), mimetype=exports.MIMETYPES[job['format']],
+                     as_attachment=True, download_name=f"orders-{job['id']}.{job['format']}")
+
+# ========== CACHE STATS ENDPOINT ==========
+@app.route('/cache/stats', methods=['GET'])
+@token_required
+def cache_stats():
+    """Hit/miss counters of the single-resource and JWT caches, for sizing them"""
+    return format_response({
+        'resources': resource_cache.stats(),
+        'tokens': token_cache.stats()
+    })
+
 # ========== HEALTH & INFO ENDPOINTS ==========
+API_INFO = {
+    'name': 'Maid Cafe REST API',
+    'version': '1.0.0',
+    'description': 'CRUD API for managing maid cafe operations',
+    'author': 'Your Name',
+    'features': [
+        'JWT Authentication',
+        'CRUD operations for Customers, Maids, Orders',
+        'XML/JSON output formatting',
+        'Search functionality',
+        'Input validation',
+        'Error handling'
+    ],
+    'authentication': 'Use /login endpoint to get JWT token',
+    'output_format': 'Add ?format=xml for XML, or ?format=json for JSON (default)'
+}
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; reports connection pool state instead of opening a new connection"""
     try:
-        cur = mysql.connection.cursor()
-        cur.execute("SELECT 1")
-        cur.close()
-        db_status = 'connected'
-    except:
+        pool = mysql.pool_status()
+        db_status = 'connected' if pool['healthy'] else 'disconnected'
+    except Exception:
+        pool = None
         db_status = 'disconnected'
     
     return jsonify({
         'status': 'healthy',
         'service': 'Maid Cafe REST API',
         'database': db_status,
+        'pool': pool,
         'timestamp': datetime.utcnow().isoformat()
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint: per-route latency histograms, DB/serialization time, pool gauges"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api-info', methods=['GET'])
 def api_info():
     """API information endpoint"""
-    return jsonify({
-        'name': 'Maid Cafe REST API',
-        'version': '1.0.0',
-        'description': 'CRUD API for managing maid cafe operations',
-        'author': 'Your Name',
-        'features': [
-            'JWT Authentication',
-            'CRUD operations for Customers, Maids, Orders',
-            'XML/JSON output formatting',
-            'Search functionality',
-            'Input validation',
-            'Error handling'
-        ],
-        'authentication': 'Use /login endpoint to get JWT token',
-        'output_format': 'Add ?format=xml for XML, or ?format=json for JSON (default)'
-    })
+    return jsonify(API_INFO)
 
 # ========== ERROR HANDLERS ==========
 @app.errorhandler(404)
@@ -692,12 +2177,44 @@ def not_found(error):
 def internal_error(error):
     return format_response({'error': 'Internal server error'}, 500)
 
+@app.errorhandler(PoolExhausted)
+def pool_exhausted(error):
+    return format_response({'error': 'Database is busy, please retry'}, 503)
+
 @app.errorhandler(400)
 def bad_request(error):
     return format_response({'error': 'Bad request'}, 400)
 
+# ========== CLI COMMANDS ==========
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending SQL migrations from migrations/ (flask --app app migrate)"""
+    versions = migrate.apply_migrations(mysql.connection)
+    print(f"Applied {len(versions)} migration(s)")
+
+@app.cli.command('rebuild-sales')
+@click.option('--check', is_flag=True, help='Only compare daily_sales with orders, without writing')
+def rebuild_sales_command(check):
+    """Recompute the daily_sales summary from orders (flask --app app rebuild-sales [--check])"""
+    if not check:
+        print(f"Rebuilt daily_sales: {rebuild_sales(mysql.connection)} row(s)")
+        return
+    
+    cur = mysql.connection.cursor()
+    differences = sales_differences(cur)
+    cur.close()
+    for (day, maid_id, customer_id), stored, actual in differences:
+        print(f"{day} maid {maid_id} customer {customer_id}: summary {stored}, orders {actual}")
+    print(f"{len(differences)} difference(s)")
+    if differences:
+        raise SystemExit(1)
+
 # ========== RUN APPLICATION ==========
 if __name__ == '__main__':
+    if app.config['MIGRATE_ON_STARTUP']:
+        with app.app_context():
+            migrate.apply_migrations(mysql.connection)
+    
     print("=" * 50)
     print("Maid Cafe REST API")
     print("Starting on http://localhost:5000")
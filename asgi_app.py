@@ -0,0 +1,1287 @@
+"""
+ASGI variant of the Maid Cafe REST API
+Serves the same routes, auth and format_response semantics as app.py from
+Quart on an aiomysql pool, so one process keeps many queries in flight
+instead of blocking a worker per request.
+Query building, validation, settings and the caches are shared with app.py.
+Run with: hypercorn asgi_app:asgi_app
+"""
+
+import asyncio
+import io
+import tempfile
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+import aiomysql
+import jwt
+from pymysql.err import IntegrityError
+from quart import Quart, jsonify, request, Request, Response, g, has_request_context, send_file
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import generate_etag
+
+import exports
+import xml_encoder
+from json_provider import FastJSONProvider
+from app import (
+    app as wsgi_app, API_INFO, DEMO_USER, ER_ROW_IS_REFERENCED, ER_NO_REFERENCED_ROW,
+    decode_token, mysql_errno, update_assignments, cache_key, versions_etag, version_bump,
+    variant_mimetype, wants_stream, parse_pagination, parse_fields, select_list, project, collection_query, apply_keyset, page_envelope,
+    order_filters, ORDER_INCLUDES, parse_include, include_fields,
+    related_query, attach_related, parse_group_by, stats_query, stats_envelope,
+    check_batch, validate_rows, ids_query, insert_chunks, batch_envelope,
+    autoinc_settings, AUTOINC_QUERY, autoinc_step, batch_ids,
+    check_references, validate_customer, validate_maid, validate_order, null_reference,
+    resource_cache, token_cache, STATS_GROUPS,
+    SALES_GROUPS, sales_deltas, sales_statements, sales_query,
+    shift_index, parse_shift_window, shift_window,
+    export_jobs, export_query, export_status, IMPORTS, run_import, import_rejects_path,
+)
+from db_pool import PoolExhausted, ReplicaSet, replica_settings
+from metrics import AsyncTimedConnection, Metrics, RequestTiming
+import profiling
+import compression
+
+
+asgi_app = Quart(__name__)
+asgi_app.json = FastJSONProvider(asgi_app)
+
+# Both serving modes read one set of settings, defined in app.py
+SHARED_CONFIG = ('MYSQL_', 'SECRET_KEY', 'STREAM_', 'BATCH_', 'INSERT_',
+                 'CACHE_', 'JWT_', 'SEARCH_', 'ETAG_', 'METRICS_', 'PROFILE_', 'COMPRESS_',
+                 'EXPORT_', 'SALES_', 'SHIFT_', 'IMPORT_')
+asgi_app.config.update(
+    {key: value for key, value in wsgi_app.config.items() if key.startswith(SHARED_CONFIG)}
+)
+
+
+class ImportRequest(Request):
+    """
+    Quart fixes a request's body size and time limits when it builds the request, before
+    routing; /imports uploads get IMPORT_MAX_BYTES and IMPORT_BODY_TIMEOUT in place of
+    MAX_CONTENT_LENGTH (16MB) and BODY_TIMEOUT (60s), which app.py does not have
+    """
+
+    def __init__(self, method, scheme, path, *args, **kwargs):
+        if path.startswith('/imports/'):
+            kwargs['max_content_length'] = asgi_app.config['IMPORT_MAX_BYTES']
+            kwargs['body_timeout'] = asgi_app.config['IMPORT_BODY_TIMEOUT']
+        super().__init__(method, scheme, path, *args, **kwargs)
+
+    @property
+    def max_content_length(self):
+        """What the multipart parser checks; Quart falls back to MAX_CONTENT_LENGTH for None"""
+        if self.path.startswith('/imports/'):
+            return asgi_app.config['IMPORT_MAX_BYTES']
+        return super().max_content_length
+
+
+asgi_app.request_class = ImportRequest
+
+
+# ========== ASYNC CONNECTION POOL ==========
+class AsyncMySQLPool:
+    """
+    aiomysql pools built from the same MYSQL_* / MYSQL_POOL_* / MYSQL_REPLICAS settings
+    as db_pool.MySQLPool, with the same routing: GET/HEAD requests borrow from a
+    replica (round-robin, falling back to the primary), everything else from the primary
+    Each request borrows one connection on first use and returns it on teardown
+    (aiomysql recycles by age but does not pre-ping; dead sockets are dropped on acquire)
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.pool = None
+        self.replicas = None
+        self._lock = asyncio.Lock()
+        app.after_serving(self.close)
+        app.teardown_appcontext(self.teardown)
+
+    async def _create_pool(self, minsize, **overrides):
+        config = self.app.config
+        settings = {
+            'host': config['MYSQL_HOST'],
+            'port': config['MYSQL_PORT'],
+            'user': config['MYSQL_USER'],
+            'password': config['MYSQL_PASSWORD'] or '',
+        }
+        settings.update(overrides)
+        return await aiomysql.create_pool(
+            minsize=minsize,
+            maxsize=config['MYSQL_POOL_MAX_SIZE'],
+            pool_recycle=config['MYSQL_POOL_MAX_LIFETIME'],
+            db=config['MYSQL_DB'],
+            charset=config['MYSQL_CHARSET'],
+            connect_timeout=config['MYSQL_CONNECT_TIMEOUT'],
+            cursorclass=aiomysql.DictCursor,
+            autocommit=False,
+            **settings,
+        )
+
+    async def open(self):
+        """Create the aiomysql pools on first use"""
+        async with self._lock:
+            if self.pool is None:
+                config = self.app.config
+                self.pool = await self._create_pool(config['MYSQL_POOL_MIN_SIZE'])
+                if config['MYSQL_REPLICAS']:
+                    # Replicas connect on demand, so one that is down does not block startup
+                    self.replicas = ReplicaSet(
+                        [await self._create_pool(0, **replica_settings(entry))
+                         for entry in config['MYSQL_REPLICAS']],
+                        retry_after=config['MYSQL_REPLICA_RETRY_AFTER'],
+                    )
+        return self.pool
+
+    async def close(self):
+        if self.pool is not None:
+            pools = [self.pool] + (self.replicas.pools if self.replicas else [])
+            for pool in pools:
+                pool.close()
+                await pool.wait_closed()
+            self.pool = None
+            self.replicas = None
+
+    async def acquire(self, timeout=None, pool=None):
+        """
+        Borrow a connection from pool (default: the primary), raising
+        PoolExhausted after MYSQL_POOL_WAIT_TIMEOUT seconds
+        """
+        pool = pool or self.pool or await self.open()
+        timeout = self.app.config['MYSQL_POOL_WAIT_TIMEOUT'] if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(pool.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise PoolExhausted(
+                f"No database connection available within {timeout}s "
+                f"(max_size={pool.maxsize})"
+            )
+
+    async def release(self, connection, pool=None):
+        """Return a connection, ending any open transaction so no snapshot leaks"""
+        try:
+            await connection.rollback()
+        except Exception:
+            connection.close()
+        await (pool or self.pool).release(connection)
+
+    async def checkout(self):
+        """Borrow (pool, connection) for the current request: a replica for GET/HEAD when configured"""
+        if self.pool is None:
+            await self.open()
+        replicas = self.replicas
+        if replicas is not None and has_request_context() and request.method in ('GET', 'HEAD'):
+            for index in replicas.candidates():
+                pool = replicas.pools[index]
+                try:
+                    connection = await self.acquire(pool=pool)
+                except PoolExhausted:
+                    raise
+                except Exception:
+                    replicas.mark_down(index)
+                    continue
+                replicas.mark_up(index)
+                return pool, connection
+            replicas.failover()
+        return self.pool, await self.acquire()
+
+    async def connection(self):
+        """The connection borrowed by the current app context"""
+        if 'mysql_connection' not in g:
+            g.mysql_owner, g.mysql_connection = await self.checkout()
+            g.mysql_view = AsyncTimedConnection(g.mysql_connection, current_timing)
+        return g.mysql_view
+
+    async def teardown(self, exception):
+        g.pop('mysql_view', None)
+        pool = g.pop('mysql_owner', None)
+        connection = g.pop('mysql_connection', None)
+        if connection is not None:
+            await self.release(connection, pool)
+
+    async def _status(self, pool):
+        """Sizing plus a health flag for one pool, without waiting for it when busy"""
+        healthy = True
+        if pool.freesize or pool.size < pool.maxsize:
+            try:
+                connection = await self.acquire(timeout=0.1, pool=pool)
+            except PoolExhausted:
+                pass
+            except Exception:
+                healthy = False
+            else:
+                try:
+                    await connection.ping(reconnect=False)
+                except Exception:
+                    healthy = False
+                await self.release(connection, pool)
+        return {
+            'size': pool.size,
+            'idle': pool.freesize,
+            'in_use': pool.size - pool.freesize,
+            'min_size': pool.minsize,
+            'max_size': pool.maxsize,
+            'healthy': healthy,
+        }
+
+    async def pool_status(self):
+        """Pool sizing plus a database health flag, per replica too"""
+        pool = self.pool or await self.open()
+        status = await self._status(pool)
+        replicas = self.replicas
+        if replicas is not None:
+            status['replicas'] = []
+            for index, replica_pool in enumerate(replicas.pools):
+                replica = await self._status(replica_pool)
+                if replica['healthy']:
+                    replicas.mark_up(index)
+                elif not replicas.is_down(index):
+                    replicas.mark_down(index)
+                replica['marked_down'] = replicas.is_down(index)
+                status['replicas'].append(replica)
+            status['replica_failovers'] = replicas.failovers
+        return status
+
+
+db = AsyncMySQLPool(asgi_app)
+
+# This process's own per-route metrics, served by /metrics
+metrics = Metrics()
+
+# ========== INSTRUMENTATION ==========
+def current_timing():
+    """The RequestTiming of the current request, or None when metrics are off"""
+    return g.get('request_timing')
+
+# SQL log and slow-request warnings go to the 'asgi_app.profile' logger
+profile_log = asgi_app.logger.getChild('profile')
+
+@asgi_app.before_request
+async def start_timing():
+    if asgi_app.config['METRICS_ENABLED'] or asgi_app.config['PROFILE_ENABLED']:
+        g.request_timing = RequestTiming()
+    if asgi_app.config['PROFILE_ENABLED']:
+        # cProfile samples are WSGI-only: coroutines of other requests would run under it
+        profile_log.setLevel('INFO')
+        g.request_timing.statements = []
+
+@asgi_app.after_request
+async def finish_timing(response):
+    """Add the Server-Timing header and record the request in metrics"""
+    timing = g.pop('request_timing', None)
+    if timing is None:
+        return response
+
+    total = time.perf_counter() - timing.started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if timing.statements is not None:
+        profiling.finish(asgi_app.config, profile_log, request.method, request.path,
+                         route, timing, total)
+    if asgi_app.config['METRICS_ENABLED']:
+        response.headers['Server-Timing'] = timing.server_timing(total)
+        metrics.observe(request.method, route, response.status_code, total, timing)
+    return response
+
+# ========== RESPONSE COMPRESSION ==========
+@asgi_app.after_request
+async def compress(response):
+    """Compress JSON/XML/NDJSON bodies for the client's Accept-Encoding"""
+    return await compression.acompress_response(response, request.accept_encodings, asgi_app.config)
+
+# ========== JWT AUTHENTICATION DECORATOR ==========
+def token_required(f):
+    """Protect routes with JWT token; the decoded claims are stored on g.jwt_claims"""
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        token = request.args.get('token')
+        if not token:
+            return jsonify({'error': 'Token is missing!'}), 401
+
+        try:
+            g.jwt_claims = decode_token(token, asgi_app.config['SECRET_KEY'])
+        except jwt.ExpiredSignatureError:
+            return jsonify({'error': 'Token has expired!'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'error': 'Invalid token!'}), 401
+
+        return await f(*args, **kwargs)
+    return decorated
+
+# ========== RESOURCE CACHE HELPERS ==========
+async def fetch_row(table, key, row_id):
+    """Read one row by primary key through resource_cache (misses are not cached)"""
+    cache_id = cache_key(table, row_id)
+    row = resource_cache.get(cache_id)
+    if row is None:
+        conn = await db.connection()
+        cur = await conn.cursor()
+        await cur.execute(f"SELECT * FROM {table} WHERE {key} = %s", (row_id,))
+        row = await cur.fetchone()
+        await cur.close()
+        if row:
+            resource_cache.set(cache_id, row)
+    return row
+
+# ========== XML/JSON RESPONSE FORMATTER ==========
+async def format_response(data, status_code=200, etag=None):
+    """
+    Return response in JSON or XML based on 'format' query parameter
+    Successful GETs carry an ETag (a hash of the body unless one is passed in)
+    """
+    fmt = request.args.get('format', 'json').lower()
+    started = time.perf_counter()
+
+    if fmt == 'xml':
+        response = Response(
+            xml_encoder.to_xml(data, root='response'),
+            status=status_code,
+            mimetype='application/xml'
+        )
+    else:
+        response = jsonify(data)
+        response.status_code = status_code
+
+    timing = current_timing()
+    if timing is not None:
+        timing.serialize_seconds += time.perf_counter() - started
+
+    return await make_conditional(response, etag)
+
+# ========== CONDITIONAL GET (ETAG) HELPERS ==========
+async def make_conditional(response, etag=None):
+    """
+    Attach a strong ETag to a successful GET and turn it into a 304
+    when it matches If-None-Match
+    """
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+        return response
+
+    etag = etag or generate_etag(await response.get_data())
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    response.set_etag(etag)
+    return response
+
+async def table_versions_etag(*tables):
+    """Build a collection ETag from the per-table version markers (see app.py)"""
+    if not asgi_app.config['ETAG_TABLE_VERSIONS']:
+        return None
+
+    placeholders = ", ".join(["%s"] * len(tables))
+    conn = await db.connection()
+    cur = await conn.cursor()
+    await cur.execute(
+        f"SELECT table_name, version FROM table_version WHERE table_name IN ({placeholders})",
+        tables
+    )
+    versions = sorted((row['table_name'], row['version']) for row in await cur.fetchall())
+    await cur.close()
+
+    return versions_etag(request.path, request.args, versions)
+
+async def bump_versions(cur, *tables):
+    """Advance the version markers of tables in the caller's transaction (see app.py)"""
+    if asgi_app.config['ETAG_TABLE_VERSIONS']:
+        await cur.execute(*version_bump(tables))
+
+def not_modified(etag):
+    """Return a 304 response when the client already has etag, otherwise None (see app.py)"""
+    if etag and request.if_none_match.contains_weak(etag):
+        response = Response('', status=304, mimetype=variant_mimetype(request.args))
+        response.set_etag(etag)
+        return response
+    return None
+
+# ========== STREAMING RESPONSES ==========
+async def iter_rows(cur, batch_size):
+    """Yield rows from a server-side cursor batch_size at a time with fetchmany"""
+    while True:
+        rows = await cur.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield row
+
+async def stream_collection(name, query, params, etag=None):
+    """
+    Stream a list endpoint from a server-side cursor in constant memory
+    Same ?format=ndjson / ?stream=1 / ?stream=1&format=xml bodies as app.py
+    The stream outlives the request context, so it holds its own pooled connection
+    """
+    pool, conn = await db.checkout()
+    try:
+        cur = await conn.cursor(aiomysql.SSDictCursor)
+        await cur.execute(query, params)
+    except Exception:
+        await db.release(conn, pool)
+        raise
+    batch_size = asgi_app.config['STREAM_BATCH_SIZE']
+    fmt = request.args.get('format', 'json').lower()
+    ndjson = fmt == 'ndjson'
+    dumps = asgi_app.json.dumps
+
+    async def generate_xml():
+        try:
+            async for chunk in xml_encoder.aiter_xml_collection(name, iter_rows(cur, batch_size)):
+                yield chunk
+        finally:
+            await cur.close()
+            await db.release(conn, pool)
+
+    async def generate():
+        count = 0
+        try:
+            if not ndjson:
+                yield '{"%s": [' % name
+            async for row in iter_rows(cur, batch_size):
+                if ndjson:
+                    yield dumps(row) + '\n'
+                else:
+                    yield (',' if count else '') + dumps(row)
+                count += 1
+            if ndjson:
+                yield dumps({'count': count}) + '\n'
+            else:
+                yield '], "count": %d}' % count
+        finally:
+            await cur.close()
+            await db.release(conn, pool)
+
+    if fmt == 'xml':
+        response = Response(generate_xml(), mimetype='application/xml')
+    else:
+        mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+        response = Response(generate(), mimetype=mimetype)
+    # Quart cuts bodies off after RESPONSE_TIMEOUT (60s) once the 200 is out; streams run to the end, as in app.py
+    response.timeout = None
+    if etag:
+        response.set_etag(etag)
+    return response
+
+# ========== AUTHENTICATION ENDPOINTS ==========
+@asgi_app.route('/login', methods=['POST'])
+async def login():
+    """
+    Authenticate user and return JWT token
+    POST /login with JSON: {"username": "admin", "password": "password"}
+    """
+    data = await request.get_json()
+
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    username = data.get('username')
+    password = data.get('password')
+
+    if username == DEMO_USER['username'] and password == DEMO_USER['password']:
+        token = jwt.encode({
+            'user': username,
+            'exp': datetime.utcnow() + timedelta(hours=1)
+        }, asgi_app.config['SECRET_KEY'], algorithm="HS256")
+
+        return jsonify({
+            'message': 'Login successful',
+            'token': token,
+            'user': username
+        }), 200
+
+    return jsonify({'error': 'Invalid username or password'}), 401
+
+@asgi_app.route('/auth-test', methods=['GET'])
+@token_required
+async def auth_test():
+    """Test endpoint to verify JWT is working"""
+    return jsonify({'message': 'JWT authentication successful!', 'user': g.jwt_claims.get('user')})
+
+# ========== SHARED CRUD HELPERS ==========
+async def list_collection(name, table, key, search_columns):
+    """GET handler body for /customers and /maids: search, keyset pages, streaming"""
+    try:
+        page = parse_pagination(request.args)
+        fields = parse_fields(request.args, table)
+    except ValueError as e:
+        return await format_response({'error': str(e)}, 400)
+
+    etag = await table_versions_etag(table)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    query, params = collection_query(
+        table, key, search_columns,
+        request.args.get('q'), page, asgi_app.config['SEARCH_FULLTEXT'], fields
+    )
+
+    # Pages are already bounded, so only unpaged lists are streamed
+    if page[0] is None and wants_stream(request.args):
+        return await stream_collection(name, query, tuple(params), etag=etag)
+
+    conn = await db.connection()
+    cur = await conn.cursor()
+    await cur.execute(query, tuple(params))
+    rows = await cur.fetchall()
+    await cur.close()
+
+    return await format_response(page_envelope(name, rows, key, page), etag=etag)
+
+async def insert_one(table, columns, values, track_sales=False):
+    """
+    INSERT one row and return (new_id, None) or (None, error_response)
+    track_sales: the row is an order, so add it to daily_sales in the same transaction
+    """
+    conn = await db.connection()
+    cur = await conn.cursor()
+    try:
+        await cur.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})",
+            values
+        )
+        new_id = cur.lastrowid
+        if track_sales:
+            await record_new_orders(cur, [new_id])
+        await bump_versions(cur, table)
+        await conn.commit()
+        await cur.close()
+        return new_id, None
+    except Exception as e:
+        await conn.rollback()
+        await cur.close()
+        return None, await format_response({'error': f'Database error: {str(e)}'}, 500)
+
+async def update_row(table, key, row_id, data, columns, label, report_unchanged=False,
+                     track_sales=False):
+    """
+    Partial UPDATE followed by a re-read of the row, written through to the cache
+    Returns (row, error_response); label names the resource in error messages
+    track_sales: the row is an order, so move its daily_sales totals in the same transaction
+    """
+    assignments, params = update_assignments(data, columns)
+
+    conn = await db.connection()
+    cur = await conn.cursor()
+    try:
+        rows_affected = 0
+        if assignments:
+            locked = await lock_order(cur, row_id) if track_sales else []
+            await cur.execute(
+                f"UPDATE {table} SET {assignments} WHERE {key} = %s",
+                (*params, row_id)
+            )
+            rows_affected = cur.rowcount
+
+        await cur.execute(f"SELECT * FROM {table} WHERE {key} = %s", (row_id,))
+        row = await cur.fetchone()
+
+        if assignments:
+            if track_sales:
+                await record_sales(cur, removed=locked, added=[row] if row else [])
+            if rows_affected:
+                await bump_versions(cur, table)
+            await conn.commit()
+        await cur.close()
+
+    except IntegrityError as e:
+        await conn.rollback()
+        await cur.close()
+        if mysql_errno(e) == ER_NO_REFERENCED_ROW:
+            # The message names the failing constraint column
+            if 'customer_id' in str(e):
+                return None, await format_response({'error': 'Customer not found'}, 404)
+            return None, await format_response({'error': 'Maid not found'}, 404)
+        return None, await format_response({'error': f'Database error: {str(e)}'}, 500)
+
+    except Exception as e:
+        await conn.rollback()
+        await cur.close()
+        return None, await format_response({'error': f'Database error: {str(e)}'}, 500)
+
+    if not row:
+        resource_cache.delete(cache_key(table, row_id))
+        return None, await format_response({'error': f'{label} not found'}, 404)
+
+    # Write-through: the row we just read is the freshest copy
+    resource_cache.set(cache_key(table, row_id), row)
+
+    if report_unchanged and rows_affected == 0:
+        return None, await format_response({'error': 'No changes made'}, 400)
+
+    return row, None
+
+async def delete_row(table, key, row_id, label, in_use_error=None, track_sales=False):
+    """
+    DELETE one row; foreign key refusals (errno 1451) become in_use_error with a 400
+    track_sales: the row is an order, so subtract it from daily_sales in the same transaction
+    """
+    conn = await db.connection()
+    cur = await conn.cursor()
+
+    try:
+        locked = await lock_order(cur, row_id) if track_sales else []
+        await cur.execute(f"DELETE FROM {table} WHERE {key} = %s", (row_id,))
+        rows_affected = cur.rowcount
+        await record_sales(cur, removed=locked)
+        if rows_affected:
+            await bump_versions(cur, table)
+        await conn.commit()
+        await cur.close()
+        resource_cache.delete(cache_key(table, row_id))
+
+        if rows_affected == 0:
+            return await format_response({'error': f'{label} not found'}, 404)
+
+        return await format_response({
+            'message': f'{label} deleted successfully',
+            key: row_id
+        })
+
+    except IntegrityError as e:
+        await conn.rollback()
+        await cur.close()
+        if in_use_error and mysql_errno(e) == ER_ROW_IS_REFERENCED:
+            return await format_response({'error': in_use_error}, 400)
+        return await format_response({'error': f'Database error: {str(e)}'}, 500)
+
+    except Exception as e:
+        await conn.rollback()
+        await cur.close()
+        return await format_response({'error': f'Database error: {str(e)}'}, 500)
+
+# ========== CUSTOMER CRUD ENDPOINTS ==========
+@asgi_app.route('/customers', methods=['GET'])
+@token_required
+async def get_customers():
+    """Get all customers with optional search, keyset pagination and streaming"""
+    return await list_collection('customers', 'customer', 'customer_id',
+                                 ('name', 'email', 'phone_number'))
+
+@asgi_app.route('/customers/<int:customer_id>', methods=['GET'])
+@token_required
+async def get_customer(customer_id):
+    """Get a specific customer by ID"""
+    try:
+        fields = parse_fields(request.args, 'customer')
+    except ValueError as e:
+        return await format_response({'error': str(e)}, 400)
+
+    customer = await fetch_row('customer', 'customer_id', customer_id)
+
+    if not customer:
+        return await format_response({'error': 'Customer not found'}, 404)
+
+    return await format_response(project(customer, fields))
+
+@asgi_app.route('/customers', methods=['POST'])
+@token_required
+async def create_customer():
+    """Create a new customer"""
+    data = await request.get_json()
+
+    if not data:
+        return await format_response({'error': 'No data provided'}, 400)
+
+    if not data.get('name'):
+        return await format_response({'error': 'Name is required'}, 400)
+
+    new_id, error = await insert_one('customer', ('name', 'email', 'phone_number'),
+                                     validate_customer(data))
+    if error:
+        return error
+
+    return await get_customer(new_id)
+
+@asgi_app.route('/customers/<int:customer_id>', methods=['PUT'])
+@token_required
+async def update_customer(customer_id):
+    """Update an existing customer (only the fields sent are written)"""
+    data = await request.get_json()
+
+    if not data:
+        return await format_response({'error': 'No data provided'}, 400)
+
+    customer, error = await update_row('customer', 'customer_id', customer_id, data,
+                                       ('name', 'email', 'phone_number'), 'Customer',
+                                       report_unchanged=True)
+    if error:
+        return error
+
+    return await format_response(customer)
+
+@asgi_app.route('/customers/<int:customer_id>', methods=['DELETE'])
+@token_required
+async def delete_customer(customer_id):
+    """Delete a customer; refused while the customer has orders"""
+    return await delete_row(
+        'customer', 'customer_id', customer_id, 'Customer',
+        'Cannot delete customer with existing orders. Delete orders first.'
+    )
+
+# ========== MAID CRUD ENDPOINTS ==========
+@asgi_app.route('/maids', methods=['GET'])
+@token_required
+async def get_maids():
+    """Get all maids with optional search, keyset pagination and streaming"""
+    return await list_collection('maids', 'maid', 'maid_id', ('name',))
+
+@asgi_app.route('/maids/<int:maid_id>', methods=['GET'])
+@token_required
+async def get_maid(maid_id):
+    """Get a specific maid by ID"""
+    try:
+        fields = parse_fields(request.args, 'maid')
+    except ValueError as e:
+        return await format_response({'error': str(e)}, 400)
+
+    maid = await fetch_row('maid', 'maid_id', maid_id)
+
+    if not maid:
+        return await format_response({'error': 'Maid not found'}, 404)
+
+    return await format_response(project(maid, fields))
+
+@asgi_app.route('/maids', methods=['POST'])
+@token_required
+async def create_maid():
+    """Create a new maid"""
+    data = await request.get_json()
+
+    if not data:
+        return await format_response({'error': 'No data provided'}, 400)
+
+    if not data.get('name'):
+        return await format_response({'error': 'Name is required'}, 400)
+
+    new_id, error = await insert_one('maid', ('name', 'shift_start_time', 'shift_end_time'),
+                                     validate_maid(data))
+    if error:
+        return error
+    shift_index.invalidate()
+
+    return await get_maid(new_id)
+
+@asgi_app.route('/maids/<int:maid_id>', methods=['PUT'])
+@token_required
+async def update_maid(maid_id):
+    """Update an existing maid (only the fields sent are written)"""
+    data = await request.get_json()
+
+    if not data:
+        return await format_response({'error': 'No data provided'}, 400)
+
+    maid, error = await update_row('maid', 'maid_id', maid_id, data,
+                                   ('name', 'shift_start_time', 'shift_end_time'), 'Maid')
+    shift_index.invalidate()
+    if error:
+        return error
+
+    return await format_response(maid)
+
+@asgi_app.route('/maids/<int:maid_id>', methods=['DELETE'])
+@token_required
+async def delete_maid(maid_id):
+    """Delete a maid; refused while the maid has orders"""
+    response = await delete_row(
+        'maid', 'maid_id', maid_id, 'Maid',
+        'Cannot delete maid with existing orders. Delete orders first.'
+    )
+    shift_index.invalidate()
+    return response
+
+# ========== ON-SHIFT LOOKUPS ==========
+async def load_shift_index():
+    """shift_index (shared with app.py), reloaded from the maid table first when stale"""
+    if shift_index.stale():
+        generation = shift_index.generation
+        conn = await db.connection()
+        cur = await conn.cursor()
+        await cur.execute("SELECT maid_id, name, shift_start_time, shift_end_time FROM maid")
+        shift_index.load(await cur.fetchall(), generation)
+        await cur.close()
+    return shift_index
+
+@asgi_app.route('/maids/on-shift', methods=['GET'])
+@token_required
+async def maids_on_shift():
+    """Maids working at ?at= or during ?from=&to=; same parameters as app.py"""
+    try:
+        start, end = parse_shift_window(request.args)
+    except ValueError as e:
+        return await format_response({'error': str(e)}, 400)
+
+    maids = (await load_shift_index()).overlapping(start, end)
+
+    return await format_response({**shift_window(start, end), 'maids': maids, 'count': len(maids)})
+
+# ========== ORDER CRUD ENDPOINTS ==========
+async def embed_includes(orders, include):
+    """Attach each included relation to orders with one batched lookup per relation"""
+    for name in include:
+        rows = ()
+        lookup = related_query(name, orders)
+        if lookup:
+            conn = await db.connection()
+            cur = await conn.cursor()
+            await cur.execute(*lookup)
+            rows = await cur.fetchall()
+            await cur.close()
+        orders = attach_related(orders, name, rows)
+    return orders
+
+@asgi_app.route('/orders', methods=['GET'])
+@token_required
+async def get_orders():
+    """Get all orders with the same filters, keyset pagination, streaming and include as app.py"""
+    try:
+        page = parse_pagination(request.args)
+        include = parse_include(request.args)
+        fields = include_fields(parse_fields(request.args, 'orders'), include)
+    except ValueError as e:
+        return await format_response({'error': str(e)}, 400)
+
+    streaming = page[0] is None and wants_stream(request.args)
+    if streaming and include:
+        return await format_response(
+            {'error': 'include cannot be combined with streaming; page with limit/after instead'}, 400
+        )
+
+    etag = await table_versions_etag('orders', *(ORDER_INCLUDES[name][0] for name in include))
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    where, params = order_filters(request.args)
+    query = apply_keyset(f"SELECT {select_list(fields)} FROM orders" + where,
+                         params, 'order_id', page)
+
+    if streaming:
+        return await stream_collection('orders', query, tuple(params), etag=etag)
+
+    conn = await db.connection()
+    cur = await conn.cursor()
+    await cur.execute(query, tuple(params))
+    orders = await cur.fetchall()
+    await cur.close()
+
+    envelope = page_envelope('orders', orders, 'order_id', page)
+    if include:
+        envelope['orders'] = await embed_includes(envelope['orders'], include)
+
+    return await format_response(envelope, etag=etag)
+
+@asgi_app.route('/orders/stats', methods=['GET'])
+@token_required
+async def order_stats():
+    """Aggregate orders in MySQL; same group_by values and filters as app.py"""
+    group_by, unknown = parse_group_by(request.args)
+    if unknown:
+        return await format_response({
+            'error': f"Unknown group_by value(s): {', '.join(unknown)}",
+            'allowed': sorted(STATS_GROUPS)
+        }, 400)
+
+    etag = await table_versions_etag('orders')
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    where, params = order_filters(request.args)
+
+    conn = await db.connection()
+    cur = await conn.cursor()
+    await cur.execute(stats_query(group_by, where), tuple(params))
+    stats = await cur.fetchall()
+    await cur.close()
+
+    return await format_response(stats_envelope(group_by, stats), etag=etag)
+
+@asgi_app.route('/orders/<int:order_id>', methods=['GET'])
+@token_required
+async def get_order(order_id):
+    """Get a specific order by ID, with include=customer,maid to embed the related rows"""
+    try:
+        include = parse_include(request.args)
+        fields = include_fields(parse_fields(request.args, 'orders'), include)
+    except ValueError as e:
+        return await format_response({'error': str(e)}, 400)
+
+    order = await fetch_row('orders', 'order_id', order_id)
+
+    if not order:
+        return await format_response({'error': 'Order not found'}, 404)
+
+    order = project(order, fields)
+    for name in include:
+        table, key = ORDER_INCLUDES[name]
+        related = await fetch_row(table, key, order[key])
+        order = attach_related([order], name, [related] if related else [])[0]
+
+    return await format_response(order)
+
+@asgi_app.route('/orders', methods=['POST'])
+@token_required
+async def create_order():
+    """Create a new order"""
+    data = await request.get_json()
+
+    if not data:
+        return await format_response({'error': 'No data provided'}, 400)
+
+    customer_id = data.get('customer_id')
+    maid_id = data.get('maid_id')
+
+    if not customer_id or not maid_id:
+        return await format_response(
+            {'error': 'Both customer_id and maid_id are required'},
+            400
+        )
+
+    conn = await db.connection()
+    cur = await conn.cursor()
+
+    await cur.execute("SELECT * FROM customer WHERE customer_id = %s", (customer_id,))
+    if not await cur.fetchone():
+        await cur.close()
+        return await format_response({'error': 'Customer not found'}, 404)
+
+    await cur.execute("SELECT * FROM maid WHERE maid_id = %s", (maid_id,))
+    if not await cur.fetchone():
+        await cur.close()
+        return await format_response({'error': 'Maid not found'}, 404)
+    await cur.close()
+
+    new_id, error = await insert_one('orders', ('customer_id', 'maid_id', 'total_amount'),
+                                     (customer_id, maid_id, data.get('total_amount', 0.0)),
+                                     track_sales=True)
+    if error:
+        return error
+
+    return await get_order(new_id)
+
+@asgi_app.route('/orders/<int:order_id>', methods=['PUT'])
+@token_required
+async def update_order(order_id):
+    """Update an existing order; unknown customer/maid references come back as 404"""
+    data = await request.get_json()
+
+    if not data:
+        return await format_response({'error': 'No data provided'}, 400)
+
+    missing = null_reference(data)
+    if missing:
+        return await format_response({'error': missing}, 404)
+
+    order, error = await update_row('orders', 'order_id', order_id, data,
+                                    ('customer_id', 'maid_id', 'total_amount'), 'Order',
+                                    track_sales=True)
+    if error:
+        return error
+
+    return await format_response(order)
+
+@asgi_app.route('/orders/<int:order_id>', methods=['DELETE'])
+@token_required
+async def delete_order(order_id):
+    """Delete an order"""
+    return await delete_row('orders', 'order_id', order_id, 'Order', track_sales=True)
+
+# ========== DAILY SALES SUMMARY ==========
+async def record_sales(cur, removed=(), added=()):
+    """Apply the daily_sales deltas of an order write inside its transaction (no-op unless SALES_SUMMARY)"""
+    if not asgi_app.config['SALES_SUMMARY']:
+        return
+    for statement, params in sales_statements(sales_deltas(removed, added),
+                                              asgi_app.config['INSERT_CHUNK_ROWS']):
+        await cur.execute(statement, params)
+
+async def record_new_orders(cur, ids):
+    """record_sales for just-inserted orders, read back for their defaulted order_date"""
+    if not asgi_app.config['SALES_SUMMARY']:
+        return
+    await cur.execute(*ids_query('orders', 'order_id', ids, '*'))
+    await record_sales(cur, added=await cur.fetchall())
+
+async def lock_order(cur, order_id):
+    """Read an order FOR UPDATE before changing it; [] or [row], always [] unless SALES_SUMMARY"""
+    if not asgi_app.config['SALES_SUMMARY']:
+        return []
+    await cur.execute("SELECT * FROM orders WHERE order_id = %s FOR UPDATE", (order_id,))
+    order = await cur.fetchone()
+    return [order] if order else []
+
+@asgi_app.route('/orders/daily-sales', methods=['GET'])
+@token_required
+async def daily_sales():
+    """Order count and revenue per day, maid and/or customer; same parameters as app.py"""
+    group_by = [g.strip() for g in request.args.get('group_by', 'day').split(',') if g.strip()]
+    unknown = [g for g in group_by if g not in SALES_GROUPS]
+    if unknown:
+        return await format_response({
+            'error': f"Unknown group_by value(s): {', '.join(unknown)}",
+            'allowed': list(SALES_GROUPS)
+        }, 400)
+
+    try:
+        query, params = sales_query(group_by, request.args, asgi_app.config['SALES_SUMMARY'])
+    except ValueError as e:
+        return await format_response({'error': str(e)}, 400)
+
+    etag = await table_versions_etag('orders')
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    conn = await db.connection()
+    cur = await conn.cursor()
+    await cur.execute(query, params)
+    sales = await cur.fetchall()
+    await cur.close()
+
+    return await format_response(stats_envelope(group_by, sales), etag=etag)
+
+# ========== BATCH CREATE ENDPOINTS ==========
+async def read_batch():
+    """
+    Read a JSON array of rows from the request body
+    Returns (rows, None) or (None, error_response)
+    """
+    data = await request.get_json(silent=True)
+
+    error = check_batch(data, asgi_app.config['BATCH_MAX_ROWS'])
+    if error:
+        return None, await format_response({'error': error}, 400)
+
+    return data, None
+
+async def existing_ids(cur, table, key, ids):
+    """Return the subset of ids present in table, using one IN (...) query"""
+    lookup = ids_query(table, key, ids)
+    if lookup is None:
+        return set()
+    await cur.execute(*lookup)
+    return {row[key] for row in await cur.fetchall()}
+
+async def create_batch(table, key, columns, valid, errors, cur=None, after_insert=None):
+    """
+    Insert the valid rows in one transaction and build the batch response
+    after_insert(cur, new_ids) is awaited in the same transaction before the commit
+    """
+    if not valid:
+        return await format_response({'created': [], 'errors': errors, 'count': 0}, 400)
+
+    conn = await db.connection()
+    cur = cur or await conn.cursor()
+    try:
+        # Same ID rules as app.insert_rows
+        if not autoinc_settings:
+            await cur.execute(AUTOINC_QUERY)
+            autoinc_settings.update(await cur.fetchone())
+        step = autoinc_step(autoinc_settings)
+
+        new_ids = []
+        for statement, params, count in insert_chunks(
+                table, columns, [values for _, values in valid],
+                asgi_app.config['INSERT_CHUNK_ROWS'] if step else 1):
+            await cur.execute(statement, params)
+            new_ids.extend(batch_ids(cur.lastrowid, count, step or 1))
+        if after_insert:
+            await after_insert(cur, new_ids)
+        await bump_versions(cur, table)
+        await conn.commit()
+        await cur.close()
+    except Exception as e:
+        await conn.rollback()
+        await cur.close()
+        return await format_response({'error': f'Database error: {str(e)}'}, 500)
+
+    return await format_response(batch_envelope(key, valid, new_ids, errors))
+
+@asgi_app.route('/customers/batch', methods=['POST'])
+@token_required
+async def create_customers_batch():
+    """Create many customers in one transaction"""
+    rows, error = await read_batch()
+    if error:
+        return error
+
+    valid, errors = validate_rows(rows, validate_customer)
+    return await create_batch('customer', 'customer_id',
+                              ('name', 'email', 'phone_number'), valid, errors)
+
+@asgi_app.route('/maids/batch', methods=['POST'])
+@token_required
+async def create_maids_batch():
+    """Create many maids in one transaction"""
+    rows, error = await read_batch()
+    if error:
+        return error
+
+    valid, errors = validate_rows(rows, validate_maid)
+    response = await create_batch('maid', 'maid_id',
+                                  ('name', 'shift_start_time', 'shift_end_time'), valid, errors)
+    shift_index.invalidate()
+    return response
+
+@asgi_app.route('/orders/batch', methods=['POST'])
+@token_required
+async def create_orders_batch():
+    """Create many orders in one transaction, checking references once per table"""
+    rows, error = await read_batch()
+    if error:
+        return error
+
+    valid, errors = validate_rows(rows, validate_order)
+
+    conn = await db.connection()
+    cur = await conn.cursor()
+    customers = await existing_ids(cur, 'customer', 'customer_id', [v[0] for _, v in valid])
+    maids = await existing_ids(cur, 'maid', 'maid_id', [v[1] for _, v in valid])
+    checked = check_references(valid, errors, customers, maids)
+
+    if not checked:
+        await cur.close()
+    return await create_batch('orders', 'order_id',
+                              ('customer_id', 'maid_id', 'total_amount'), checked, errors, cur,
+                              after_insert=record_new_orders)
+
+# ========== EXPORT JOBS ==========
+# Jobs run on app.py's export_jobs threads, so both modes share one job directory
+@asgi_app.route('/exports', methods=['POST'])
+@token_required
+async def create_export():
+    """Start a background export of orders; same body and 202 reply as app.py"""
+    data = await request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return await format_response({'error': 'Expected a JSON object'}, 400)
+
+    try:
+        fmt, query, params = export_query(data)
+    except ValueError as e:
+        return await format_response({'error': str(e)}, 400)
+
+    job = export_jobs.submit(query, params, fmt)
+    response = await format_response(export_status(job), 202)
+    response.headers['Location'] = f"/exports/{job['id']}"
+    return response
+
+@asgi_app.route('/exports/<job_id>', methods=['GET'])
+@token_required
+async def get_export(job_id):
+    """Status of an export job"""
+    job = export_jobs.get(job_id)
+    if not job:
+        return await format_response({'error': 'Export not found'}, 404)
+    return await format_response(export_status(job))
+
+@asgi_app.route('/exports/<job_id>/download', methods=['GET'])
+@token_required
+async def download_export(job_id):
+    """Download a finished export file"""
+    job = export_jobs.get(job_id)
+    if not job:
+        return await format_response({'error': 'Export not found'}, 404)
+    if job['status'] != 'done':
+        return await format_response({'error': 'Export is not finished', 'status': job['status']}, 409)
+
+    response = await send_file(export_jobs.file_path(job), mimetype=exports.MIMETYPES[job['format']],
+                               as_attachment=True, attachment_filename=f"orders-{job['id']}.{job['format']}")
+    response.timeout = None
+    return response
+
+# ========== BULK CSV IMPORT ==========
+# app.run_import does blocking MySQLdb work on its own connection, so it runs in a worker thread
+@asgi_app.route('/imports/<name>', methods=['POST'])
+@token_required
+async def create_import(name):
+    """Bulk-load customers or orders from a CSV upload; same body and reply as app.py"""
+    if name not in IMPORTS:
+        return await format_response({'error': f"Unknown import: {name}. Allowed: {', '.join(IMPORTS)}"}, 404)
+
+    upload = (await request.files).get('file')
+    if upload:
+        raw = upload.stream
+    else:
+        # Spool the body to disk so the thread reads a file, not the event loop's stream
+        raw = tempfile.TemporaryFile()
+        limit = asgi_app.config['IMPORT_MAX_BYTES']
+        async for data in request.body:
+            raw.write(data)
+            # Quart checks Content-Length up front, but only the unread buffer of a chunked body
+            if limit is not None and raw.tell() > limit:
+                raw.close()
+                raise RequestEntityTooLarge()
+        raw.seek(0)
+    stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+
+    try:
+        summary = await asyncio.to_thread(run_import, name, stream, import_rejects_path(name))
+    except ValueError as e:
+        return await format_response({'error': str(e)}, 400)
+    except Exception as e:
+        return await format_response({'error': f'Database error: {str(e)}'}, 500)
+    finally:
+        stream.close()
+
+    return await format_response(summary)
+
+# ========== CACHE STATS ENDPOINT ==========
+@asgi_app.route('/cache/stats', methods=['GET'])
+@token_required
+async def cache_stats():
+    """Hit/miss counters of the single-resource and JWT caches, for sizing them"""
+    return await format_response({
+        'resources': resource_cache.stats(),
+        'tokens': token_cache.stats()
+    })
+
+# ========== HEALTH & INFO ENDPOINTS ==========
+@asgi_app.route('/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint; reports connection pool state"""
+    try:
+        pool = await db.pool_status()
+        db_status = 'connected' if pool['healthy'] else 'disconnected'
+    except Exception:
+        pool = None
+        db_status = 'disconnected'
+
+    return jsonify({
+        'status': 'healthy',
+        'service': 'Maid Cafe REST API',
+        'database': db_status,
+        'pool': pool,
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+@asgi_app.route('/metrics', methods=['GET'])
+async def metrics_endpoint():
+    """Prometheus scrape endpoint: per-route latency histograms, DB/serialization time"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@asgi_app.route('/api-info', methods=['GET'])
+async def api_info():
+    """API information endpoint"""
+    return jsonify(API_INFO)
+
+# ========== ERROR HANDLERS ==========
+@asgi_app.errorhandler(404)
+async def not_found(error):
+    return await format_response({'error': 'Resource not found'}, 404)
+
+@asgi_app.errorhandler(500)
+async def internal_error(error):
+    return await format_response({'error': 'Internal server error'}, 500)
+
+@asgi_app.errorhandler(PoolExhausted)
+async def pool_exhausted(error):
+    return await format_response({'error': 'Database is busy, please retry'}, 503)
+
+@asgi_app.errorhandler(400)
+async def bad_request(error):
+    return await format_response({'error': 'Bad request'}, 400)
+
+# ========== RUN APPLICATION ==========
+if __name__ == '__main__':
+    asgi_app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,57 @@
+"""
+Benchmark the in-house XML encoder against dicttoxml
+Run with: python benchmarks/bench_xml.py [rows ...]   (default: 10000 100000)
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dicttoxml
+import xml_encoder
+
+
+def make_orders(n):
+    """Build n order rows shaped like the DictCursor output of GET /orders"""
+    start = datetime(2023, 1, 1, 9, 0, 0)
+    return [{
+        'order_id': i,
+        'customer_id': i % 500 + 1,
+        'maid_id': i % 12 + 1,
+        'order_date': start + timedelta(minutes=i),
+        'total_amount': Decimal('%d.%02d' % (i % 90 + 10, i % 100)),
+    } for i in range(1, n + 1)]
+
+
+def best_of(fn, repeat=3):
+    """Return the fastest of repeat timings of fn() in seconds"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(sizes):
+    print(f"{'rows':>8} {'dicttoxml':>12} {'xml_encoder':>12} {'speedup':>8}")
+    for n in sizes:
+        data = {'orders': make_orders(n), 'count': n}
+        
+        expected = dicttoxml.dicttoxml(data, custom_root='response', attr_type=False, root=True)
+        if xml_encoder.to_xml(data) != expected:
+            raise SystemExit(f'Output mismatch at {n} rows')
+        
+        old = best_of(lambda: dicttoxml.dicttoxml(
+            data, custom_root='response', attr_type=False, root=True))
+        new = best_of(lambda: xml_encoder.to_xml(data))
+        print(f"{n:>8} {old:>11.3f}s {new:>11.3f}s {old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
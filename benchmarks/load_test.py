@@ -0,0 +1,461 @@
+"""
+Load-test every endpoint of the API and write latency, throughput and RSS to JSON
+Seeds MySQL with --customers/--maids/--orders rows, then drives each scenario
+with --concurrency workers for --requests requests and records p50/p95/p99
+latency, throughput and peak server RSS. Results are plain JSON so runs from
+two commits can be diffed with --compare.
+Run with: python benchmarks/load_test.py --url http://localhost:5000 --server-pid PID --out run.json
+          python benchmarks/load_test.py --in-process --out run.json   (Flask test client, same process)
+          python benchmarks/load_test.py --compare base.json run.json [--threshold 10]
+Seeding needs the database configured in app.py; a throwaway server works:
+          docker run -e MYSQL_ROOT_PASSWORD=root -e MYSQL_DATABASE=maid_cafe -p 3306:3306 mysql:8
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Seeded rows are tagged so --cleanup can find them again
+SEED_EMAIL_DOMAIN = '@load.test'
+SEED_MAID_PREFIX = 'Load Maid '
+
+
+# ========== SEEDING ==========
+def seed(connection, customers, maids, orders, rng):
+    """
+    Insert the requested volumes with app.insert_rows; returns the new ids per table
+    (multi-row INSERTs of INSERT_CHUNK_ROWS rows, or one per row where the server's
+    auto-increment settings do not make the ids predictable)
+    """
+    from app import insert_rows
+
+    first_names = ['Aying', 'Lucy', 'Mika', 'Hana', 'Yuki', 'Sora', 'Rin', 'Kaito', 'Ren', 'Aoi']
+
+    def insert(table, columns, rows):
+        cur = connection.cursor()
+        new_ids = insert_rows(cur, table, columns, rows)
+        connection.commit()
+        cur.close()
+        return new_ids
+
+    customer_ids = insert('customer', ('name', 'email', 'phone_number'), [
+        (f"{rng.choice(first_names)} {i}", f"customer{i}{SEED_EMAIL_DOMAIN}", f"0917{i:07d}")
+        for i in range(customers)
+    ])
+    maid_ids = insert('maid', ('name', 'shift_start_time', 'shift_end_time'), [
+        (f"{SEED_MAID_PREFIX}{i}", f"{8 + i % 8:02d}:00:00", f"{(16 + i % 8) % 24:02d}:00:00")
+        for i in range(maids)
+    ])
+    start = datetime(2023, 1, 1)
+    order_ids = insert('orders', ('customer_id', 'maid_id', 'order_date', 'total_amount'), [
+        (rng.choice(customer_ids), rng.choice(maid_ids),
+         start + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+         round(rng.uniform(5, 120), 2))
+        for _ in range(orders)
+    ])
+    return {'customer': customer_ids, 'maid': maid_ids, 'orders': order_ids}
+
+
+def cleanup(connection):
+    """Delete every seeded row (orders first, for the foreign keys)"""
+    cur = connection.cursor()
+    cur.execute(
+        "DELETE o FROM orders o JOIN customer c ON c.customer_id = o.customer_id"
+        " WHERE c.email LIKE %s", (f"%{SEED_EMAIL_DOMAIN}",)
+    )
+    cur.execute(
+        "DELETE o FROM orders o JOIN maid m ON m.maid_id = o.maid_id"
+        " WHERE m.name LIKE %s", (f"{SEED_MAID_PREFIX}%",)
+    )
+    cur.execute("DELETE FROM customer WHERE email LIKE %s", (f"%{SEED_EMAIL_DOMAIN}",))
+    cur.execute("DELETE FROM maid WHERE name LIKE %s", (f"{SEED_MAID_PREFIX}%",))
+    connection.commit()
+    cur.close()
+
+
+def connect_database():
+    """Open a MySQLdb connection with the settings in app.py"""
+    import MySQLdb
+    from MySQLdb.cursors import DictCursor
+    from app import app
+
+    return MySQLdb.connect(
+        host=app.config['MYSQL_HOST'],
+        user=app.config['MYSQL_USER'],
+        passwd=app.config['MYSQL_PASSWORD'],
+        db=app.config['MYSQL_DB'],
+        cursorclass=DictCursor
+    )
+
+
+# ========== CLIENTS ==========
+class HTTPClient:
+    """Keep-alive HTTP client; one per worker thread"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.connection = None
+
+    def request(self, method, path, body=None):
+        """Send one request and return (status, body bytes)"""
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        for attempt in (0, 1):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.connection.request(method, path, payload, headers)
+                response = self.connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection; reconnect once
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+
+class InProcessClient:
+    """Drives the Flask app through its test client, skipping the network"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.get_data()
+
+
+# ========== MEMORY SAMPLING ==========
+def read_rss_kb(pid):
+    """Current resident set size of pid in KiB (Linux /proc), or None"""
+    try:
+        with open(f'/proc/{pid}/status') as handle:
+            for line in handle:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+class RSSSampler:
+    """Background thread recording the peak RSS of a process"""
+
+    def __init__(self, pid, interval=0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.pid:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            rss = read_rss_kb(self.pid)
+            if rss is not None and (self.peak_kb is None or rss > self.peak_kb):
+                self.peak_kb = rss
+            if self._stop.wait(self.interval):
+                return
+
+
+# ========== SCENARIOS ==========
+def build_scenarios(ids, token, rng):
+    """
+    Return [(name, method, make_path, make_body)] covering every endpoint
+    Writes run in create -> update -> delete order so deletes consume the created rows
+    """
+    customers = ids['customer']
+    maids = ids['maid']
+    created = deque()
+    lock = threading.Lock()
+    auth = f"token={token}"
+
+    def pick(values):
+        with lock:
+            return rng.choice(values)
+
+    def fixed(path):
+        return lambda: path
+
+    def remember(status, body):
+        if status == 200:
+            created.append(json.loads(body)['customer_id'])
+
+    def pop_created():
+        with lock:
+            return created.popleft() if created else customers[0]
+
+    login = {'username': 'admin', 'password': 'password'}
+    search_term = 'Lucy'
+
+    return [
+        ('login', 'POST', fixed('/login'), lambda: login, None),
+        ('customers_list_json', 'GET', fixed(f'/customers?{auth}'), None, None),
+        ('customers_list_xml', 'GET', fixed(f'/customers?{auth}&format=xml'), None, None),
+        ('customers_page', 'GET', fixed(f'/customers?{auth}&limit=50'), None, None),
+        ('customers_search', 'GET', fixed(f'/customers?{auth}&q={search_term}'), None, None),
+        ('customers_stream', 'GET', fixed(f'/customers?{auth}&format=ndjson'), None, None),
+        ('customer_get_json', 'GET', lambda: f'/customers/{pick(customers)}?{auth}', None, None),
+        ('customer_get_xml', 'GET', lambda: f'/customers/{pick(customers)}?{auth}&format=xml', None, None),
+        ('maids_list_json', 'GET', fixed(f'/maids?{auth}'), None, None),
+        ('maids_search', 'GET', fixed(f'/maids?{auth}&q=Maid'), None, None),
+        ('maid_get_json', 'GET', lambda: f'/maids/{pick(maids)}?{auth}', None, None),
+        ('orders_list_json', 'GET', fixed(f'/orders?{auth}'), None, None),
+        ('orders_list_xml', 'GET', fixed(f'/orders?{auth}&format=xml'), None, None),
+        ('orders_page', 'GET', fixed(f'/orders?{auth}&limit=100'), None, None),
+        ('orders_filter', 'GET',
+         lambda: f'/orders?{auth}&maid_id={pick(maids)}&min_amount=20&max_amount=80', None, None),
+        ('orders_date_range', 'GET',
+         fixed(f'/orders?{auth}&start_date=2023-03-01&end_date=2023-03-31'), None, None),
+        ('orders_stats', 'GET', fixed(f'/orders/stats?{auth}&group_by=maid_id,month'), None, None),
+        ('order_get_json', 'GET', lambda: f'/orders/{pick(ids["orders"])}?{auth}', None, None),
+        ('customer_create', 'POST', fixed(f'/customers?{auth}'),
+         lambda: {'name': 'Load Created', 'email': f'created{SEED_EMAIL_DOMAIN}'}, remember),
+        ('customer_update', 'PUT', lambda: f'/customers/{pick(customers)}?{auth}',
+         lambda: {'phone_number': f'0918{rng.randrange(10 ** 7):07d}'}, None),
+        ('customer_delete', 'DELETE', lambda: f'/customers/{pop_created()}?{auth}', None, None),
+        ('order_create', 'POST', fixed(f'/orders?{auth}'),
+         lambda: {'customer_id': pick(customers), 'maid_id': pick(maids), 'total_amount': 25.5}, None),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, min(len(sorted_values), round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def run_scenario(make_client, scenario, requests, concurrency, pid):
+    """Issue requests calls of one scenario from concurrency workers and summarize them"""
+    name, method, make_path, make_body, on_response = scenario
+    remaining = iter(range(requests))
+    remaining_lock = threading.Lock()
+    latencies = []
+    statuses = Counter()
+    failures = Counter()
+    results_lock = threading.Lock()
+
+    def worker():
+        client = make_client()
+        local_latencies = []
+        local_statuses = Counter()
+        while True:
+            with remaining_lock:
+                if next(remaining, None) is None:
+                    break
+            path = make_path()
+            body = make_body() if make_body else None
+            started = time.perf_counter()
+            try:
+                status, payload = client.request(method, path, body)
+            except Exception as e:
+                with results_lock:
+                    failures[type(e).__name__] += 1
+                continue
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] += 1
+            if on_response:
+                on_response(status, payload)
+        with results_lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    with RSSSampler(pid) as sampler:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(worker)
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    errors = sum(count for status, count in statuses.items() if status >= 500)
+    return {
+        'requests': len(latencies),
+        'errors': errors + sum(failures.values()),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'failures': dict(failures),
+        'elapsed_seconds': round(elapsed, 4),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'p50': round(percentile(ms, 0.50), 3) if ms else None,
+            'p95': round(percentile(ms, 0.95), 3) if ms else None,
+            'p99': round(percentile(ms, 0.99), 3) if ms else None,
+            'mean': round(sum(ms) / len(ms), 3) if ms else None,
+            'max': round(ms[-1], 3) if ms else None,
+        },
+        'peak_rss_mb': round(sampler.peak_kb / 1024, 2) if sampler.peak_kb else None,
+    }
+
+
+def git_revision():
+    """Short commit hash of the working tree, or None outside a checkout"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ========== COMPARISON ==========
+def compare(base_path, run_path, threshold):
+    """Print p95 latency and throughput changes per scenario; True if any regressed"""
+    with open(base_path) as handle:
+        base = json.load(handle)['scenarios']
+    with open(run_path) as handle:
+        run = json.load(handle)['scenarios']
+
+    regressed = False
+    print(f"{'scenario':<22} {'p95 base':>10} {'p95 run':>10} {'change':>8} "
+          f"{'rps base':>10} {'rps run':>10} {'change':>8}")
+    for name in sorted(set(base) & set(run)):
+        old, new = base[name], run[name]
+        old_p95, new_p95 = old['latency_ms']['p95'], new['latency_ms']['p95']
+        old_rps, new_rps = old['throughput_rps'], new['throughput_rps']
+        if not (old_p95 and new_p95 and old_rps and new_rps):
+            continue
+        p95_change = (new_p95 - old_p95) / old_p95 * 100
+        rps_change = (new_rps - old_rps) / old_rps * 100
+        flag = ''
+        if p95_change > threshold or rps_change < -threshold or new['errors'] > old['errors']:
+            regressed = True
+            flag = '  REGRESSION'
+        print(f"{name:<22} {old_p95:>9.2f}ms {new_p95:>9.2f}ms {p95_change:>+7.1f}% "
+              f"{old_rps:>10.1f} {new_rps:>10.1f} {rps_change:>+7.1f}%{flag}")
+    return regressed
+
+
+# ========== ENTRY POINT ==========
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', default='http://localhost:5000', help='base URL of a running server')
+    target.add_argument('--in-process', action='store_true',
+                        help='drive app.py through the Flask test client in this process')
+    parser.add_argument('--server-pid', type=int, help='server process to sample RSS from')
+    parser.add_argument('--customers', type=int, default=10000)
+    parser.add_argument('--maids', type=int, default=50)
+    parser.add_argument('--orders', type=int, default=100000)
+    parser.add_argument('--no-seed', action='store_true', help='reuse rows from an earlier run')
+    parser.add_argument('--cleanup', action='store_true', help='delete seeded rows afterwards')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--only', help='comma-separated scenario names to run')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for data and request mix')
+    parser.add_argument('--out', default='load_test_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'RUN'),
+                        help='diff two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='percent p95/throughput change counted as a regression')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    rng = random.Random(args.seed)
+    connection = connect_database()
+    if args.no_seed:
+        cur = connection.cursor()
+        cur.execute("SELECT customer_id FROM customer WHERE email LIKE %s", (f"%{SEED_EMAIL_DOMAIN}",))
+        customers = [row['customer_id'] for row in cur.fetchall()]
+        cur.execute("SELECT maid_id FROM maid WHERE name LIKE %s", (f"{SEED_MAID_PREFIX}%",))
+        maids = [row['maid_id'] for row in cur.fetchall()]
+        cur.execute("SELECT order_id FROM orders WHERE maid_id IN (SELECT maid_id FROM maid"
+                    " WHERE name LIKE %s)", (f"{SEED_MAID_PREFIX}%",))
+        ids = {'customer': customers, 'maid': maids,
+               'orders': [row['order_id'] for row in cur.fetchall()]}
+        cur.close()
+    else:
+        print(f"Seeding {args.customers} customers, {args.maids} maids, {args.orders} orders")
+        ids = seed(connection, args.customers, args.maids, args.orders, rng)
+
+    if args.in_process:
+        from app import app
+        make_client = lambda: InProcessClient(app)
+        pid = os.getpid()
+        target = 'in-process'
+    else:
+        make_client = lambda: HTTPClient(args.url)
+        pid = args.server_pid
+        target = args.url
+
+    status, body = make_client().request('POST', '/login',
+                                         {'username': 'admin', 'password': 'password'})
+    if status != 200:
+        raise SystemExit(f"Login failed with {status}: {body[:200]!r}")
+    token = json.loads(body)['token']
+
+    scenarios = build_scenarios(ids, token, rng)
+    if args.only:
+        wanted = set(args.only.split(','))
+        scenarios = [s for s in scenarios if s[0] in wanted]
+
+    results = {}
+    for scenario in scenarios:
+        result = run_scenario(make_client, scenario, args.requests, args.concurrency, pid)
+        results[scenario[0]] = result
+        latency = result['latency_ms']
+        print(f"{scenario[0]:<22} p50 {latency['p50']}ms  p95 {latency['p95']}ms  "
+              f"p99 {latency['p99']}ms  {result['throughput_rps']} req/s  errors {result['errors']}")
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'target': target,
+            'concurrency': args.concurrency,
+            'requests_per_scenario': args.requests,
+            'volumes': {table: len(values) for table, values in ids.items()},
+            'seed': args.seed,
+        },
+        'scenarios': results,
+    }
+    with open(args.out, 'w') as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+    print(f"Wrote {args.out}")
+
+    if args.cleanup:
+        cleanup(connection)
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
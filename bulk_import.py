@@ -0,0 +1,96 @@
+"""
+Bulk CSV import helpers for the Maid Cafe REST API
+app.import_csv streams a CSV in IMPORT_CHUNK_ROWS chunks, validates each
+chunk in Python, checks its foreign keys with one IN (...) query per table
+and loads the good rows in one transaction per chunk, with multi-row
+INSERTs or (IMPORT_LOAD_DATA) LOAD DATA LOCAL INFILE. This module holds the
+pieces that do not touch the app: chunked reading, the rejects side file and
+the LOAD DATA statement.
+"""
+
+import csv
+import os
+import tempfile
+from collections import namedtuple
+
+DEFAULTS = {
+    'IMPORT_CHUNK_ROWS': 5000,
+    # LOAD DATA LOCAL INFILE instead of multi-row INSERTs; the server needs local_infile=ON
+    'IMPORT_LOAD_DATA': False,
+    'IMPORT_REJECTS_DIR': 'imports',
+    # Largest upload /imports accepts, in bytes (None: no limit, as for the rest of the WSGI app)
+    'IMPORT_MAX_BYTES': None,
+    # Seconds the ASGI app waits for an upload's body (None: no limit, as under WSGI)
+    'IMPORT_BODY_TIMEOUT': None,
+}
+
+# table: target table; columns: what validate(row) returns, in order;
+# references: (position in columns, table, key, error) for each foreign key;
+# on_load: optional on_load(cur, rows) run in each chunk's transaction after loading
+ImportSpec = namedtuple('ImportSpec', 'table columns validate references on_load', defaults=(None,))
+
+
+def read_chunks(reader, chunk_rows):
+    """Yield lists of (line_number, row) from a csv.DictReader, chunk_rows at a time"""
+    chunk = []
+    for row in reader:
+        chunk.append((reader.line_num, row))
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class RejectWriter:
+    """Side CSV of rejected rows (input columns plus line and error), created on the first reject"""
+
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self.fieldnames = list(fieldnames) + ['line', 'error']
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, line, row, error):
+        if self._writer is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, self.fieldnames, extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerow(dict(row, line=line, error=error))
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def load_data_field(value):
+    """A value as LOAD DATA ... ESCAPED BY '\\' reads it: \\N for NULL, backslashes doubled"""
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\')
+
+
+def load_data(cur, table, columns, rows):
+    """
+    Load rows with LOAD DATA LOCAL INFILE from a temporary CSV file
+    None is written as \\N so it stores NULL, as the INSERT path does
+    Returns the number of rows the server loaded (LOCAL skips bad rows with only a warning)
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', encoding='utf-8',
+                                     delete=False) as f:
+        writer = csv.writer(f, lineterminator='\n')
+        for row in rows:
+            writer.writerow([load_data_field(value) for value in row])
+    try:
+        cur.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '\\\\' "
+            f"LINES TERMINATED BY '\\n' ({', '.join(columns)})",
+            (f.name,)
+        )
+        return cur.rowcount
+    finally:
+        os.remove(f.name)
@@ -0,0 +1,95 @@
+"""
+Cache backends for the Maid Cafe REST API
+Every backend implements get/set/delete/clear/stats so the in-process LRU
+can later be swapped for a shared one (e.g. Redis) without touching handlers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheBackend:
+    """Interface for resource caches; keys are strings like 'customer:42'"""
+
+    def get(self, key):
+        """Return the cached value or None on a miss"""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        """Store value under key, optionally overriding the default TTL (seconds)"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Drop key if present"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        raise NotImplementedError
+
+    def stats(self):
+        """Return a dict of counters (hits, misses, ...)"""
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """
+    Thread-safe in-process LRU cache with a per-entry TTL and a size cap
+    max_entries=0 disables caching entirely (every get is a miss)
+    """
+
+    def __init__(self, max_entries=1024, ttl=30.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'lru',
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
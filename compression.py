@@ -0,0 +1,204 @@
+"""
+Response compression for the Maid Cafe REST API
+Picks gzip, br or zstd from the client's Accept-Encoding (br and zstd only when
+the brotli / zstandard packages are installed) and compresses JSON, XML and
+NDJSON bodies. Buffered bodies under COMPRESS_MIN_SIZE bytes are sent as they
+are; streamed bodies are compressed chunk by chunk as the generator runs, so
+they stay constant-memory.
+Responses get Vary: Accept-Encoding, and a weak ETag whenever an encoding was
+negotiated (the bytes differ per encoding); 304s for them get the same headers.
+"""
+
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULTS = {
+    'COMPRESS_ENABLED': True,
+    'COMPRESS_MIN_SIZE': 1024,
+    # Server preference when the client accepts several equally
+    'COMPRESS_ENCODINGS': ('zstd', 'br', 'gzip'),
+    'COMPRESS_MIMETYPES': ('application/json', 'application/xml', 'application/x-ndjson', 'text/plain'),
+    'COMPRESS_GZIP_LEVEL': 6,
+    'COMPRESS_BR_LEVEL': 4,
+    'COMPRESS_ZSTD_LEVEL': 3,
+}
+
+
+class _Brotli:
+    """brotli.Compressor with the compressobj() method names"""
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+def _gzip(level):
+    return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def _zstd(level):
+    return zstandard.ZstdCompressor(level=level).compressobj()
+
+
+# Content-Encoding -> (compressobj factory, level setting) for what is installed
+ENCODERS = {'gzip': (_gzip, 'COMPRESS_GZIP_LEVEL')}
+if brotli is not None:
+    ENCODERS['br'] = (_Brotli, 'COMPRESS_BR_LEVEL')
+if zstandard is not None:
+    ENCODERS['zstd'] = (_zstd, 'COMPRESS_ZSTD_LEVEL')
+
+
+def negotiate(accept, preferred):
+    """
+    Pick an encoding from an Accept-Encoding header (werkzeug Accept or
+    [(value, quality)]); the highest quality wins, ties go to preferred order
+    Returns None when nothing installed is acceptable
+    """
+    qualities = {value.lower(): quality for value, quality in accept}
+    best, best_quality = None, 0
+    for encoding in preferred:
+        if encoding not in ENCODERS:
+            continue
+        quality = qualities.get(encoding, qualities.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compressor(encoding, config):
+    """A fresh compressobj-style object for encoding at the configured level"""
+    factory, level = ENCODERS[encoding]
+    return factory(config[level])
+
+
+def compressible(response, config):
+    """True when response is a successful body of a type worth compressing"""
+    return (config['COMPRESS_ENABLED']
+            and 200 <= response.status_code < 300 and response.status_code not in (204, 206)
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in config['COMPRESS_MIMETYPES']
+            and not getattr(response, 'direct_passthrough', False))
+
+
+def weaken_etag(response):
+    """Turn a strong ETag into the matching weak one"""
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def mark_encoded(response, encoding):
+    """Set the headers of a response whose body is now encoding-compressed"""
+    response.headers['Content-Encoding'] = encoding
+    weaken_etag(response)
+
+
+def mark_not_modified(response, accept, config):
+    """
+    Give a 304 the Vary header and ETag of the 200 it stands for
+    (response.mimetype must be the 200's)
+    """
+    if config['COMPRESS_ENABLED'] and response.mimetype in config['COMPRESS_MIMETYPES']:
+        response.vary.add('Accept-Encoding')
+        if negotiate(accept, config['COMPRESS_ENCODINGS']) is not None:
+            weaken_etag(response)
+    return response
+
+
+def compress_chunks(chunks, compress):
+    """Compress an iterable of str/bytes chunks, closing it when done or abandoned"""
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compress.compress(chunk)
+            if data:
+                yield data
+        yield compress.flush()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+async def acompress_chunks(body, compress):
+    """compress_chunks for a Quart response body"""
+    async with body as chunks:
+        async for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compress.compress(chunk)
+            if data:
+                yield data
+    yield compress.flush()
+
+
+def compress_response(response, accept, config):
+    """Compress a Flask response for the client's Accept-Encoding (after_request hook body)"""
+    if response.status_code == 304:
+        return mark_not_modified(response, accept, config)
+    if not compressible(response, config):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(accept, config['COMPRESS_ENCODINGS'])
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_chunks(response.response, compressor(encoding, config))
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            # Sent as is, but with the validator a 304 for this Accept-Encoding gets
+            weaken_etag(response)
+            return response
+        compress = compressor(encoding, config)
+        response.set_data(compress.compress(data) + compress.flush())
+
+    mark_encoded(response, encoding)
+    return response
+
+
+async def acompress_response(response, accept, config):
+    """compress_response for a Quart response"""
+    if response.status_code == 304:
+        return mark_not_modified(response, accept, config)
+    if not compressible(response, config):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(accept, config['COMPRESS_ENCODINGS'])
+    if encoding is None:
+        return response
+
+    if isinstance(response.response, response.data_body_class):
+        data = await response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            weaken_etag(response)
+            return response
+        compress = compressor(encoding, config)
+        response.set_data(compress.compress(data) + compress.flush())
+    else:
+        response.response = response.iterable_body_class(
+            acompress_chunks(response.response, compressor(encoding, config))
+        )
+        response.headers.pop('Content-Length', None)
+
+    mark_encoded(response, encoding)
+    return response
@@ -0,0 +1,457 @@
+"""
+MySQL connection pool for the Maid Cafe REST API
+Replaces flask_mysqldb's connection-per-app-context with pooled connections
+that are reused across requests, pinged before use and recycled by age.
+With MYSQL_REPLICAS set, GET/HEAD requests read from replica pools in
+round-robin order and fall back to the primary when no replica answers.
+"""
+
+import threading
+import time
+from collections import deque
+
+from flask import g, has_request_context, request
+import MySQLdb
+import MySQLdb.cursors
+
+
+class PoolExhausted(Exception):
+    """No connection became available within the pool's wait timeout"""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections
+    connect: zero-argument callable returning a new connection
+    min_size: connections opened up front on first use
+    max_size: hard cap on open connections
+    max_lifetime: seconds before a connection is closed and replaced
+    wait_timeout: seconds checkout waits for a free connection before PoolExhausted
+    pre_ping_after: ping connections idle at least this many seconds (0 = always)
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, max_lifetime=3600,
+                 wait_timeout=5.0, pre_ping_after=0.0, clock=time.monotonic):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.wait_timeout = wait_timeout
+        self.pre_ping_after = pre_ping_after
+        self._clock = clock
+
+        self._idle = deque()      # (connection, created_at, returned_at), most recent on the right
+        self._born = {}           # id(connection) -> created_at, for connections checked out
+        self._size = 0
+        self._cond = threading.Condition()
+        self._warmed = False
+
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.exhausted = 0
+        self.created = 0
+        self.recycled = 0
+        self.ping_failures = 0
+        self.last_error = None
+
+    # ---- opening and closing ----
+
+    def _open(self):
+        """Open a connection; the caller has already reserved a slot in _size"""
+        try:
+            connection = self._connect()
+        except Exception as e:
+            with self._cond:
+                self._size -= 1
+                self.last_error = str(e)
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+            self.last_error = None
+        return connection, self._clock()
+
+    def _discard(self, connection):
+        """Close a connection and free its slot"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def warm(self):
+        """Open connections until min_size are available"""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    self._warmed = True
+                    return
+                self._size += 1
+            connection, created_at = self._open()
+            with self._cond:
+                self._idle.append((connection, created_at, created_at))
+                self._cond.notify()
+
+    # ---- checkout / checkin ----
+
+    def _usable(self, connection, created_at, returned_at):
+        """Decide whether an idle connection can be handed out, pinging it if needed"""
+        now = self._clock()
+        if now - created_at >= self.max_lifetime:
+            with self._cond:
+                self.recycled += 1
+            return False
+        if now - returned_at >= self.pre_ping_after:
+            try:
+                connection.ping()
+            except Exception as e:
+                with self._cond:
+                    self.ping_failures += 1
+                    self.last_error = str(e)
+                return False
+        return True
+
+    def checkout(self, timeout=None):
+        """Borrow a connection, waiting up to timeout (default wait_timeout) seconds"""
+        if not self._warmed:
+            self.warm()
+
+        timeout = self.wait_timeout if timeout is None else timeout
+        started = self._clock()
+        deadline = started + timeout
+
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self.exhausted += 1
+                        raise PoolExhausted(
+                            f"No database connection available within {timeout}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1
+                    entry = None
+
+            if entry is None:
+                connection, created_at = self._open()
+            else:
+                connection, created_at, returned_at = entry
+                if not self._usable(connection, created_at, returned_at):
+                    self._discard(connection)
+                    continue
+
+            waited = self._clock() - started
+            with self._cond:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+                self._born[id(connection)] = created_at
+            return connection
+
+    def checkin(self, connection):
+        """Return a connection, ending any open transaction so no snapshot leaks"""
+        with self._cond:
+            created_at = self._born.pop(id(connection), self._clock())
+        try:
+            connection.rollback()
+        except Exception:
+            self._discard(connection)
+            return
+        with self._cond:
+            self._idle.append((connection, created_at, self._clock()))
+            self._cond.notify()
+
+    def close(self):
+        """Close every idle connection (checked-out ones close on checkin)"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+    # ---- reporting ----
+
+    def stats(self):
+        """Pool sizing and wait metrics"""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'checkouts': self.checkouts,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+                'wait_seconds_avg': round(self.wait_seconds_total / self.checkouts, 6)
+                                    if self.checkouts else 0.0,
+                'wait_seconds_max': round(self.wait_seconds_max, 6),
+                'exhausted': self.exhausted,
+                'created': self.created,
+                'recycled': self.recycled,
+                'ping_failures': self.ping_failures,
+                'last_error': self.last_error,
+            }
+
+    def health_check(self):
+        """
+        Report pool state plus whether the database answers, without waiting
+        Uses an idle (or new) pooled connection; a fully busy pool counts as
+        healthy unless the last connection attempt failed
+        """
+        try:
+            connection = self.checkout(timeout=0)
+        except PoolExhausted:
+            healthy = self.last_error is None
+        except Exception:
+            healthy = False
+        else:
+            try:
+                connection.ping()
+                healthy = True
+            except Exception as e:
+                self.last_error = str(e)
+                healthy = False
+            self.checkin(connection)
+
+        status = self.stats()
+        status['healthy'] = healthy
+        return status
+
+
+class ReplicaSet:
+    """
+    Round-robin rotation over replica pools
+    A replica whose connection attempt failed is skipped for retry_after
+    seconds, then tried again; works for ConnectionPool and aiomysql pools alike
+    """
+
+    def __init__(self, pools, retry_after=30.0, clock=time.monotonic):
+        self.pools = list(pools)
+        self.retry_after = retry_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._next = 0
+        self._down_until = [0.0] * len(self.pools)
+        self.failovers = 0
+
+    def candidates(self):
+        """Indexes of the replicas to try for one read, next in rotation first"""
+        with self._lock:
+            count = len(self.pools)
+            start = self._next
+            self._next = (start + 1) % count
+            now = self._clock()
+            return [index for index in ((start + i) % count for i in range(count))
+                    if self._down_until[index] <= now]
+
+    def mark_down(self, index):
+        with self._lock:
+            self._down_until[index] = self._clock() + self.retry_after
+
+    def mark_up(self, index):
+        with self._lock:
+            self._down_until[index] = 0.0
+
+    def is_down(self, index):
+        with self._lock:
+            return self._down_until[index] > self._clock()
+
+    def failover(self):
+        """Count a read sent to the primary because no replica was usable"""
+        with self._lock:
+            self.failovers += 1
+
+
+def replica_settings(entry):
+    """Connection overrides for one MYSQL_REPLICAS entry: 'host', 'host:port' or a dict"""
+    if isinstance(entry, dict):
+        return dict(entry)
+    host, _, port = entry.partition(':')
+    return {'host': host, 'port': int(port)} if port else {'host': host}
+
+
+def is_read_request():
+    """True inside a GET/HEAD request, whose queries may go to a replica"""
+    return has_request_context() and request.method in ('GET', 'HEAD')
+
+
+class MySQLPool:
+    """
+    Flask extension exposing a pooled MySQLdb connection as .connection,
+    the same interface flask_mysqldb.MySQL offered
+    Each app context borrows one connection and returns it on teardown
+    wrap_connection, if set, is applied to the connection handed to views
+    (e.g. metrics.TimedConnection); the pool always gets the raw one back
+    GET/HEAD requests borrow from a replica when MYSQL_REPLICAS is set; any
+    other request borrows from the primary for its whole context, so a write
+    and the read that follows it (create_customer -> get_customer) agree
+    """
+
+    def __init__(self, app=None, wrap_connection=None):
+        self.app = app
+        self.wrap_connection = wrap_connection
+        self._pool = None
+        self._replicas = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MYSQL_HOST', 'localhost')
+        app.config.setdefault('MYSQL_USER', None)
+        app.config.setdefault('MYSQL_PASSWORD', None)
+        app.config.setdefault('MYSQL_DB', None)
+        app.config.setdefault('MYSQL_PORT', 3306)
+        app.config.setdefault('MYSQL_CHARSET', 'utf8mb4')
+        app.config.setdefault('MYSQL_CURSORCLASS', None)
+        app.config.setdefault('MYSQL_CONNECT_TIMEOUT', 10)
+        app.config.setdefault('MYSQL_POOL_MIN_SIZE', 1)
+        app.config.setdefault('MYSQL_POOL_MAX_SIZE', 10)
+        app.config.setdefault('MYSQL_POOL_MAX_LIFETIME', 3600)
+        app.config.setdefault('MYSQL_POOL_WAIT_TIMEOUT', 5.0)
+        app.config.setdefault('MYSQL_POOL_PRE_PING_AFTER', 1.0)
+        app.config.setdefault('MYSQL_REPLICAS', [])
+        app.config.setdefault('MYSQL_REPLICA_RETRY_AFTER', 30.0)
+        app.extensions['mysql_pool'] = self
+        app.teardown_appcontext(self.teardown)
+        self.app = app
+
+    def _connect(self, **overrides):
+        """Open a new MySQLdb connection from app.config (overrides: host, port, user, password)"""
+        config = self.app.config
+        kwargs = {
+            'host': config['MYSQL_HOST'],
+            'port': config['MYSQL_PORT'],
+            'charset': config['MYSQL_CHARSET'],
+            'connect_timeout': config['MYSQL_CONNECT_TIMEOUT'],
+        }
+        if config['MYSQL_USER']:
+            kwargs['user'] = config['MYSQL_USER']
+        if config['MYSQL_PASSWORD']:
+            kwargs['passwd'] = config['MYSQL_PASSWORD']
+        if config['MYSQL_DB']:
+            kwargs['db'] = config['MYSQL_DB']
+        if config['MYSQL_CURSORCLASS']:
+            kwargs['cursorclass'] = getattr(MySQLdb.cursors, config['MYSQL_CURSORCLASS'])
+        if 'password' in overrides:
+            overrides = dict(overrides)
+            kwargs['passwd'] = overrides.pop('password')
+        kwargs.update(overrides)
+        return MySQLdb.connect(**kwargs)
+
+    def _new_pool(self, **overrides):
+        """A ConnectionPool sized from the MYSQL_POOL_* settings"""
+        config = self.app.config
+        return ConnectionPool(
+            lambda: self._connect(**overrides),
+            min_size=config['MYSQL_POOL_MIN_SIZE'],
+            max_size=config['MYSQL_POOL_MAX_SIZE'],
+            max_lifetime=config['MYSQL_POOL_MAX_LIFETIME'],
+            wait_timeout=config['MYSQL_POOL_WAIT_TIMEOUT'],
+            pre_ping_after=config['MYSQL_POOL_PRE_PING_AFTER'],
+        )
+
+    @property
+    def pool(self):
+        """The ConnectionPool, built from app.config on first use"""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = self._new_pool()
+        return self._pool
+
+    @property
+    def replicas(self):
+        """ReplicaSet over the MYSQL_REPLICAS pools, or None when there are none"""
+        if self._replicas is None and self.app.config['MYSQL_REPLICAS']:
+            with self._lock:
+                if self._replicas is None:
+                    self._replicas = ReplicaSet(
+                        [self._new_pool(**replica_settings(entry))
+                         for entry in self.app.config['MYSQL_REPLICAS']],
+                        retry_after=self.app.config['MYSQL_REPLICA_RETRY_AFTER'],
+                    )
+        return self._replicas
+
+    def checkout_replica(self):
+        """
+        Borrow (pool, connection) from the next replica that answers
+        Returns None when every replica is down; PoolExhausted is not a failover
+        """
+        replicas = self.replicas
+        for index in replicas.candidates():
+            pool = replicas.pools[index]
+            try:
+                connection = pool.checkout()
+            except PoolExhausted:
+                raise
+            except Exception:
+                replicas.mark_down(index)
+                continue
+            replicas.mark_up(index)
+            return pool, connection
+        replicas.failover()
+        return None
+
+    def open_connection(self, read=False, **options):
+        """
+        A new unpooled connection, for long jobs that should not hold a pooled one
+        read=True prefers the next replica that answers, then the primary
+        options are extra MySQLdb.connect arguments (e.g. local_infile=1)
+        """
+        replicas = self.replicas if read else None
+        if replicas is not None:
+            for index in replicas.candidates():
+                settings = replica_settings(self.app.config['MYSQL_REPLICAS'][index])
+                try:
+                    return self._connect(**settings, **options)
+                except Exception:
+                    replicas.mark_down(index)
+            replicas.failover()
+        return self._connect(**options)
+
+    @property
+    def connection(self):
+        """The connection borrowed by the current app context"""
+        if 'mysql_pool_connection' not in g:
+            borrowed = None
+            if self.replicas is not None and is_read_request():
+                borrowed = self.checkout_replica()
+            pool, connection = borrowed or (self.pool, self.pool.checkout())
+            g.mysql_pool_owner = pool
+            g.mysql_pool_connection = connection
+            g.mysql_pool_view = self.wrap_connection(connection) if self.wrap_connection else connection
+        return g.mysql_pool_view
+
+    def teardown(self, exception):
+        g.pop('mysql_pool_view', None)
+        pool = g.pop('mysql_pool_owner', None)
+        connection = g.pop('mysql_pool_connection', None)
+        if connection is not None:
+            pool.checkin(connection)
+
+    def pool_status(self):
+        """Pool metrics plus a non-blocking database health flag, per replica too"""
+        status = self.pool.health_check()
+        replicas = self.replicas
+        if replicas is not None:
+            status['replicas'] = []
+            for index, pool in enumerate(replicas.pools):
+                replica = pool.health_check()
+                if replica['healthy']:
+                    replicas.mark_up(index)
+                elif not replicas.is_down(index):
+                    replicas.mark_down(index)
+                replica['marked_down'] = replicas.is_down(index)
+                status['replicas'].append(replica)
+            status['replica_failovers'] = replicas.failovers
+        return status
@@ -0,0 +1,211 @@
+"""
+Background export jobs for the Maid Cafe REST API
+An export runs its query on a dedicated database connection in a worker
+thread, reads the result through a server-side cursor EXPORT_BATCH_SIZE rows
+at a time and writes CSV (or Parquet, when pyarrow is installed) under
+EXPORT_DIR, so no request worker or pooled connection is held meanwhile.
+Job state is kept in <id>.json next to the file, so any worker process can
+report on and serve a job another one started. Jobs run in the process that
+accepted them: one left queued/running by a process that exited on the same
+host is reported as failed; jobs owned by other hosts cannot be checked.
+"""
+
+import csv
+import json
+import os
+import re
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+DEFAULTS = {
+    'EXPORT_DIR': 'exports',
+    # Concurrent exports per process; each holds one database connection while it runs
+    'EXPORT_WORKERS': 1,
+    'EXPORT_BATCH_SIZE': 5000,
+}
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def available_formats():
+    """Export formats this process can write"""
+    return [fmt for fmt in MIMETYPES if fmt != 'parquet' or pyarrow is not None]
+
+
+def write_csv(path, columns, batches):
+    """Write row batches to path as CSV with a header row"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for rows in batches:
+            writer.writerows(rows)
+
+
+def write_parquet(path, columns, batches):
+    """Write row batches to path as Parquet, one row group per batch"""
+    writer = None
+    try:
+        for rows in batches:
+            table = pyarrow.Table.from_pylist(rows, schema=writer.schema if writer else None)
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+        if writer is None:
+            empty = pyarrow.table({column: pyarrow.array([], pyarrow.string()) for column in columns})
+            pyarrow.parquet.write_table(empty, path)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet}
+
+
+def _now():
+    return datetime.utcnow().isoformat()
+
+
+def _process_exists(pid):
+    """Whether pid is a live process on this host (assumed so where that cannot be checked)"""
+    if os.name == 'nt':
+        # os.kill would terminate the process there
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ExportManager:
+    """
+    Runs export jobs on a small thread pool and tracks them on disk
+    connect: zero-argument callable returning a new (unpooled) DB-API connection
+    cursor_class: server-side cursor class for connection.cursor(), e.g. SSDictCursor
+    """
+
+    def __init__(self, directory, connect, cursor_class=None, workers=1, batch_size=5000):
+        self.directory = os.path.abspath(directory)
+        self._connect = connect
+        self.cursor_class = cursor_class
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+        # Recorded in each job so other processes can tell when its runner is gone
+        self.owner = {'host': socket.gethostname(), 'pid': os.getpid(), 'instance': uuid.uuid4().hex}
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.directory, f"{job_id}.{suffix}")
+
+    def _save(self, job):
+        """Write the job's state file atomically"""
+        partial = self._path(job['id'], 'json.part')
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        os.replace(partial, self._path(job['id'], 'json'))
+
+    def get(self, job_id):
+        """The job's state, or None for an unknown id; abandoned jobs are marked failed"""
+        if not _JOB_ID.match(job_id):
+            return None
+        try:
+            with open(self._path(job_id, 'json'), encoding='utf-8') as f:
+                job = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        if self._abandoned(job):
+            job.update(status='failed', error='Export was interrupted: the process running it exited',
+                       finished_at=_now())
+            self._save(job)
+        return job
+
+    def _abandoned(self, job):
+        """
+        True for a queued/running job whose runner is gone: an earlier manager in
+        this process (e.g. before a restart that reused the pid) or an exited pid on this host
+        """
+        owner = job.get('owner')
+        if job['status'] not in ('queued', 'running') or not owner or owner['host'] != self.owner['host']:
+            return False
+        if owner['pid'] == self.owner['pid']:
+            return owner['instance'] != self.owner['instance']
+        return not _process_exists(owner['pid'])
+
+    def file_path(self, job):
+        """Where a finished job's file is"""
+        return self._path(job['id'], job['format'])
+
+    def submit(self, query, params, fmt):
+        """Queue an export of query's result in fmt; returns the new job's state"""
+        os.makedirs(self.directory, exist_ok=True)
+        job = {
+            'id': uuid.uuid4().hex,
+            'format': fmt,
+            'status': 'queued',
+            'rows': 0,
+            'error': None,
+            'created_at': _now(),
+            'finished_at': None,
+            'owner': self.owner,
+        }
+        self._save(job)
+        queued = dict(job)
+        self._executor.submit(self._run, job, query, params)
+        return queued
+
+    def _batches(self, job, cur):
+        """Yield fetchmany() batches, recording progress in the job file after each"""
+        while True:
+            rows = cur.fetchmany(self.batch_size)
+            if not rows:
+                break
+            yield rows
+            job['rows'] += len(rows)
+            self._save(job)
+
+    def _run(self, job, query, params):
+        job['status'] = 'running'
+        self._save(job)
+        path = self.file_path(job)
+        partial = path + '.part'
+        connection = None
+        try:
+            connection = self._connect()
+            cur = connection.cursor(self.cursor_class) if self.cursor_class else connection.cursor()
+            try:
+                cur.execute(query, params)
+                columns = [column[0] for column in cur.description]
+                WRITERS[job['format']](partial, columns, self._batches(job, cur))
+            finally:
+                cur.close()
+            os.replace(partial, path)
+            job['status'] = 'done'
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            if os.path.exists(partial):
+                os.remove(partial)
+        finally:
+            if connection is not None:
+                connection.close()
+            job['finished_at'] = _now()
+            self._save(job)
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs, optionally waiting for the running ones"""
+        self._executor.shutdown(wait=wait)
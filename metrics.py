@@ -0,0 +1,281 @@
+"""
+Per-request instrumentation for the Maid Cafe REST API
+RequestTiming accumulates database, fetch and serialization time for one
+request, TimedConnection/TimedCursor feed it from the DB-API calls, and
+Metrics aggregates finished requests into per-route histograms rendered in
+the Prometheus text exposition format.
+Everything is a perf_counter() pair plus one short lock per request, so it
+is cheap enough to leave on.
+"""
+
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestTiming:
+    """Time spent by one request, split by where it went"""
+
+    __slots__ = ('started', 'queries', 'db_seconds', 'fetch_seconds', 'serialize_seconds',
+                 'statements')
+
+    def __init__(self, clock=time.perf_counter):
+        self.started = clock()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.fetch_seconds = 0.0
+        self.serialize_seconds = 0.0
+        # [(query, seconds, rowcount)] when profiling (see profiling.py), else None
+        self.statements = None
+
+    def record(self, query, seconds, rowcount):
+        """Count one executed statement"""
+        self.db_seconds += seconds
+        self.queries += 1
+        if self.statements is not None:
+            self.statements.append((query, seconds, rowcount))
+
+    def server_timing(self, total_seconds):
+        """Server-Timing header value (durations in milliseconds)"""
+        return (f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries", '
+                f'fetch;dur={self.fetch_seconds * 1000:.2f}, '
+                f'serialize;dur={self.serialize_seconds * 1000:.2f}, '
+                f'total;dur={total_seconds * 1000:.2f}')
+
+
+class TimedCursor:
+    """
+    DB-API cursor wrapper that adds execute time and query count to a RequestTiming
+    and fetch time separately; every other attribute passes through
+    """
+
+    def __init__(self, cursor, timing):
+        self._cursor = cursor
+        self._timing = timing
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            self._timing.record(query, time.perf_counter() - started, self._cursor.rowcount)
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            self._timing.record(query, time.perf_counter() - started, self._cursor.rowcount)
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._timing.fetch_seconds += time.perf_counter() - started
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._fetch(self._cursor.fetchmany)
+        return self._fetch(self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+
+class TimedConnection:
+    """Connection wrapper whose cursors report into the timing returned by get_timing()"""
+
+    def __init__(self, connection, get_timing):
+        self._connection = connection
+        self._get_timing = get_timing
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._connection.cursor(*args, **kwargs)
+        timing = self._get_timing()
+        return TimedCursor(cursor, timing) if timing is not None else cursor
+
+    def commit(self):
+        timing = self._get_timing()
+        started = time.perf_counter()
+        try:
+            return self._connection.commit()
+        finally:
+            if timing is not None:
+                timing.db_seconds += time.perf_counter() - started
+
+
+class AsyncTimedCursor(TimedCursor):
+    """TimedCursor for aiomysql, whose execute and fetch methods are coroutines"""
+
+    async def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return await self._cursor.execute(query, args)
+        finally:
+            self._timing.record(query, time.perf_counter() - started, self._cursor.rowcount)
+
+    async def _fetch(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return await method(*args)
+        finally:
+            self._timing.fetch_seconds += time.perf_counter() - started
+
+    async def fetchone(self):
+        return await self._fetch(self._cursor.fetchone)
+
+    async def fetchmany(self, size=None):
+        return await self._fetch(self._cursor.fetchmany, size)
+
+    async def fetchall(self):
+        return await self._fetch(self._cursor.fetchall)
+
+
+class AsyncTimedConnection(TimedConnection):
+    """TimedConnection for aiomysql connections"""
+
+    async def cursor(self, *args, **kwargs):
+        cursor = await self._connection.cursor(*args, **kwargs)
+        timing = self._get_timing()
+        return AsyncTimedCursor(cursor, timing) if timing is not None else cursor
+
+    async def commit(self):
+        timing = self._get_timing()
+        started = time.perf_counter()
+        try:
+            return await self._connection.commit()
+        finally:
+            if timing is not None:
+                timing.db_seconds += time.perf_counter() - started
+
+
+class Histogram:
+    """Cumulative-bucket histogram (not thread-safe; Metrics holds the lock)"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**labels):
+    """Render {k="v",...} with Prometheus escaping"""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class Metrics:
+    """Thread-safe registry of per-route request metrics"""
+
+    def __init__(self, prefix='maid_cafe', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._latency = {}     # (method, route, status) -> Histogram
+        self._db = {}          # (method, route) -> [queries, db_seconds, fetch_seconds, serialize_seconds]
+        self._gauges = []      # callables returning {name: value}
+        self._counters = []    # the same, for values that only ever grow
+
+    def observe(self, method, route, status, seconds, timing=None):
+        """Record one finished request"""
+        with self._lock:
+            key = (method, route, status)
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if timing is not None:
+                totals = self._db.setdefault((method, route), [0, 0.0, 0.0, 0.0])
+                totals[0] += timing.queries
+                totals[1] += timing.db_seconds
+                totals[2] += timing.fetch_seconds
+                totals[3] += timing.serialize_seconds
+
+    def add_gauges(self, collect):
+        """Register collect() -> {name: number}, called at scrape time"""
+        self._gauges.append(collect)
+
+    def add_counters(self, collect):
+        """add_gauges for monotonic totals; names should end in _total"""
+        self._counters.append(collect)
+
+    def reset(self):
+        with self._lock:
+            self._latency.clear()
+            self._db.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        p = self.prefix
+        lines = [
+            f'# HELP {p}_request_duration_seconds Request latency by route',
+            f'# TYPE {p}_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            latency = sorted(self._latency.items())
+            db = sorted(self._db.items())
+            for (method, route, status), histogram in latency:
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{p}_request_duration_seconds_bucket'
+                                 f'{_labels(method=method, route=route, status=status, le=bound)} {cumulative}')
+                labels = _labels(method=method, route=route, status=status)
+                lines.append(f'{p}_request_duration_seconds_bucket'
+                             f'{_labels(method=method, route=route, status=status, le="+Inf")} {histogram.count}')
+                lines.append(f'{p}_request_duration_seconds_sum{labels} {histogram.sum:.6f}')
+                lines.append(f'{p}_request_duration_seconds_count{labels} {histogram.count}')
+
+            for index, (name, kind, help_text) in enumerate((
+                ('db_queries_total', 'counter', 'SQL statements executed'),
+                ('db_seconds_total', 'counter', 'Time spent in execute/commit'),
+                ('db_fetch_seconds_total', 'counter', 'Time spent fetching result rows'),
+                ('serialize_seconds_total', 'counter', 'Time spent encoding JSON/XML bodies'),
+            )):
+                lines.append(f'# HELP {p}_{name} {help_text}')
+                lines.append(f'# TYPE {p}_{name} {kind}')
+                for (method, route), totals in db:
+                    value = totals[index]
+                    value = value if index == 0 else f'{value:.6f}'
+                    lines.append(f'{p}_{name}{_labels(method=method, route=route)} {value}')
+
+        for kind, collectors in (('gauge', self._gauges), ('counter', self._counters)):
+            for collect in collectors:
+                try:
+                    values = collect()
+                except Exception:
+                    continue
+                for name, value in sorted(values.items()):
+                    lines.append(f'# TYPE {p}_{name} {kind}')
+                    lines.append(f'{p}_{name} {value}')
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,91 @@
+"""
+Versioned schema migrations for the Maid Cafe REST API
+Applies migrations/NNNN_description.sql in version order and records each one
+in the schema_migrations table so it only ever runs once.
+Run with: flask --app app migrate   (or python migrate.py)
+"""
+
+import os
+import re
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+_MIGRATION_FILE = re.compile(r'^(\d+)_[\w\-]+\.sql$')
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """Return [(version, path), ...] for every migration file, oldest first"""
+    found = []
+    for name in os.listdir(directory):
+        match = _MIGRATION_FILE.match(name)
+        if match:
+            found.append((match.group(1), os.path.join(directory, name)))
+    return sorted(found, key=lambda item: int(item[0]))
+
+
+def split_statements(sql):
+    """
+    Split a migration file into statements on trailing semicolons
+    Comment lines are dropped; statements must not contain BEGIN ... END blocks
+    """
+    statements = []
+    current = []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('--'):
+            continue
+        current.append(line)
+        if stripped.endswith(';'):
+            statements.append('\n'.join(current).strip().rstrip(';'))
+            current = []
+    if current:
+        statements.append('\n'.join(current).strip())
+    return statements
+
+
+def applied_versions(cur):
+    """Create schema_migrations if needed and return the versions already applied"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(32) NOT NULL PRIMARY KEY,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row['version'] if isinstance(row, dict) else row[0] for row in cur.fetchall()}
+
+
+def apply_migrations(connection, directory=MIGRATIONS_DIR, log=print):
+    """
+    Apply every pending migration on connection and return their versions
+    MySQL commits DDL implicitly, so a failing migration is not rolled back;
+    fix it and re-run, or repair the schema by hand
+    """
+    cur = connection.cursor()
+    done = applied_versions(cur)
+    applied = []
+
+    for version, path in discover(directory):
+        if version in done:
+            continue
+
+        with open(path, encoding='utf-8') as handle:
+            statements = split_statements(handle.read())
+
+        log(f"Applying migration {os.path.basename(path)}")
+        for statement in statements:
+            cur.execute(statement)
+        cur.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+        connection.commit()
+        applied.append(version)
+
+    cur.close()
+    return applied
+
+
+if __name__ == '__main__':
+    from app import app, mysql
+
+    with app.app_context():
+        versions = apply_migrations(mysql.connection)
+    print(f"Applied {len(versions)} migration(s)")
@@ -0,0 +1,11 @@
+-- Per-table version markers for conditional GETs (app.config['ETAG_TABLE_VERSIONS'])
+-- The API's write paths bump a marker once per write statement while the flag
+-- is on; writes made outside the API do not, so collection ETags can go stale.
+
+CREATE TABLE IF NOT EXISTS table_version (
+  table_name VARCHAR(64) NOT NULL,
+  version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+  PRIMARY KEY (table_name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO table_version (table_name) VALUES ('customer'), ('maid'), ('orders');
@@ -0,0 +1,9 @@
+-- FULLTEXT indexes for ?q= search on /customers and /maids (app.config['SEARCH_FULLTEXT'])
+-- The ngram parser indexes every 2-character sequence (ngram_token_size=2), so
+-- quoted terms match anywhere inside a value, like the old LIKE '%q%' scans.
+
+ALTER TABLE customer
+  ADD FULLTEXT INDEX ft_customer_search (name, email, phone_number) WITH PARSER ngram;
+
+ALTER TABLE maid
+  ADD FULLTEXT INDEX ft_maid_name (name) WITH PARSER ngram;
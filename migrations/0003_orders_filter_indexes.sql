@@ -0,0 +1,16 @@
+-- Indexes for every filter combination get_orders / order_stats can emit
+-- (customer_id, maid_id, start_date/end_date, min_amount/max_amount).
+-- Equality filters lead and the order_date range follows, so date-range
+-- reports per customer or maid become index range scans.
+
+ALTER TABLE orders
+  ADD INDEX idx_orders_customer_date (customer_id, order_date),
+  ADD INDEX idx_orders_maid_date (maid_id, order_date),
+  ADD INDEX idx_orders_date (order_date),
+  ADD INDEX idx_orders_amount (total_amount);
+
+-- The composites start with the foreign key columns and can back the
+-- constraints, so the old single-column keys only add write cost.
+ALTER TABLE orders
+  DROP INDEX customer_id,
+  DROP INDEX maid_id;
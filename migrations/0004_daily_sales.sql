@@ -0,0 +1,22 @@
+-- Daily sales summary for /orders/daily-sales (app.config['SALES_SUMMARY'])
+-- One row per (day, maid, customer); order writes add their deltas in the
+-- same transaction, so report reads are primary-key / index range scans.
+-- Rows that net to zero are left in place; `flask --app app rebuild-sales`
+-- recomputes the table from orders (and --check compares without writing).
+
+CREATE TABLE IF NOT EXISTS daily_sales (
+  day DATE NOT NULL,
+  maid_id INT NOT NULL,
+  customer_id INT NOT NULL,
+  order_count INT NOT NULL DEFAULT 0,
+  total_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, maid_id, customer_id),
+  KEY idx_daily_sales_maid_day (maid_id, day),
+  KEY idx_daily_sales_customer_day (customer_id, day)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO daily_sales (day, maid_id, customer_id, order_count, total_amount)
+SELECT DATE(order_date), maid_id, customer_id, COUNT(*), COALESCE(SUM(total_amount), 0)
+FROM orders
+WHERE order_date IS NOT NULL AND maid_id IS NOT NULL AND customer_id IS NOT NULL
+GROUP BY DATE(order_date), maid_id, customer_id;
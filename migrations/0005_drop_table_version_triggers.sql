@@ -0,0 +1,14 @@
+-- Databases migrated before 0001 lost its FOR EACH ROW triggers still have them.
+-- They made every row written to customer/maid/orders update one hot
+-- table_version row, even with ETAG_TABLE_VERSIONS off; the API now bumps
+-- the markers itself, once per statement and only when the flag is on.
+
+DROP TRIGGER IF EXISTS customer_version_insert;
+DROP TRIGGER IF EXISTS customer_version_update;
+DROP TRIGGER IF EXISTS customer_version_delete;
+DROP TRIGGER IF EXISTS maid_version_insert;
+DROP TRIGGER IF EXISTS maid_version_update;
+DROP TRIGGER IF EXISTS maid_version_delete;
+DROP TRIGGER IF EXISTS orders_version_insert;
+DROP TRIGGER IF EXISTS orders_version_update;
+DROP TRIGGER IF EXISTS orders_version_delete;
@@ -0,0 +1,90 @@
+"""
+Opt-in profiling mode for the Maid Cafe REST API
+With PROFILE_ENABLED every SQL statement is logged with its duration and row
+count, requests over PROFILE_MAX_QUERIES statements or PROFILE_MAX_DB_SECONDS
+of database time are flagged (along with statements repeated
+PROFILE_REPEAT_THRESHOLD times, the usual N+1 shape), and a
+PROFILE_SAMPLE_RATE fraction of requests is run under cProfile with the stats
+written to PROFILE_DIR for `python -m pstats` or snakeviz.
+Statements are collected by metrics.TimedCursor into RequestTiming.statements.
+"""
+
+import cProfile
+import os
+import random
+import re
+import time
+from collections import Counter
+
+DEFAULTS = {
+    'PROFILE_ENABLED': False,
+    'PROFILE_MAX_QUERIES': 10,
+    'PROFILE_MAX_DB_SECONDS': 0.1,
+    'PROFILE_REPEAT_THRESHOLD': 3,
+    'PROFILE_SAMPLE_RATE': 0.0,
+    'PROFILE_DIR': 'profiles',
+}
+
+_WHITESPACE = re.compile(r'\s+')
+_UNSAFE_FILENAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def normalize(query):
+    """Collapse whitespace so the same statement written differently counts once"""
+    return _WHITESPACE.sub(' ', query).strip()
+
+
+def repeated_statements(statements, threshold):
+    """Return [(query, times)] for statements executed at least threshold times"""
+    counts = Counter(normalize(query) for query, _, _ in statements)
+    return [(query, times) for query, times in counts.most_common() if times >= threshold]
+
+
+def begin(config, timing, sample=random.random):
+    """
+    Start profiling a request: collect its statements and maybe start cProfile
+    Returns the running cProfile.Profile or None
+    """
+    timing.statements = []
+    if config['PROFILE_SAMPLE_RATE'] > 0 and sample() < config['PROFILE_SAMPLE_RATE']:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    return None
+
+
+def dump_profile(profiler, directory, method, route):
+    """Stop profiler and write its stats to directory; returns the file path"""
+    profiler.disable()
+    os.makedirs(directory, exist_ok=True)
+    name = _UNSAFE_FILENAME.sub('_', f"{method}{route}").strip('_')
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}-{name}.prof")
+    profiler.dump_stats(path)
+    return path
+
+
+def finish(config, log, method, path, route, timing, total, profiler=None):
+    """
+    Log the request's statements, flag it when it is over the limits and dump
+    its profile; returns the list of warnings (empty when the request is fine)
+    """
+    statements = timing.statements or []
+    for query, seconds, rows in statements:
+        log.info("SQL %.2fms rows=%s %s", seconds * 1000, rows, normalize(query))
+
+    warnings = []
+    if timing.queries > config['PROFILE_MAX_QUERIES']:
+        warnings.append(f"{timing.queries} queries (limit {config['PROFILE_MAX_QUERIES']})")
+    if timing.db_seconds > config['PROFILE_MAX_DB_SECONDS']:
+        warnings.append(f"{timing.db_seconds * 1000:.1f}ms in the database "
+                        f"(limit {config['PROFILE_MAX_DB_SECONDS'] * 1000:.0f}ms)")
+    for query, times in repeated_statements(statements, config['PROFILE_REPEAT_THRESHOLD']):
+        warnings.append(f"possible N+1: {times}x {query}")
+
+    if warnings:
+        log.warning("%s %s took %.1fms: %s", method, path, total * 1000, '; '.join(warnings))
+
+    if profiler is not None:
+        log.info("Profile written to %s", dump_profile(profiler, config['PROFILE_DIR'], method, route))
+
+    return warnings
@@ -0,0 +1,134 @@
+"""
+"Who is on shift" lookups for the Maid Cafe REST API
+ShiftIndex turns every maid's shift_start_time/shift_end_time into
+[start, end) seconds-of-day spans (a shift that ends before it starts
+crosses midnight and becomes two spans) and precomputes which maids are on
+duty between each pair of consecutive shift boundaries, so a point lookup is
+one bisect and a range lookup is a slice.
+The index lives in the process. Maid writes invalidate it and the next lookup
+reloads it from the maid table; it is also reloaded once it is older than
+SHIFT_INDEX_TTL seconds, which bounds staleness for writes made by other workers.
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import time as time_of_day, timedelta
+
+DAY = 24 * 3600
+
+DEFAULTS = {
+    'SHIFT_INDEX_TTL': 30.0,
+}
+
+
+def seconds_of_day(value):
+    """
+    Seconds after midnight for a TIME column value (timedelta), datetime.time
+    or 'HH:MM[:SS]' string; None stays None. Raises ValueError for bad strings
+    """
+    if value is None:
+        return None
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) % DAY
+    if isinstance(value, str):
+        value = time_of_day.fromisoformat(value)
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def format_seconds(seconds):
+    """HH:MM:SS for a seconds-of-day value"""
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def spans(start, end):
+    """
+    The [start, end) pieces of a shift within one day
+    end < start crosses midnight; end == start is a 24-hour shift
+    """
+    if start < end:
+        return [(start, end)]
+    if start == end:
+        return [(0, DAY)]
+    return [(start, DAY)] + ([(0, end)] if end else [])
+
+
+class ShiftIndex:
+    """
+    Thread-safe in-process interval index of maid shifts
+    Lookups return the indexed maid rows (maid_id, name and shift times) in maid_id order
+    """
+
+    def __init__(self, ttl=30.0, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        # Bumped by invalidate(); a reload that overlapped a write stays stale
+        self.generation = 0
+        # (boundaries, maid_ids on duty from each boundary to the next, rows by maid_id)
+        self._table = ([0], [()], {})
+
+    def stale(self):
+        """True when the index has to be (re)loaded before answering"""
+        loaded_at = self._loaded_at
+        return loaded_at is None or self._clock() - loaded_at >= self.ttl
+
+    def invalidate(self):
+        """Mark the index stale after a maid write"""
+        with self._lock:
+            self.generation += 1
+            self._loaded_at = None
+
+    def load(self, rows, generation=None):
+        """
+        Replace the index with maid rows (maid_id, shift_start_time, shift_end_time, ...)
+        generation: self.generation read before the rows were queried; if a write
+        invalidated the index meanwhile, the rows are used but the index stays stale
+        """
+        starts, ends = defaultdict(set), defaultdict(set)
+        by_id = {}
+        for row in rows:
+            by_id[row['maid_id']] = row
+            start = seconds_of_day(row['shift_start_time'])
+            end = seconds_of_day(row['shift_end_time'])
+            if start is None or end is None:
+                continue
+            for span_start, span_end in spans(start, end):
+                starts[span_start].add(row['maid_id'])
+                ends[span_end].add(row['maid_id'])
+
+        boundaries = sorted({0} | set(starts) | {point for point in ends if point < DAY})
+        on_duty, active = [], set()
+        for point in boundaries:
+            active -= ends.get(point, set())
+            active |= starts.get(point, set())
+            on_duty.append(tuple(sorted(active)))
+
+        with self._lock:
+            self._table = (boundaries, on_duty, by_id)
+            if generation is None or generation == self.generation:
+                self._loaded_at = self._clock()
+
+    def at(self, seconds):
+        """Maids on duty at seconds after midnight"""
+        boundaries, on_duty, by_id = self._table
+        return [by_id[maid_id] for maid_id in on_duty[bisect_right(boundaries, seconds) - 1]]
+
+    def overlapping(self, start, end):
+        """
+        Maids on duty at any moment in [start, end) seconds after midnight
+        end < start wraps past midnight; end == start is the instant start
+        """
+        if start == end:
+            return self.at(start)
+
+        boundaries, on_duty, by_id = self._table
+        found = set()
+        for span_start, span_end in spans(start, end):
+            first = bisect_right(boundaries, span_start) - 1
+            for maid_ids in on_duty[first:bisect_left(boundaries, span_end)]:
+                found.update(maid_ids)
+        return [by_id[maid_id] for maid_id in sorted(found)]
+
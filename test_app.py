@@ -4,11 +4,16 @@ Run with: python -m pytest test_app.py -v
 """
 
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, PropertyMock, patch
 import json
 import jwt
-from datetime import datetime, timedelta
-from app import app, DEMO_USER, format_response 
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from MySQLdb import IntegrityError
+from app import app, DEMO_USER, format_response, encode_cursor, decode_cursor, resource_cache, token_cache
+from app import fulltext_query, sales_deltas, sales_differences, shift_index, autoinc_settings, AUTOINC_QUERY
+from db_pool import PoolExhausted
 
 class TestMaidCafeAPI(unittest.TestCase):
     
@@ -17,6 +22,10 @@ class TestMaidCafeAPI(unittest.TestCase):
         app.config['TESTING'] = True
         app.config['SECRET_KEY'] = 'test-secret-key-123'
         self.app = app.test_client()
+        resource_cache.clear()
+        token_cache.clear()
+        # Batch inserts take their IDs from lastrowid unless a test says otherwise
+        autoinc_settings.update(lock_mode=1, increment=1)
         
         # Create a valid test token
         self.valid_token = jwt.encode({
@@ -56,6 +65,36 @@ class TestMaidCafeAPI(unittest.TestCase):
         response = self.app.get(f'/auth-test?token={self.valid_token}')
         self.assertEqual(response.status_code, 200)
     
+    def test_token_verified_once(self):
+        """Test repeat requests with the same token skip jwt.decode"""
+        with patch('app.jwt.decode', wraps=jwt.decode) as mock_decode:
+            self.app.get(f'/auth-test?token={self.valid_token}')
+            response = self.app.get(f'/auth-test?token={self.valid_token}')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['user'], 'admin')
+        self.assertEqual(mock_decode.call_count, 1)
+    
+    def test_cached_token_still_expires(self):
+        """Test a cached token is rejected once its exp has passed"""
+        self.app.get(f'/auth-test?token={self.valid_token}')
+        claims = jwt.decode(self.valid_token, app.config['SECRET_KEY'], algorithms=['HS256'])
+        
+        with patch('app.time.time', return_value=claims['exp'] + 1):
+            response = self.app.get(f'/auth-test?token={self.valid_token}')
+        
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('expired', json.loads(response.data)['error'])
+    
+    def test_cached_token_rejected_after_key_change(self):
+        """Test rotating SECRET_KEY invalidates cached tokens"""
+        self.app.get(f'/auth-test?token={self.valid_token}')
+        app.config['SECRET_KEY'] = 'rotated-secret-key-456'
+        
+        response = self.app.get(f'/auth-test?token={self.valid_token}')
+        
+        self.assertEqual(response.status_code, 401)
+    
     # ========== FORMATTING TESTS (New) ==========
 
     @patch('app.mysql')
@@ -118,7 +157,7 @@ class TestMaidCafeAPI(unittest.TestCase):
     def test_delete_customer_not_found(self, mock_mysql):
         """Test DELETE /customers/<id> with non-existent ID (Edge Case 404)"""
         mock_cursor = MagicMock()
-        mock_cursor.fetchone.return_value = None 
+        mock_cursor.rowcount = 0 
         mock_mysql.connection.cursor.return_value = mock_cursor
         
         response = self.app.delete(f'/customers/999?token={self.valid_token}')
@@ -130,15 +169,17 @@ class TestMaidCafeAPI(unittest.TestCase):
         """Test DELETE /customers/<id> when customer has orders (Edge Case 400)"""
         mock_cursor = MagicMock()
         
-        mock_cursor.fetchone.side_effect = [
-            {'customer_id': 1}, 
-            {'order_count': 3} 
-        ]
+        # The orders foreign key rejects the delete
+        mock_cursor.execute.side_effect = IntegrityError(
+            1451, 'Cannot delete or update a parent row: a foreign key constraint fails'
+        )
         mock_mysql.connection.cursor.return_value = mock_cursor
         
         response = self.app.delete(f'/customers/1?token={self.valid_token}')
         
         self.assertEqual(response.status_code, 400)
+        mock_mysql.connection.rollback.assert_called()
+        self.assertEqual(mock_cursor.execute.call_count, 1)
     
     # ========== MAID CRUD TESTS ==========
     
@@ -161,6 +202,44 @@ class TestMaidCafeAPI(unittest.TestCase):
             'SELECT * FROM maid WHERE name LIKE %s', ('%Lucy%',)
         )
         
+    @patch('app.mysql')
+    def test_get_maids_search_fulltext(self, mock_mysql):
+        """Test GET /maids?q= searches the FULLTEXT index by relevance when SEARCH_FULLTEXT is on"""
+        app.config['SEARCH_FULLTEXT'] = True
+        self.addCleanup(app.config.__setitem__, 'SEARCH_FULLTEXT', False)
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = [{'maid_id': 1, 'name': 'Lucy'}]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.get(f'/maids?token={self.valid_token}&q=Lucy')
+        
+        self.assertEqual(response.status_code, 200)
+        mock_cursor.execute.assert_called_with(
+            'SELECT * FROM maid WHERE MATCH(name) AGAINST (%s IN BOOLEAN MODE)'
+            ' ORDER BY MATCH(name) AGAINST (%s IN BOOLEAN MODE) DESC',
+            ('+"Lucy"', '+"Lucy"')
+        )
+        
+    def test_fulltext_query_building(self):
+        """Test user input becomes a safe BOOLEAN MODE query"""
+        self.assertEqual(fulltext_query('aying gmail'), '+"aying" +"gmail"')
+        self.assertEqual(fulltext_query('L 555-44'), '+L* +"555-44"')
+        self.assertEqual(fulltext_query('"quoted" -'), '+"quoted"')
+
+    @patch('app.mysql')
+    def test_get_customers_search_like_fallback(self, mock_mysql):
+        """Test GET /customers?q= uses LIKE while SEARCH_FULLTEXT is off (the default)"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = []
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        self.app.get(f'/customers?token={self.valid_token}&q=Ay')
+        
+        mock_cursor.execute.assert_called_with(
+            'SELECT * FROM customer WHERE (name LIKE %s OR email LIKE %s OR phone_number LIKE %s)',
+            ('%Ay%', '%Ay%', '%Ay%')
+        )
+        
     @patch('app.mysql')
     def test_delete_maid_success(self, mock_mysql):
         """Test DELETE /maids/<id> success"""
@@ -269,13 +348,578 @@ class TestMaidCafeAPI(unittest.TestCase):
         self.assertEqual(data['message'], 'Order deleted successfully')
 
 
+    # ========== PAGINATION TESTS ==========
+
+    def test_cursor_round_trip(self):
+        """Test encode_cursor/decode_cursor are inverses"""
+        self.assertEqual(decode_cursor(encode_cursor(42)), 42)
+        with self.assertRaises(ValueError):
+            decode_cursor('not-a-cursor!')
+
+    @patch('app.mysql')
+    def test_get_orders_first_page_has_next_cursor(self, mock_mysql):
+        """Test GET /orders?limit= fetches one extra row to build next_cursor"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = [
+            {'order_id': 1}, {'order_id': 2}, {'order_id': 3}
+        ]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.get(f'/orders?token={self.valid_token}&limit=2&maid_id=1')
+        data = json.loads(response.data)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(decode_cursor(data['next_cursor']), 2)
+        mock_cursor.execute.assert_called_with(
+            'SELECT * FROM orders WHERE 1=1 AND maid_id = %s ORDER BY order_id LIMIT %s',
+            ('1', 3)
+        )
+
+    @patch('app.mysql')
+    def test_get_customers_search_after_cursor(self, mock_mysql):
+        """Test GET /customers combines q with the keyset condition"""
+        app.config['SEARCH_FULLTEXT'] = True
+        self.addCleanup(app.config.__setitem__, 'SEARCH_FULLTEXT', False)
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = [{'customer_id': 9, 'name': 'Aying'}]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        cursor = encode_cursor(5)
+        response = self.app.get(
+            f'/customers?token={self.valid_token}&q=Ay&limit=10&after={cursor}'
+        )
+        data = json.loads(response.data)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(data['next_cursor'])
+        mock_cursor.execute.assert_called_with(
+            'SELECT * FROM customer WHERE MATCH(name, email, phone_number) AGAINST (%s IN BOOLEAN MODE)'
+            ' AND customer_id > %s ORDER BY customer_id LIMIT %s',
+            ('+"Ay"', 5, 11)
+        )
+
+    @patch('app.mysql')
+    def test_get_maids_invalid_limit(self, mock_mysql):
+        """Test GET /maids with an out-of-range limit (Edge Case 400)"""
+        response = self.app.get(f'/maids?token={self.valid_token}&limit=0')
+        
+        self.assertEqual(response.status_code, 400)
+        mock_mysql.connection.cursor.assert_not_called()
+
+    # ========== STREAMING TESTS ==========
+
+    @patch('app.mysql')
+    def test_get_orders_ndjson_stream(self, mock_mysql):
+        """Test GET /orders?format=ndjson streams rows then a count line"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchmany.side_effect = [
+            [{'order_id': 1}, {'order_id': 2}],
+            [{'order_id': 3}],
+            []
+        ]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.get(f'/orders?token={self.valid_token}&format=ndjson')
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual([line.get('order_id') for line in lines[:3]], [1, 2, 3])
+        self.assertEqual(lines[-1], {'count': 3})
+        mock_cursor.fetchall.assert_not_called()
+        mock_cursor.close.assert_called()
+
+    @patch('app.mysql')
+    def test_get_maids_json_stream(self, mock_mysql):
+        """Test GET /maids?stream=1 keeps the usual envelope"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchmany.side_effect = [
+            [{'maid_id': 1, 'name': 'Lucy', 'shift_start_time': timedelta(hours=9),
+              'shift_end_time': timedelta(hours=17)}],
+            []
+        ]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.get(f'/maids?token={self.valid_token}&stream=1')
+        data = json.loads(response.data)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['maids'][0]['shift_start_time'], '9:00:00')
+
+    @patch('app.mysql')
+    def test_get_maid_xml_format(self, mock_mysql):
+        """Test GET /maids/<id>?format=xml encodes timedelta shift times"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = {
+            'maid_id': 1, 'name': 'Lucy',
+            'shift_start_time': timedelta(hours=9), 'shift_end_time': timedelta(hours=17)
+        }
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.get(f'/maids/1?token={self.valid_token}&format=xml')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'<shift_start_time>9:00:00</shift_start_time>', response.data)
+
+    @patch('app.mysql')
+    def test_get_maid_json_matches_list(self, mock_mysql):
+        """Test GET /maids/<id> encodes shift times like GET /maids does"""
+        row = {'maid_id': 1, 'name': 'Lucy',
+               'shift_start_time': timedelta(hours=9), 'shift_end_time': timedelta(hours=17)}
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = row
+        mock_cursor.fetchall.return_value = [row]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        single = json.loads(self.app.get(f'/maids/1?token={self.valid_token}').data)
+        listed = json.loads(self.app.get(f'/maids?token={self.valid_token}').data)
+        
+        self.assertEqual(single['shift_start_time'], '9:00:00')
+        self.assertEqual(listed['maids'], [single])
+
+    @patch('app.mysql')
+    def test_get_orders_xml_stream(self, mock_mysql):
+        """Test GET /orders?stream=1&format=xml streams items then the count"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchmany.side_effect = [[{'order_id': 1}, {'order_id': 2}], []]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.get(f'/orders?token={self.valid_token}&stream=1&format=xml')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/xml')
+        self.assertIn(b'<orders><item><order_id>1</order_id></item>', response.data)
+        self.assertTrue(response.data.endswith(b'<count>2</count></response>'))
+
+    # ========== ON-SHIFT TESTS ==========
+
+    @patch('app.mysql')
+    def test_maids_on_shift_uses_index(self, mock_mysql):
+        """Test GET /maids/on-shift loads the shift index once and answers from memory"""
+        shift_index.invalidate()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = [
+            {'maid_id': 1, 'name': 'Aki', 'shift_start_time': timedelta(hours=9), 'shift_end_time': timedelta(hours=17)},
+            {'maid_id': 2, 'name': 'Mei', 'shift_start_time': timedelta(hours=22), 'shift_end_time': timedelta(hours=6)},
+        ]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        night = self.app.get(f'/maids/on-shift?token={self.valid_token}&at=02:30:00')
+        evening = self.app.get(f'/maids/on-shift?token={self.valid_token}&from=16:00:00&to=23:00:00')
+        
+        self.assertEqual(json.loads(night.data), {
+            'at': '02:30:00', 'count': 1,
+            'maids': [{'maid_id': 2, 'name': 'Mei', 'shift_start_time': '22:00:00', 'shift_end_time': '6:00:00'}]
+        })
+        self.assertEqual([m['maid_id'] for m in json.loads(evening.data)['maids']], [1, 2])
+        mock_cursor.execute.assert_called_once_with(
+            'SELECT maid_id, name, shift_start_time, shift_end_time FROM maid'
+        )
+    
+    @patch('app.mysql')
+    def test_update_maid_invalidates_shift_index(self, mock_mysql):
+        """Test a maid write makes the next on-shift lookup reload the index"""
+        shift_index.load([])
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = {'maid_id': 1, 'name': 'Aki'}
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        self.app.put(f'/maids/1?token={self.valid_token}', json={'shift_end_time': '18:00:00'})
+        
+        self.assertTrue(shift_index.stale())
+    
+    @patch('app.mysql')
+    def test_maids_on_shift_bad_time(self, mock_mysql):
+        """Test GET /maids/on-shift rejects malformed or half-given times (Edge Case 400)"""
+        malformed = self.app.get(f'/maids/on-shift?token={self.valid_token}&at=25:00')
+        half = self.app.get(f'/maids/on-shift?token={self.valid_token}&from=09:00:00')
+        
+        self.assertEqual(json.loads(malformed.data)['error'], 'at must be a HH:MM:SS time')
+        self.assertEqual(json.loads(half.data)['error'], 'from and to must be given together')
+        mock_mysql.connection.cursor.assert_not_called()
+
+    # ========== ORDER STATS TESTS ==========
+
+    @patch('app.mysql')
+    def test_order_stats_grouped(self, mock_mysql):
+        """Test GET /orders/stats pushes grouping and filters into SQL"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = [
+            {'maid_id': 1, 'month': datetime(2023, 10, 1).date(), 'order_count': 2,
+             'total_amount': 50.0, 'avg_amount': 25.0, 'min_amount': 20.0, 'max_amount': 30.0}
+        ]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.get(
+            f'/orders/stats?token={self.valid_token}&group_by=maid_id,month&min_amount=10'
+        )
+        data = json.loads(response.data)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['stats'][0]['month'], '2023-10-01')
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertIn('COUNT(*) AS order_count', query)
+        self.assertIn('WHERE 1=1 AND total_amount >= %s', query)
+        self.assertTrue(query.endswith('GROUP BY maid_id, month ORDER BY maid_id, month'))
+        self.assertEqual(params, (10.0,))
+
+    @patch('app.mysql')
+    def test_order_stats_unknown_group(self, mock_mysql):
+        """Test GET /orders/stats rejects unknown group_by keys (Edge Case 400)"""
+        response = self.app.get(f'/orders/stats?token={self.valid_token}&group_by=name')
+        
+        self.assertEqual(response.status_code, 400)
+        mock_mysql.connection.cursor.assert_not_called()
+
+    # ========== DAILY SALES SUMMARY TESTS ==========
+
+    def test_sales_deltas(self):
+        """Test replacing an order nets its old and new totals per (day, maid, customer)"""
+        old = {'order_date': datetime(2024, 1, 5, 9), 'maid_id': 1, 'customer_id': 3, 'total_amount': Decimal('10.00')}
+        
+        self.assertEqual(sales_deltas([old], [dict(old, total_amount=12.345)]),
+                         {(date(2024, 1, 5), 1, 3): (0, Decimal('2.35'))})
+        self.assertEqual(sales_deltas([old], [dict(old, order_date=datetime(2024, 1, 6))]), {
+            (date(2024, 1, 5), 1, 3): (-1, Decimal('-10.00')),
+            (date(2024, 1, 6), 1, 3): (1, Decimal('10.00')),
+        })
+        self.assertEqual(sales_deltas([old], [old]), {})
+        self.assertEqual(sales_deltas(added=[dict(old, maid_id=None)]), {})
+
+    @patch('app.mysql')
+    def test_delete_order_subtracts_sales(self, mock_mysql):
+        """Test DELETE /orders/<id> locks the order and removes it from daily_sales before committing"""
+        app.config['SALES_SUMMARY'] = True
+        self.addCleanup(app.config.__setitem__, 'SALES_SUMMARY', False)
+        mock_cursor = MagicMock()
+        mock_cursor.rowcount = 1
+        mock_cursor.fetchone.return_value = {'order_id': 5, 'customer_id': 3, 'maid_id': 1,
+                                             'order_date': datetime(2024, 1, 5, 9), 'total_amount': Decimal('7.50')}
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.delete(f'/orders/5?token={self.valid_token}')
+        
+        self.assertEqual(response.status_code, 200)
+        statements = [c.args for c in mock_cursor.execute.call_args_list]
+        self.assertEqual(statements[0], ('SELECT * FROM orders WHERE order_id = %s FOR UPDATE', (5,)))
+        self.assertEqual(statements[1], ('DELETE FROM orders WHERE order_id = %s', (5,)))
+        self.assertEqual(statements[2][1], (date(2024, 1, 5), 1, 3, -1, Decimal('-7.50')))
+        mock_mysql.connection.commit.assert_called_once()
+
+    @patch('app.mysql')
+    def test_daily_sales_scans_orders_without_summary(self, mock_mysql):
+        """Test GET /orders/daily-sales aggregates orders by whole days when SALES_SUMMARY is off"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = []
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.get(f'/orders/daily-sales?token={self.valid_token}&end_date=2024-01-31')
+        
+        self.assertEqual(response.status_code, 200)
+        query, params = mock_cursor.execute.call_args[0]
+        self.assertIn('SELECT DATE(order_date) AS day, COUNT(*) AS order_count', query)
+        self.assertIn('AND order_date < %s GROUP BY day', query)
+        self.assertEqual(params, (date(2024, 2, 1),))
+
+    @patch('app.mysql')
+    def test_daily_sales_bad_parameters(self, mock_mysql):
+        """Test GET /orders/daily-sales rejects unknown groups and malformed dates (Edge Case 400)"""
+        grouped = self.app.get(f'/orders/daily-sales?token={self.valid_token}&group_by=month')
+        dated = self.app.get(f'/orders/daily-sales?token={self.valid_token}&start_date=05/01/2024')
+        
+        self.assertEqual(grouped.status_code, 400)
+        self.assertEqual(json.loads(dated.data)['error'], 'start_date must be a YYYY-MM-DD date')
+        mock_mysql.connection.cursor.assert_not_called()
+
+    def test_sales_differences(self):
+        """Test the rebuild check ignores zeroed rows and reports drifted or missing ones"""
+        day = date(2024, 1, 5)
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.side_effect = [
+            [{'day': day, 'maid_id': 1, 'customer_id': 3, 'order_count': 2, 'total_amount': Decimal('20.00')},
+             {'day': day, 'maid_id': 2, 'customer_id': 3, 'order_count': 1, 'total_amount': Decimal('5.00')}],
+            [{'day': day, 'maid_id': 1, 'customer_id': 3, 'order_count': 2, 'total_amount': Decimal('18.00')},
+             {'day': day, 'maid_id': 4, 'customer_id': 3, 'order_count': 0, 'total_amount': Decimal('0.00')}],
+        ]
+        
+        self.assertEqual(sales_differences(mock_cursor), [
+            ((day, 1, 3), (2, Decimal('18.00')), (2, Decimal('20.00'))),
+            ((day, 2, 3), None, (1, Decimal('5.00'))),
+        ])
+
+    # ========== SINGLE-STATEMENT WRITE TESTS ==========
+
+    @patch('app.mysql')
+    def test_update_customer_partial(self, mock_mysql):
+        """Test PUT /customers/<id> writes only the sent fields, then re-reads once"""
+        mock_cursor = MagicMock()
+        mock_cursor.rowcount = 1
+        mock_cursor.fetchone.return_value = {'customer_id': 1, 'name': 'Renamed'}
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.put(f'/customers/1?token={self.valid_token}', json={'name': 'Renamed'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_cursor.execute.call_args_list[0][0], (
+            'UPDATE customer SET name = %s WHERE customer_id = %s', ('Renamed', 1)
+        ))
+        self.assertEqual(mock_cursor.execute.call_count, 2)
+
+    @patch('app.mysql')
+    def test_update_customer_no_changes(self, mock_mysql):
+        """Test PUT /customers/<id> with identical values (Edge Case 400)"""
+        mock_cursor = MagicMock()
+        mock_cursor.rowcount = 0
+        mock_cursor.fetchone.return_value = {'customer_id': 1, 'name': 'Aying'}
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.put(f'/customers/1?token={self.valid_token}', json={'name': 'Aying'})
+        
+        self.assertEqual(response.status_code, 400)
+
+    @patch('app.mysql')
+    def test_update_order_unknown_maid(self, mock_mysql):
+        """Test PUT /orders/<id> maps FK errno 1452 to 404 (Edge Case 404)"""
+        mock_cursor = MagicMock()
+        mock_cursor.execute.side_effect = IntegrityError(
+            1452, 'Cannot add or update a child row: a foreign key constraint fails '
+                  '(`maid_cafe`.`orders`, CONSTRAINT `orders_ibfk_2` FOREIGN KEY (`maid_id`) '
+                  'REFERENCES `maid` (`maid_id`))'
+        )
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.put(f'/orders/5?token={self.valid_token}', json={'maid_id': 999})
+        data = json.loads(response.data)
+        
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(data['error'], 'Maid not found')
+
+    @patch('app.mysql')
+    def test_delete_order_not_found(self, mock_mysql):
+        """Test DELETE /orders/<id> relies on rowcount (Edge Case 404)"""
+        mock_cursor = MagicMock()
+        mock_cursor.rowcount = 0
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.delete(f'/orders/999?token={self.valid_token}')
+        
+        self.assertEqual(response.status_code, 404)
+        mock_cursor.execute.assert_called_once_with(
+            "DELETE FROM orders WHERE order_id = %s", (999,)
+        )
+
+    # ========== CACHE TESTS ==========
+
+    @patch('app.mysql')
+    def test_get_customer_served_from_cache(self, mock_mysql):
+        """Test repeated GET /customers/<id> hits MySQL once"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = {'customer_id': 1, 'name': 'Aying'}
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        first = self.app.get(f'/customers/1?token={self.valid_token}')
+        second = self.app.get(f'/customers/1?token={self.valid_token}')
+        
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(json.loads(second.data)['name'], 'Aying')
+        self.assertEqual(mock_cursor.execute.call_count, 1)
+        self.assertEqual(resource_cache.stats()['hits'], 1)
+
+    @patch('app.mysql')
+    def test_delete_maid_invalidates_cache(self, mock_mysql):
+        """Test DELETE /maids/<id> drops the cached maid"""
+        resource_cache.set('maid:1', {'maid_id': 1, 'name': 'Lucy'})
+        mock_cursor = MagicMock()
+        mock_cursor.rowcount = 1
+        mock_cursor.fetchone.return_value = None
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        self.app.delete(f'/maids/1?token={self.valid_token}')
+        response = self.app.get(f'/maids/1?token={self.valid_token}')
+        
+        self.assertEqual(response.status_code, 404)
+
+    # ========== ETAG TESTS ==========
+
+    @patch('app.mysql')
+    def test_get_customer_etag_304(self, mock_mysql):
+        """Test GET /customers/<id> answers a matching If-None-Match with 304"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = {'customer_id': 1, 'name': 'Aying'}
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        first = self.app.get(f'/customers/1?token={self.valid_token}')
+        etag = first.headers.get('ETag')
+        second = self.app.get(f'/customers/1?token={self.valid_token}',
+                              headers={'If-None-Match': etag})
+        
+        self.assertIsNotNone(etag)
+        self.assertFalse(etag.startswith('W/'))
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b'')
+
+    @patch('app.mysql')
+    def test_get_maids_table_version_304(self, mock_mysql):
+        """Test GET /maids serves 304 from the version marker without the full query"""
+        app.config['ETAG_TABLE_VERSIONS'] = True
+        self.addCleanup(app.config.__setitem__, 'ETAG_TABLE_VERSIONS', False)
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = [{'table_name': 'maid', 'version': 7}]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        first = self.app.get(f'/maids?token={self.valid_token}')
+        etag = first.headers.get('ETag')
+        mock_cursor.execute.reset_mock()
+        second = self.app.get(f'/maids?token={self.valid_token}',
+                              headers={'If-None-Match': etag})
+        
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(mock_cursor.execute.call_count, 1)
+        self.assertIn('FROM table_version', mock_cursor.execute.call_args[0][0])
+
+    @patch('app.mysql')
+    def test_post_has_no_etag(self, mock_mysql):
+        """Test write responses are never made conditional"""
+        mock_cursor = MagicMock()
+        mock_cursor.lastrowid = 3
+        mock_cursor.fetchone.return_value = {'customer_id': 3, 'name': 'New Customer'}
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.post(f'/customers?token={self.valid_token}', json={'name': 'New Customer'})
+        
+        self.assertIsNone(response.headers.get('ETag'))
+
+    @patch('app.mysql')
+    def test_writes_bump_table_version_only_when_enabled(self, mock_mysql):
+        """Test a write bumps its table's version marker once, before the commit, only with ETAG_TABLE_VERSIONS"""
+        mock_cursor = MagicMock()
+        mock_cursor.lastrowid = 3
+        mock_cursor.fetchone.return_value = {'maid_id': 3, 'name': 'Lucy'}
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        self.app.post(f'/maids?token={self.valid_token}', json={'name': 'Lucy'})
+        self.assertFalse(any('table_version' in c.args[0] for c in mock_cursor.execute.call_args_list))
+        
+        app.config['ETAG_TABLE_VERSIONS'] = True
+        self.addCleanup(app.config.__setitem__, 'ETAG_TABLE_VERSIONS', False)
+        mock_cursor.execute.reset_mock()
+        mock_mysql.connection.commit.reset_mock()
+        mock_mysql.connection.commit.side_effect = lambda: self.assertEqual(
+            mock_cursor.execute.call_args.args,
+            ("UPDATE table_version SET version = version + 1 WHERE table_name IN (%s)", ('maid',)))
+        
+        response = self.app.post(f'/maids?token={self.valid_token}', json={'name': 'Lucy'})
+        
+        self.assertEqual(response.status_code, 200)
+        mock_mysql.connection.commit.assert_called_once()
+
+    # ========== BATCH CREATE TESTS ==========
+
+    @patch('app.mysql')
+    def test_create_customers_batch(self, mock_mysql):
+        """Test POST /customers/batch inserts valid rows in one statement"""
+        mock_cursor = MagicMock()
+        mock_cursor.lastrowid = 20
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        rows = [{'name': 'A'}, {'email': 'no-name@cafe.com'}, {'name': 'B', 'email': 'b@cafe.com'}]
+        response = self.app.post(f'/customers/batch?token={self.valid_token}', json=rows)
+        data = json.loads(response.data)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['created'], [
+            {'index': 0, 'customer_id': 20}, {'index': 2, 'customer_id': 21}
+        ])
+        self.assertEqual(data['errors'], [{'index': 1, 'error': 'Name is required'}])
+        mock_cursor.execute.assert_called_once_with(
+            'INSERT INTO customer (name, email, phone_number) VALUES (%s, %s, %s), (%s, %s, %s)',
+            ('A', '', '', 'B', 'b@cafe.com', '')
+        )
+        mock_mysql.connection.commit.assert_called_once()
+
+    @patch('app.mysql')
+    def test_create_orders_batch_checks_references_once(self, mock_mysql):
+        """Test POST /orders/batch resolves customers and maids with one query each"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.side_effect = [
+            [{'customer_id': 1}],
+            [{'maid_id': 1}, {'maid_id': 2}]
+        ]
+        mock_cursor.lastrowid = 100
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        rows = [
+            {'customer_id': 1, 'maid_id': 1, 'total_amount': 10.0},
+            {'customer_id': 7, 'maid_id': 2, 'total_amount': 12.0},
+            {'customer_id': 1, 'maid_id': 2}
+        ]
+        response = self.app.post(f'/orders/batch?token={self.valid_token}', json=rows)
+        data = json.loads(response.data)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['order_id'] for c in data['created']], [100, 101])
+        self.assertEqual(data['errors'], [{'index': 1, 'error': 'Customer not found'}])
+        # Two reference lookups plus a single INSERT
+        self.assertEqual(mock_cursor.execute.call_count, 3)
+
+    @patch('app.mysql')
+    def test_create_batch_reads_autoinc_settings_once(self, mock_mysql):
+        """Test the first batch insert checks the server's auto-increment settings and honours the increment"""
+        autoinc_settings.clear()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = {'lock_mode': 1, 'increment': 3}
+        mock_cursor.lastrowid = 10
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        rows = [{'name': 'A'}, {'name': 'B'}]
+        first = json.loads(self.app.post(f'/customers/batch?token={self.valid_token}', json=rows).data)
+        self.app.post(f'/customers/batch?token={self.valid_token}', json=rows)
+        
+        self.assertEqual([c['customer_id'] for c in first['created']], [10, 13])
+        queries = [c.args[0] for c in mock_cursor.execute.call_args_list]
+        self.assertEqual(queries.count(AUTOINC_QUERY), 1)
+        self.assertEqual(len(queries), 3)
+
+    @patch('app.mysql')
+    def test_create_batch_inserts_per_row_in_interleaved_mode(self, mock_mysql):
+        """Test innodb_autoinc_lock_mode 2 falls back to one INSERT per row with exact IDs"""
+        autoinc_settings.update(lock_mode=2, increment=1)
+        mock_cursor = MagicMock()
+        type(mock_cursor).lastrowid = PropertyMock(side_effect=[40, 47])
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.post(f'/customers/batch?token={self.valid_token}',
+                                 json=[{'name': 'A'}, {'name': 'B'}])
+        
+        self.assertEqual([c['customer_id'] for c in json.loads(response.data)['created']], [40, 47])
+        self.assertEqual(mock_cursor.execute.call_count, 2)
+        mock_mysql.connection.commit.assert_called_once()
+
+    @patch('app.mysql')
+    def test_create_maids_batch_not_a_list(self, mock_mysql):
+        """Test POST /maids/batch with an object instead of an array (Edge Case 400)"""
+        response = self.app.post(f'/maids/batch?token={self.valid_token}', json={'name': 'Lucy'})
+        
+        self.assertEqual(response.status_code, 400)
+        mock_mysql.connection.cursor.assert_not_called()
+
+    @patch('app.mysql')
+    def test_pool_exhausted_returns_503(self, mock_mysql):
+        """Test a request that cannot get a pooled connection gets 503"""
+        type(mock_mysql).connection = PropertyMock(side_effect=PoolExhausted('busy'))
+        
+        response = self.app.get(f'/orders?token={self.valid_token}')
+        
+        self.assertEqual(response.status_code, 503)
+
     # ========== UTILITY TESTS (New) ==========
     
     @patch('app.mysql')
     def test_health_check_success(self, mock_mysql):
         """Test GET /health check (connected status)"""
-        mock_cursor = MagicMock()
-        mock_mysql.connection.cursor.return_value = mock_cursor
+        mock_mysql.pool_status.return_value = {'healthy': True, 'size': 2, 'idle': 2, 'in_use': 0}
         
         response = self.app.get('/health')
         data = json.loads(response.data)
@@ -283,10 +927,13 @@ class TestMaidCafeAPI(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(data['status'], 'healthy')
         self.assertEqual(data['database'], 'connected')
+        self.assertEqual(data['pool']['idle'], 2)
+        mock_mysql.connection.cursor.assert_not_called()
 
-    @patch('app.mysql', side_effect=Exception('DB Down'))
+    @patch('app.mysql')
     def test_health_check_db_disconnected(self, mock_mysql):
         """Test GET /health check (disconnected status)"""
+        mock_mysql.pool_status.side_effect = Exception('DB Down')
         response = self.app.get('/health')
         data = json.loads(response.data)
         
@@ -294,5 +941,250 @@ class TestMaidCafeAPI(unittest.TestCase):
         self.assertEqual(data['status'], 'healthy')
         self.assertEqual(data['database'], 'disconnected')
 
+    # ========== SPARSE FIELDSET TESTS ==========
+
+    @patch('app.mysql')
+    def test_get_customers_fields_pushed_into_select(self, mock_mysql):
+        """Test ?fields= narrows the SELECT list and always keeps the primary key"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = [{'customer_id': 1, 'name': 'Aying'}]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.get(f'/customers?token={self.valid_token}&fields=name&limit=10')
+        
+        self.assertEqual(response.status_code, 200)
+        mock_cursor.execute.assert_called_with(
+            'SELECT customer_id, name FROM customer ORDER BY customer_id LIMIT %s', (11,)
+        )
+
+    @patch('app.mysql')
+    def test_get_orders_unknown_field(self, mock_mysql):
+        """Test ?fields= outside the column whitelist (Edge Case 400)"""
+        response = self.app.get(f'/orders?token={self.valid_token}&fields=total_amount,password')
+        data = json.loads(response.data)
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unknown field(s): password', data['error'])
+        mock_mysql.connection.cursor.assert_not_called()
+
+    @patch('app.mysql')
+    def test_get_order_fields_xml(self, mock_mysql):
+        """Test a single GET projects the cached row for XML output too"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = {
+            'order_id': 1, 'customer_id': 2, 'maid_id': 3, 'total_amount': 12.5
+        }
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.get(f'/orders/1?token={self.valid_token}&fields=total_amount&format=xml')
+        
+        self.assertEqual(response.data, b'<?xml version="1.0" encoding="UTF-8" ?><response>'
+                                        b'<order_id>1</order_id><total_amount>12.5</total_amount></response>')
+
+    # ========== INCLUDE TESTS ==========
+
+    @patch('app.mysql')
+    def test_get_orders_include_batches_lookups(self, mock_mysql):
+        """Test ?include= embeds related rows with one IN (...) query per relation"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.side_effect = [
+            [{'order_id': 1, 'customer_id': 2, 'maid_id': 5, 'total_amount': 10},
+             {'order_id': 2, 'customer_id': 2, 'maid_id': 6, 'total_amount': 20}],
+            [{'customer_id': 2, 'name': 'Aying'}],
+            [{'maid_id': 5, 'name': 'Lucy', 'shift_start_time': timedelta(hours=9),
+              'shift_end_time': timedelta(hours=17)}],
+        ]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+
+        response = self.app.get(f'/orders?token={self.valid_token}&include=maid,customer')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_cursor.execute.call_count, 3)
+        customer_query, maid_query = mock_cursor.execute.call_args_list[1:]
+        self.assertEqual(customer_query[0], ('SELECT * FROM customer WHERE customer_id IN (%s)', (2,)))
+        self.assertTrue(maid_query[0][0].startswith('SELECT * FROM maid WHERE maid_id IN (%s, %s)'))
+        self.assertEqual(data['orders'][0]['customer'], {'customer_id': 2, 'name': 'Aying'})
+        self.assertEqual(data['orders'][0]['maid']['shift_start_time'], '9:00:00')
+        self.assertIsNone(data['orders'][1]['maid'])
+
+    @patch('app.mysql')
+    def test_get_order_include_keeps_foreign_key(self, mock_mysql):
+        """Test include on a single GET adds the foreign key back to a ?fields= projection"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.side_effect = [
+            {'order_id': 1, 'customer_id': 2, 'maid_id': 3, 'total_amount': 12.5},
+            {'customer_id': 2, 'name': 'Aying'},
+        ]
+        mock_mysql.connection.cursor.return_value = mock_cursor
+
+        response = self.app.get(f'/orders/1?token={self.valid_token}&fields=total_amount&include=customer')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data, {'order_id': 1, 'customer_id': 2, 'total_amount': 12.5,
+                                'customer': {'customer_id': 2, 'name': 'Aying'}})
+
+    @patch('app.mysql')
+    def test_get_orders_include_rejected(self, mock_mysql):
+        """Test unknown relations and include with streaming (Edge Case 400)"""
+        unknown = self.app.get(f'/orders?token={self.valid_token}&include=payments')
+        streamed = self.app.get(f'/orders?token={self.valid_token}&include=maid&format=ndjson')
+
+        self.assertEqual(unknown.status_code, 400)
+        self.assertIn('Unknown include(s): payments', json.loads(unknown.data)['error'])
+        self.assertEqual(streamed.status_code, 400)
+        mock_mysql.connection.cursor.assert_not_called()
+
+    # ========== EXPORT TESTS ==========
+
+    @patch('app.export_jobs')
+    def test_create_export(self, mock_jobs):
+        """Test POST /exports queues the filtered orders query and answers 202"""
+        mock_jobs.submit.return_value = {'id': 'a' * 32, 'status': 'queued', 'format': 'csv'}
+        
+        response = self.app.post(f'/exports?token={self.valid_token}',
+                                 json={'format': 'csv', 'maid_id': 4, 'fields': 'total_amount'})
+        
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers['Location'], '/exports/' + 'a' * 32)
+        mock_jobs.submit.assert_called_once_with(
+            'SELECT order_id, total_amount FROM orders WHERE 1=1 AND maid_id = %s ORDER BY order_id',
+            (4,), 'csv'
+        )
+    
+    @patch('app.export_jobs')
+    def test_create_export_bad_format(self, mock_jobs):
+        """Test POST /exports with an unknown format (Edge Case 400)"""
+        response = self.app.post(f'/exports?token={self.valid_token}', json={'format': 'xlsx'})
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unsupported export format: xlsx', json.loads(response.data)['error'])
+        mock_jobs.submit.assert_not_called()
+    
+    @patch('app.export_jobs')
+    def test_download_unfinished_export(self, mock_jobs):
+        """Test downloads are refused until the job is done (Edge Case 409/404)"""
+        mock_jobs.get.side_effect = [{'id': 'b' * 32, 'status': 'running', 'rows': 5000}, None]
+        
+        running = self.app.get(f"/exports/{'b' * 32}/download?token={self.valid_token}")
+        missing = self.app.get(f"/exports/{'c' * 32}?token={self.valid_token}")
+        
+        self.assertEqual(running.status_code, 409)
+        self.assertEqual(json.loads(running.data)['status'], 'running')
+        self.assertEqual(missing.status_code, 404)
+
+    # ========== IMPORT TESTS ==========
+
+    @patch('app.mysql')
+    def test_import_orders_csv(self, mock_mysql):
+        """Test POST /imports/orders loads valid rows and reports rejected ones"""
+        mock_connection = mock_mysql.open_connection.return_value
+        mock_cursor = mock_connection.cursor.return_value
+        mock_cursor.fetchall.side_effect = [[{'customer_id': 1}], [{'maid_id': 2}]]
+        body = ('customer_id,maid_id,total_amount,order_date\n'
+                '1,2,10.50,2024-01-05\n'
+                '9,2,3.00,\n'
+                '1,2,abc,\n')
+        
+        with tempfile.TemporaryDirectory() as directory:
+            app.config['IMPORT_REJECTS_DIR'] = directory
+            try:
+                response = self.app.post(f'/imports/orders?token={self.valid_token}',
+                                         data=body, content_type='text/csv')
+                data = json.loads(response.data)
+                with open(data['rejects_file'], encoding='utf-8') as f:
+                    rejects = f.read()
+            finally:
+                app.config['IMPORT_REJECTS_DIR'] = 'imports'
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((data['table'], data['inserted'], data['rejected']), ('orders', 1, 2))
+        self.assertIn('9,2,3.00,,3,Customer not found', rejects)
+        self.assertIn('1,2,abc,,4,', rejects)
+        mock_cursor.execute.assert_called_with(
+            'INSERT INTO orders (customer_id, maid_id, total_amount, order_date) VALUES (%s, %s, %s, %s)',
+            (1, 2, 10.5, datetime(2024, 1, 5))
+        )
+        mock_connection.commit.assert_called_once()
+        mock_connection.close.assert_called_once()
+    
+    @patch('app.mysql')
+    def test_import_unknown_table(self, mock_mysql):
+        """Test POST /imports/<name> for a table that cannot be imported (Edge Case 404)"""
+        response = self.app.post(f'/imports/maids?token={self.valid_token}',
+                                 data='name\nLucy\n', content_type='text/csv')
+        
+        self.assertEqual(response.status_code, 404)
+        mock_mysql.open_connection.assert_not_called()
+    
+    @patch('app.mysql')
+    def test_import_empty_csv(self, mock_mysql):
+        """Test POST /imports/customers with no header row (Edge Case 400)"""
+        response = self.app.post(f'/imports/customers?token={self.valid_token}',
+                                 data='', content_type='text/csv')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)['error'], 'CSV file is empty')
+        mock_mysql.open_connection.assert_not_called()
+
+    # ========== INSTRUMENTATION TESTS ==========
+
+    @patch('app.mysql')
+    def test_server_timing_header(self, mock_mysql):
+        """Test responses carry a Server-Timing breakdown"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = {'order_id': 1}
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        response = self.app.get(f'/orders/1?token={self.valid_token}')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('serialize;dur=', response.headers['Server-Timing'])
+        self.assertIn('total;dur=', response.headers['Server-Timing'])
+
+    @patch('app.mysql')
+    def test_metrics_endpoint_reports_route(self, mock_mysql):
+        """Test /metrics exposes a latency histogram labelled by route template"""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = {'maid_id': 4, 'name': 'Lucy'}
+        mock_mysql.connection.cursor.return_value = mock_cursor
+        
+        self.app.get(f'/maids/4?token={self.valid_token}')
+        response = self.app.get('/metrics')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        self.assertIn(b'route="/maids/<int:maid_id>",status="200",le="+Inf"}', response.data)
+
+    @patch('app.mysql')
+    def test_metrics_pool_counters(self, mock_mysql):
+        """Test monotonic pool totals are exported as _total counters and current figures as gauges"""
+        mock_mysql.pool.stats.return_value = {'size': 4, 'in_use': 1, 'idle': 3,
+                                              'exhausted': 2, 'wait_seconds_total': 0.5}
+        mock_mysql.replicas = None
+        
+        lines = self.app.get('/metrics').data.decode().splitlines()
+        
+        self.assertIn('# TYPE maid_cafe_db_pool_idle gauge', lines)
+        self.assertIn('# TYPE maid_cafe_db_pool_exhausted_total counter', lines)
+        self.assertIn('maid_cafe_db_pool_wait_seconds_total 0.5', lines)
+        self.assertIn('maid_cafe_db_replica_failovers_total 0', lines)
+        self.assertFalse(any(line.startswith('maid_cafe_db_pool_exhausted ') for line in lines))
+
+    @patch('app.profiling.finish')
+    @patch('app.mysql')
+    def test_profile_mode_reports_request(self, mock_mysql, mock_finish):
+        """Test PROFILE_ENABLED hands each request's statements to the profiler"""
+        app.config['PROFILE_ENABLED'] = True
+        self.addCleanup(app.config.__setitem__, 'PROFILE_ENABLED', False)
+        mock_mysql.connection.cursor.return_value.fetchone.return_value = {'order_id': 1}
+        
+        self.app.get(f'/orders/1?token={self.valid_token}')
+        
+        args = mock_finish.call_args[0]
+        self.assertEqual(args[2:5], ('GET', '/orders/1', '/orders/<int:order_id>'))
+        self.assertEqual(args[5].statements, [])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
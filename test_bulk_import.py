@@ -0,0 +1,201 @@
+"""
+Unit tests for the bulk CSV import
+Run with: python -m pytest test_bulk_import.py -v
+"""
+
+import csv
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import bulk_import
+from bulk_import import RejectWriter, read_chunks
+from app import app, IMPORTS, import_csv
+
+
+def reader(text):
+    return csv.DictReader(io.StringIO(text))
+
+
+class TestImportHelpers(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_read_chunks(self):
+        """Test rows come back in chunk_rows-sized lists with their file line numbers"""
+        chunks = list(read_chunks(reader('name\nA\nB\nC\n'), 2))
+
+        self.assertEqual([[line for line, _ in chunk] for chunk in chunks], [[2, 3], [4]])
+        self.assertEqual(chunks[1][0][1], {'name': 'C'})
+
+    def test_reject_writer_is_lazy(self):
+        """Test no side file is created when nothing is rejected"""
+        path = os.path.join(self.directory, 'sub', 'rejects.csv')
+        rejects = RejectWriter(path, ['name'])
+        rejects.close()
+
+        self.assertFalse(os.path.exists(path))
+        rejects = RejectWriter(path, ['name'])
+        rejects.write(7, {'name': ''}, 'Name is required')
+        rejects.close()
+
+        with open(path, newline='') as f:
+            self.assertEqual(list(csv.DictReader(f)),
+                             [{'name': '', 'line': '7', 'error': 'Name is required'}])
+        self.assertEqual(rejects.count, 1)
+
+    def test_load_data_statement(self):
+        """Test LOAD DATA reads a temporary CSV of the rows and removes it afterwards"""
+        cur = MagicMock()
+        cur.rowcount = 2
+        seen = {}
+        cur.execute.side_effect = lambda statement, params: seen.update(
+            statement=statement, data=open(params[0]).read(), path=params[0])
+
+        count = bulk_import.load_data(cur, 'customer', ('name', 'email'), [('A', 'a@x'), ('B, Jr', '')])
+
+        self.assertEqual(count, 2)
+        self.assertTrue(seen['statement'].startswith('LOAD DATA LOCAL INFILE %s INTO TABLE customer'))
+        self.assertTrue(seen['statement'].endswith('(name, email)'))
+        self.assertEqual(seen['data'], 'A,a@x\n"B, Jr",\n')
+        self.assertFalse(os.path.exists(seen['path']))
+
+    def test_load_data_nulls_and_backslashes(self):
+        """Test None is written as \\N (NULL) and backslashes survive the \\ escape character"""
+        cur = MagicMock()
+        seen = {}
+        cur.execute.side_effect = lambda statement, params: seen.update(
+            statement=statement, data=open(params[0]).read())
+
+        bulk_import.load_data(cur, 'customer', ('name', 'email'), [('C:\\Temp', None), ('\\N', '')])
+
+        self.assertIn("ESCAPED BY '\\\\'", seen['statement'])
+        self.assertEqual(seen['data'], 'C:\\\\Temp,\\N\n\\\\N,\n')
+
+
+class TestImportCSV(unittest.TestCase):
+
+    def setUp(self):
+        self.cursor = MagicMock()
+        self.connection = MagicMock()
+        self.connection.cursor.return_value = self.cursor
+        self.rejects = MagicMock()
+
+    def test_references_are_cached_across_chunks(self):
+        """Test ids found in one chunk are not looked up again in the next"""
+        self.cursor.fetchall.side_effect = [
+            [{'customer_id': 1}], [{'maid_id': 2}],
+            [{'customer_id': 3}], []
+        ]
+        text = 'customer_id,maid_id\n1,2\n1,2\n3,2\n3,5\n'
+
+        inserted = import_csv(self.connection, IMPORTS['orders'], reader(text), self.rejects, 2)
+
+        self.assertEqual(inserted, 3)
+        lookups = [call.args for call in self.cursor.execute.call_args_list
+                   if call.args[0].startswith('SELECT')]
+        self.assertEqual([params for _, params in lookups], [(1,), (2,), (3,), (5,)])
+        self.rejects.write.assert_called_once_with(5, {'customer_id': '3', 'maid_id': '5'}, 'Maid not found')
+        self.assertEqual(self.connection.commit.call_count, 2)
+
+    def test_failed_chunk_is_rolled_back_and_rejected(self):
+        """Test a database error rejects its whole chunk and the import carries on"""
+        self.cursor.execute.side_effect = [Exception('Duplicate entry'), None]
+
+        inserted = import_csv(self.connection, IMPORTS['customers'], reader('name\nA\nB\n'),
+                              self.rejects, 1)
+
+        self.assertEqual(inserted, 1)
+        self.connection.rollback.assert_called_once()
+        self.rejects.write.assert_called_once_with(2, {'name': 'A'}, 'Database error: Duplicate entry')
+        self.cursor.close.assert_called_once()
+
+    def test_orders_update_daily_sales(self):
+        """Test each loaded chunk of orders is added to daily_sales before its commit"""
+        app.config['SALES_SUMMARY'] = True
+        self.addCleanup(app.config.__setitem__, 'SALES_SUMMARY', False)
+        self.cursor.fetchall.side_effect = [[{'customer_id': 1}], [{'maid_id': 2}]]
+        text = 'customer_id,maid_id,total_amount,order_date\n1,2,4.50,2024-01-05\n1,2,3.00,2024-01-05T18:00\n'
+
+        import_csv(self.connection, IMPORTS['orders'], reader(text), self.rejects, 10)
+
+        statement, params = self.cursor.execute.call_args.args
+        self.assertTrue(statement.startswith('INSERT INTO daily_sales'))
+        self.assertEqual(params[3:], (2, Decimal('7.50')))
+        self.connection.commit.assert_called_once()
+
+    def test_chunks_bump_table_version_once(self):
+        """Test each committed chunk bumps the table's version marker once, not once per row"""
+        app.config['ETAG_TABLE_VERSIONS'] = True
+        self.addCleanup(app.config.__setitem__, 'ETAG_TABLE_VERSIONS', False)
+
+        import_csv(self.connection, IMPORTS['customers'], reader('name\nA\nB\nC\n'), self.rejects, 2)
+
+        bumps = [call.args for call in self.cursor.execute.call_args_list
+                 if call.args[0].startswith('UPDATE table_version')]
+        self.assertEqual([params for _, params in bumps], [('customer',), ('customer',)])
+        self.assertEqual(self.connection.commit.call_count, 2)
+
+    def test_load_data_path(self):
+        """Test IMPORT_LOAD_DATA loads each chunk with LOAD DATA and counts the server's rows"""
+        self.cursor.rowcount = 2
+
+        inserted = import_csv(self.connection, IMPORTS['customers'], reader('name,email\nA,a@x\nB,\n'),
+                              self.rejects, 10, load_data=True)
+
+        self.assertEqual(inserted, 2)
+        statement = self.cursor.execute.call_args.args[0]
+        self.assertIn('INTO TABLE customer', statement)
+        self.connection.commit.assert_called_once()
+
+    def test_missing_optional_field_is_null_on_both_paths(self):
+        """Test a row without its optional email stores NULL whether it goes in by INSERT or LOAD DATA"""
+        text = 'name,email\nA\n'
+        loaded = {}
+
+        def execute(statement, params=None):
+            if statement.startswith('LOAD DATA'):
+                loaded['data'] = open(params[0]).read()
+                self.cursor.rowcount = 1
+        self.cursor.execute.side_effect = execute
+
+        import_csv(self.connection, IMPORTS['customers'], reader(text), self.rejects, 10)
+        inserted = self.cursor.execute.call_args.args[1]
+        import_csv(self.connection, IMPORTS['customers'], reader(text), self.rejects, 10, load_data=True)
+
+        self.assertEqual(inserted, ('A', None, ''))
+        self.assertEqual(loaded['data'], 'A,\\N,\n')
+        self.rejects.write.assert_not_called()
+
+    def test_load_data_short_count_retries_with_inserts(self):
+        """Test rows LOAD DATA skipped are not counted or summarized: the chunk is redone with INSERTs"""
+        app.config['SALES_SUMMARY'] = True
+        self.addCleanup(app.config.__setitem__, 'SALES_SUMMARY', False)
+        self.cursor.fetchall.side_effect = [[{'customer_id': 1}], [{'maid_id': 2}]]
+        self.cursor.rowcount = 1
+
+        def execute(statement, params=None):
+            if statement.startswith('INSERT INTO orders'):
+                raise Exception("Duplicate entry '7' for key 'PRIMARY'")
+        self.cursor.execute.side_effect = execute
+        text = 'customer_id,maid_id,total_amount\n1,2,4.50\n1,2,3.00\n'
+
+        inserted = import_csv(self.connection, IMPORTS['orders'], reader(text), self.rejects, 10, load_data=True)
+
+        self.assertEqual(inserted, 0)
+        self.assertEqual(self.connection.rollback.call_count, 2)
+        self.connection.commit.assert_not_called()
+        self.assertFalse(any(call.args[0].startswith('INSERT INTO daily_sales')
+                             for call in self.cursor.execute.call_args_list))
+        self.assertEqual(self.rejects.write.call_count, 2)
+        self.assertEqual(self.rejects.write.call_args.args[2], "Database error: Duplicate entry '7' for key 'PRIMARY'")
+
+
+if __name__ == '__main__':
+    unittest.main()
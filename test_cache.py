@@ -0,0 +1,58 @@
+"""
+Unit tests for the cache backends
+Run with: python -m pytest test_cache.py -v
+"""
+
+import unittest
+from cache import LRUCache
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests"""
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = LRUCache(max_entries=2, ttl=10, clock=self.clock)
+    
+    def test_hit_and_miss_counters(self):
+        """Test get counts hits and misses"""
+        self.cache.set('customer:1', {'name': 'Aying'})
+        self.assertEqual(self.cache.get('customer:1'), {'name': 'Aying'})
+        self.assertIsNone(self.cache.get('customer:2'))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+    
+    def test_ttl_expiry(self):
+        """Test entries expire after ttl seconds"""
+        self.cache.set('maid:1', 'Lucy')
+        self.clock.now = 10.5
+        self.assertIsNone(self.cache.get('maid:1'))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+    
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted at the size cap"""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+    
+    def test_disabled_cache(self):
+        """Test max_entries=0 never stores anything"""
+        cache = LRUCache(max_entries=0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+if __name__ == '__main__':
+    unittest.main()
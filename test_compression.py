@@ -0,0 +1,130 @@
+"""
+Unit tests for response compression
+Run with: python -m pytest test_compression.py -v
+"""
+
+import gzip
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask import Flask, Response
+
+import compression
+from compression import DEFAULTS, compress_chunks, compress_response, negotiate
+
+BODY = b'{"orders": [' + b','.join(b'{"order_id": %d}' % i for i in range(200)) + b']}'
+
+
+class TestNegotiate(unittest.TestCase):
+
+    def test_quality_then_server_preference(self):
+        """Test the highest q wins and ties follow COMPRESS_ENCODINGS order"""
+        with patch.dict(compression.ENCODERS, {'br': (None, 'COMPRESS_BR_LEVEL')}):
+            self.assertEqual(negotiate([('gzip', 1), ('br', 1)], ('zstd', 'br', 'gzip')), 'br')
+            self.assertEqual(negotiate([('gzip', 1), ('br', 0.5)], ('zstd', 'br', 'gzip')), 'gzip')
+
+    def test_refusals(self):
+        """Test identity-only, q=0 and uninstalled encodings give no compression"""
+        self.assertIsNone(negotiate([], DEFAULTS['COMPRESS_ENCODINGS']))
+        self.assertIsNone(negotiate([('gzip', 0), ('*', 1)], ('gzip',)))
+        with patch.dict(compression.ENCODERS, {'gzip': compression.ENCODERS['gzip']}, clear=True):
+            self.assertIsNone(negotiate([('zstd', 1)], ('zstd', 'gzip')))
+
+    def test_wildcard(self):
+        """Test * accepts any installed encoding"""
+        self.assertEqual(negotiate([('*', 1)], ('gzip',)), 'gzip')
+
+
+class TestCompressResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.config = dict(DEFAULTS)
+
+    def compress(self, response, accept=(('gzip', 1),)):
+        with self.app.test_request_context():
+            return compress_response(response, list(accept), self.config)
+
+    def test_buffered_body(self):
+        """Test a large JSON body is gzipped with a weak ETag and Vary header"""
+        response = Response(BODY, mimetype='application/json')
+        response.set_etag('abc')
+
+        response = self.compress(response)
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.get_etag(), ('abc', True))
+        self.assertIn('Accept-Encoding', response.vary)
+        self.assertEqual(gzip.decompress(response.get_data()), BODY)
+        self.assertEqual(int(response.headers['Content-Length']), len(response.get_data()))
+
+    def test_small_and_unlisted_bodies_untouched(self):
+        """Test bodies under COMPRESS_MIN_SIZE and non-text types are sent as-is"""
+        small = self.compress(Response(b'{"count": 0}', mimetype='application/json'))
+        image = self.compress(Response(BODY, mimetype='image/png'))
+
+        self.assertNotIn('Content-Encoding', small.headers)
+        self.assertIn('Accept-Encoding', small.vary)
+        self.assertNotIn('Content-Encoding', image.headers)
+
+    def test_not_modified_matches_its_200(self):
+        """Test a 304 gets the Vary header and ETag weakness of the 200 for the same Accept-Encoding"""
+        for body in (BODY, b'{"count": 0}'):
+            full = Response(body, mimetype='application/json')
+            full.set_etag('abc')
+            unchanged = Response(status=304, mimetype='application/json')
+            unchanged.set_etag('abc')
+
+            full, unchanged = self.compress(full), self.compress(unchanged)
+
+            self.assertEqual(unchanged.get_etag(), full.get_etag(), body)
+            self.assertEqual(unchanged.vary, full.vary)
+
+        identity = Response(status=304, mimetype='application/json')
+        identity.set_etag('abc')
+        identity = self.compress(identity, accept=())
+        self.assertEqual(identity.get_etag(), ('abc', False))
+        self.assertIn('Accept-Encoding', identity.vary)
+
+    def test_level_setting(self):
+        """Test COMPRESS_GZIP_LEVEL reaches zlib"""
+        self.config['COMPRESS_GZIP_LEVEL'] = 1
+        with patch('compression.zlib.compressobj', wraps=compression.zlib.compressobj) as compressobj:
+            self.compress(Response(BODY, mimetype='application/json'))
+
+        self.assertEqual(compressobj.call_args[0][0], 1)
+
+    def test_disabled(self):
+        """Test COMPRESS_ENABLED = False turns it off"""
+        self.config['COMPRESS_ENABLED'] = False
+        response = self.compress(Response(BODY, mimetype='application/json'))
+
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_streamed_body(self):
+        """Test generator bodies are compressed as they are produced"""
+        def generate():
+            yield '{"orders": ['
+            yield ','.join('{"order_id": %d}' % i for i in range(200))
+            yield ']}'
+
+        response = self.compress(Response(generate(), mimetype='application/json'))
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEqual(gzip.decompress(b''.join(response.response)), BODY)
+
+    def test_abandoned_stream_closed(self):
+        """Test closing the compressed stream closes the underlying generator"""
+        chunks = MagicMock()
+        chunks.__iter__.return_value = iter([b'a', b'b'])
+        stream = compress_chunks(chunks, compression.compressor('gzip', DEFAULTS))
+
+        next(stream, None)
+        stream.close()
+
+        chunks.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,240 @@
+"""
+Unit tests for the connection pool
+Run with: python -m pytest test_db_pool.py -v
+"""
+
+import threading
+import unittest
+from unittest.mock import patch
+from flask import Flask
+from db_pool import ConnectionPool, MySQLPool, PoolExhausted, ReplicaSet, replica_settings
+
+
+class FakeConnection:
+    """Stand-in DB-API connection that records pings, rollbacks and closes"""
+    def __init__(self, number):
+        self.number = number
+        self.pings = 0
+        self.rollbacks = 0
+        self.closed = False
+        self.alive = True
+    
+    def ping(self):
+        self.pings += 1
+        if not self.alive:
+            raise Exception('MySQL server has gone away')
+    
+    def rollback(self):
+        self.rollbacks += 1
+    
+    def close(self):
+        self.closed = True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestConnectionPool(unittest.TestCase):
+    
+    def setUp(self):
+        self.opened = []
+        self.clock = FakeClock()
+    
+    def connect(self):
+        connection = FakeConnection(len(self.opened) + 1)
+        self.opened.append(connection)
+        return connection
+    
+    def make_pool(self, **kwargs):
+        options = {'min_size': 1, 'max_size': 2, 'wait_timeout': 0, 'clock': self.clock}
+        options.update(kwargs)
+        return ConnectionPool(self.connect, **options)
+    
+    def test_connections_are_reused(self):
+        """Test a returned connection is handed out again instead of opening a new one"""
+        pool = self.make_pool()
+        first = pool.checkout()
+        pool.checkin(first)
+        second = pool.checkout()
+        
+        self.assertIs(first, second)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(first.rollbacks, 1)
+    
+    def test_exhaustion_raises_after_timeout(self):
+        """Test checkout fails with PoolExhausted at max_size and counts it"""
+        pool = self.make_pool()
+        pool.checkout()
+        pool.checkout()
+        
+        with self.assertRaises(PoolExhausted):
+            pool.checkout()
+        self.assertEqual(pool.stats()['exhausted'], 1)
+        self.assertEqual(pool.stats()['in_use'], 2)
+    
+    def test_waiting_checkout_gets_returned_connection(self):
+        """Test a blocked checkout wakes up when another thread checks in"""
+        pool = ConnectionPool(self.connect, min_size=1, max_size=1, wait_timeout=5)
+        held = pool.checkout()
+        threading.Timer(0.05, pool.checkin, args=(held,)).start()
+        
+        self.assertIs(pool.checkout(), held)
+        self.assertGreater(pool.stats()['wait_seconds_max'], 0)
+    
+    def test_dead_connection_replaced_on_pre_ping(self):
+        """Test a connection that fails its ping is closed and replaced"""
+        pool = self.make_pool()
+        first = pool.checkout()
+        pool.checkin(first)
+        first.alive = False
+        
+        second = pool.checkout()
+        
+        self.assertIsNot(first, second)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['ping_failures'], 1)
+    
+    def test_pre_ping_skipped_for_recently_used(self):
+        """Test connections idle less than pre_ping_after are not pinged"""
+        pool = self.make_pool(pre_ping_after=1.0)
+        first = pool.checkout()
+        pool.checkin(first)
+        self.clock.now = 0.5
+        pool.checkout()
+        
+        self.assertEqual(first.pings, 0)
+    
+    def test_max_lifetime_recycles(self):
+        """Test connections older than max_lifetime are closed on checkout"""
+        pool = self.make_pool(max_lifetime=60)
+        first = pool.checkout()
+        pool.checkin(first)
+        self.clock.now = 61
+        
+        second = pool.checkout()
+        
+        self.assertIsNot(first, second)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['recycled'], 1)
+    
+    def test_health_check_uses_pooled_connection(self):
+        """Test health_check pings an idle connection without opening another"""
+        pool = self.make_pool(min_size=1)
+        pool.warm()
+        
+        status = pool.health_check()
+        
+        self.assertTrue(status['healthy'])
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(status['idle'], 1)
+    
+    def test_health_check_reports_connect_failure(self):
+        """Test health_check is unhealthy when no connection can be opened"""
+        def refuse():
+            raise Exception("Can't connect to MySQL server")
+        pool = ConnectionPool(refuse, min_size=1, max_size=2, wait_timeout=0)
+        
+        status = pool.health_check()
+        
+        self.assertFalse(status['healthy'])
+        self.assertEqual(status['size'], 0)
+        self.assertIn("Can't connect", status['last_error'])
+
+
+class TestMySQLPool(unittest.TestCase):
+    
+    def test_views_get_wrapped_connection_pool_gets_raw(self):
+        """Test wrap_connection applies to mysql.connection but checkin sees the raw connection"""
+        app = Flask(__name__)
+        raw = FakeConnection(1)
+        mysql = MySQLPool(app, wrap_connection=lambda connection: ('wrapped', connection))
+        mysql._pool = ConnectionPool(lambda: raw, min_size=1, max_size=1, wait_timeout=0)
+        
+        with app.app_context():
+            self.assertEqual(mysql.connection, ('wrapped', raw))
+            self.assertIs(mysql.connection[1], raw)
+        
+        self.assertEqual(raw.rollbacks, 1)
+        self.assertEqual(mysql.pool.stats()['idle'], 1)
+
+
+class TestReplicaRouting(unittest.TestCase):
+    
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.clock = FakeClock()
+        self.mysql = MySQLPool(self.app)
+        self.primary = FakeConnection('primary')
+        self.replica_connections = [FakeConnection('replica-1'), FakeConnection('replica-2')]
+        self.mysql._pool = ConnectionPool(lambda: self.primary, min_size=0, max_size=1, wait_timeout=0)
+        self.mysql._replicas = ReplicaSet(
+            [ConnectionPool(lambda c=c: self.connect_replica(c), min_size=0, max_size=1, wait_timeout=0)
+             for c in self.replica_connections],
+            retry_after=30, clock=self.clock,
+        )
+    
+    def connect_replica(self, connection):
+        if not connection.alive:
+            raise Exception("Can't connect to MySQL server")
+        return connection
+    
+    def borrow(self, method):
+        with self.app.test_request_context(method=method):
+            return self.mysql.connection.number
+    
+    def test_reads_rotate_over_replicas(self):
+        """Test GET requests take turns on the replicas and writes use the primary"""
+        self.assertEqual([self.borrow('GET') for _ in range(3)], ['replica-1', 'replica-2', 'replica-1'])
+        self.assertEqual(self.borrow('POST'), 'primary')
+        with self.app.app_context():
+            self.assertEqual(self.mysql.connection.number, 'primary')
+    
+    def test_write_then_read_stays_on_primary(self):
+        """Test a read after a write in the same request sees the primary (read-your-writes)"""
+        with self.app.test_request_context(method='POST'):
+            written = self.mysql.connection
+            self.assertIs(self.mysql.connection, written)
+            self.assertEqual(written.number, 'primary')
+    
+    def test_down_replica_skipped_until_retry(self):
+        """Test a replica that refuses connections is skipped, then retried after retry_after"""
+        self.replica_connections[0].alive = False
+        
+        self.assertEqual([self.borrow('GET') for _ in range(3)], ['replica-2'] * 3)
+        
+        self.replica_connections[0].alive = True
+        self.clock.now = 31
+        self.assertIn('replica-1', [self.borrow('GET') for _ in range(2)])
+    
+    def test_falls_back_to_primary(self):
+        """Test reads go to the primary when every replica is down"""
+        for connection in self.replica_connections:
+            connection.alive = False
+        
+        self.assertEqual(self.borrow('GET'), 'primary')
+        self.assertEqual(self.mysql.replicas.failovers, 1)
+        self.assertEqual([r['marked_down'] for r in self.mysql.pool_status()['replicas']], [True, True])
+    
+    def test_open_connection_prefers_replica(self):
+        """Test unpooled read connections go to a replica, then the primary when none answers"""
+        self.app.config['MYSQL_REPLICAS'] = ['replica-1', 'replica-2:3307']
+        with patch.object(self.mysql, '_connect', side_effect=[Exception('down'), 'r2', 'primary']) as connect:
+            self.assertEqual(self.mysql.open_connection(read=True), 'r2')
+            self.assertEqual(self.mysql.open_connection(), 'primary')
+        
+        self.assertEqual(connect.call_args_list[1][1], {'host': 'replica-2', 'port': 3307})
+        self.assertTrue(self.mysql.replicas.is_down(0))
+    
+    def test_replica_settings(self):
+        """Test MYSQL_REPLICAS entries accept host, host:port and dicts"""
+        self.assertEqual(replica_settings('db-2'), {'host': 'db-2'})
+        self.assertEqual(replica_settings('db-2:3307'), {'host': 'db-2', 'port': 3307})
+        self.assertEqual(replica_settings({'host': 'db-3', 'user': 'reader'}), {'host': 'db-3', 'user': 'reader'})
+
+if __name__ == '__main__':
+    unittest.main()
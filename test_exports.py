@@ -0,0 +1,121 @@
+"""
+Unit tests for the background export jobs
+Run with: python -m pytest test_exports.py -v
+"""
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import exports
+from exports import ExportManager
+
+ROWS = [
+    {'order_id': 1, 'customer_id': 2, 'order_date': datetime(2024, 1, 2, 9, 30), 'total_amount': Decimal('12.50')},
+    {'order_id': 2, 'customer_id': 3, 'order_date': datetime(2024, 1, 3, 10, 0), 'total_amount': Decimal('7.00')},
+    {'order_id': 3, 'customer_id': 2, 'order_date': datetime(2024, 1, 4, 11, 0), 'total_amount': Decimal('30.00')},
+]
+
+
+class TestExportManager(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cursor = MagicMock()
+        self.cursor.description = [(column,) for column in ROWS[0]]
+        self.cursor.fetchmany.side_effect = [ROWS[:2], ROWS[2:], []]
+        self.connection = MagicMock()
+        self.connection.cursor.return_value = self.cursor
+        self.manager = ExportManager(self.directory, lambda: self.connection, 'SSCursor', batch_size=2)
+
+    def run_job(self, fmt='csv'):
+        job = self.manager.submit('SELECT * FROM orders', (), fmt)
+        self.manager.shutdown()
+        return self.manager.get(job['id'])
+
+    def test_csv_export(self):
+        """Test rows are fetched in batches from a server-side cursor and written as CSV"""
+        job = self.run_job()
+
+        self.assertEqual((job['status'], job['rows']), ('done', 3))
+        with open(self.manager.file_path(job), newline='') as f:
+            written = list(csv.DictReader(f))
+        self.assertEqual([row['total_amount'] for row in written], ['12.50', '7.00', '30.00'])
+        self.assertEqual(written[0]['order_date'], '2024-01-02 09:30:00')
+        self.connection.cursor.assert_called_once_with('SSCursor')
+        self.cursor.fetchmany.assert_called_with(2)
+        self.connection.close.assert_called_once()
+
+    def test_failed_export(self):
+        """Test a query error marks the job failed and leaves no partial file"""
+        self.cursor.execute.side_effect = Exception('Lost connection to MySQL server')
+
+        job = self.run_job()
+
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('Lost connection', job['error'])
+        self.assertEqual(sorted(os.listdir(self.directory)), [f"{job['id']}.json"])
+        self.connection.close.assert_called_once()
+
+    def test_empty_result_has_header(self):
+        """Test an export with no rows still writes the column header"""
+        self.cursor.fetchmany.side_effect = [[]]
+
+        job = self.run_job()
+
+        with open(self.manager.file_path(job)) as f:
+            self.assertEqual(f.read().strip(), 'order_id,customer_id,order_date,total_amount')
+
+    def test_unknown_ids(self):
+        """Test unknown and malformed job ids (no path traversal)"""
+        self.assertIsNone(self.manager.get('0' * 32))
+        self.assertIsNone(self.manager.get('../app'))
+
+    @unittest.skipIf(exports.pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_export(self):
+        """Test Parquet exports write one row group per batch"""
+        job = self.run_job('parquet')
+
+        table = exports.pyarrow.parquet.read_table(self.manager.file_path(job))
+        self.assertEqual(table.num_rows, 3)
+
+    def stranded_job(self, **owner):
+        """A running job left behind by another runner"""
+        job = {'id': 'a' * 32, 'format': 'csv', 'status': 'running', 'rows': 2, 'error': None,
+               'created_at': '2024-01-01T00:00:00', 'finished_at': None,
+               'owner': dict(self.manager.owner, **owner)}
+        self.manager._save(job)
+        return job['id']
+
+    def test_abandoned_jobs_fail(self):
+        """Test running jobs of an exited process or an earlier manager in this pid are reported failed"""
+        with patch('exports.os.kill', side_effect=ProcessLookupError):
+            exited = self.manager.get(self.stranded_job(pid=-1))
+        restarted = self.manager.get(self.stranded_job(instance='old'))
+
+        for job in (exited, restarted):
+            self.assertEqual(job['status'], 'failed')
+            self.assertIn('interrupted', job['error'])
+        self.assertEqual(self.manager.get('a' * 32)['status'], 'failed')
+
+    def test_live_and_remote_jobs_untouched(self):
+        """Test jobs of live processes and of other hosts keep their state"""
+        with patch('exports.os.kill') as kill:
+            self.assertEqual(self.manager.get(self.stranded_job(pid=-1))['status'], 'running')
+        kill.assert_called_once_with(-1, 0)
+        self.assertEqual(self.manager.get(self.stranded_job(host='elsewhere', pid=-1))['status'], 'running')
+
+    def test_formats_without_pyarrow(self):
+        """Test Parquet is only offered when pyarrow is installed"""
+        with patch.object(exports, 'pyarrow', None):
+            self.assertEqual(exports.available_formats(), ['csv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Unit tests for the JSON provider
+Run with: python -m pytest test_json_provider.py -v
+"""
+
+import json
+import unittest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from flask import Flask
+
+import json_provider
+from json_provider import FastJSONProvider
+
+ROW = {
+    'order_id': 1,
+    'total_amount': Decimal('25.50'),
+    'order_date': datetime(2023, 10, 1, 10, 30),
+    'shift_start_time': timedelta(hours=9, minutes=30),
+    'name': 'Aying',
+}
+
+EXPECTED = {
+    'name': 'Aying',
+    'order_date': 'Sun, 01 Oct 2023 10:30:00 GMT',
+    'order_id': 1,
+    'shift_start_time': '9:30:00',
+    'total_amount': '25.50',
+}
+
+
+class TestFastJSONProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.json = FastJSONProvider(self.app)
+
+    def test_encodes_row_types(self):
+        """Test Decimal, datetime and timedelta are encoded without converting the row first"""
+        self.assertEqual(json.loads(self.app.json.dumps(ROW)), EXPECTED)
+
+    def test_keys_sorted_like_flask(self):
+        """Test keys come out sorted, as with Flask's default provider"""
+        self.assertEqual(list(json.loads(self.app.json.dumps(ROW))), sorted(EXPECTED))
+
+    def test_response(self):
+        """Test jsonify-style responses are compact JSON with a trailing newline"""
+        with self.app.app_context():
+            response = self.app.json.response({'b': date(2024, 1, 2), 'a': 1})
+
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(response.data, b'{"a":1,"b":"Tue, 02 Jan 2024 00:00:00 GMT"}\n')
+
+    def test_loads(self):
+        """Test request bodies decode as str or bytes"""
+        self.assertEqual(self.app.json.loads(b'{"name": "Lucy"}'), {'name': 'Lucy'})
+        self.assertEqual(self.app.json.loads('[1, 2.5]'), [1, 2.5])
+
+    def test_unknown_type_raises(self):
+        """Test unsupported values still fail loudly"""
+        with self.assertRaises(TypeError):
+            self.app.json.dumps({'value': object()})
+
+    def test_stdlib_fallback_matches(self):
+        """Test the fallback without orjson produces the same values"""
+        fast = json.loads(self.app.json.dumps(ROW))
+        with patch.object(json_provider, 'orjson', None):
+            slow = json.loads(self.app.json.dumps(ROW))
+            with self.app.app_context():
+                response = self.app.json.response(ROW)
+
+        self.assertEqual(slow, fast)
+        self.assertEqual(json.loads(response.data), EXPECTED)
+
+
+if __name__ == '__main__':
+    unittest.main()
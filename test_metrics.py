@@ -0,0 +1,111 @@
+"""
+Unit tests for the request instrumentation
+Run with: python -m pytest test_metrics.py -v
+"""
+
+import unittest
+from unittest.mock import MagicMock
+from metrics import Metrics, RequestTiming, TimedConnection, TimedCursor
+
+
+class TestTimedCursor(unittest.TestCase):
+
+    def test_counts_queries_and_splits_fetch_time(self):
+        """Test execute calls are counted and fetches are timed separately"""
+        timing = RequestTiming()
+        raw = MagicMock()
+        raw.fetchall.return_value = [{'order_id': 1}]
+        cur = TimedCursor(raw, timing)
+
+        cur.execute("SELECT 1")
+        cur.execute("SELECT %s", (2,))
+        rows = cur.fetchall()
+
+        self.assertEqual(rows, [{'order_id': 1}])
+        self.assertEqual(timing.queries, 2)
+        self.assertGreaterEqual(timing.db_seconds, 0.0)
+        raw.execute.assert_called_with("SELECT %s", (2,))
+
+    def test_failed_query_still_counted(self):
+        """Test a query that raises is still counted and re-raised"""
+        timing = RequestTiming()
+        raw = MagicMock()
+        raw.execute.side_effect = RuntimeError('boom')
+
+        with self.assertRaises(RuntimeError):
+            TimedCursor(raw, timing).execute("SELECT 1")
+        self.assertEqual(timing.queries, 1)
+
+    def test_connection_without_timing_returns_raw_cursor(self):
+        """Test cursors opened outside a request are not wrapped"""
+        raw = MagicMock()
+        connection = TimedConnection(raw, lambda: None)
+
+        self.assertIs(connection.cursor(), raw.cursor.return_value)
+        connection.rollback()
+        raw.rollback.assert_called_once()
+
+    def test_server_timing_header(self):
+        """Test the Server-Timing value lists every phase in milliseconds"""
+        timing = RequestTiming()
+        timing.queries = 3
+        timing.db_seconds = 0.0125
+
+        self.assertEqual(
+            timing.server_timing(0.02),
+            'db;dur=12.50;desc="3 queries", fetch;dur=0.00, serialize;dur=0.00, total;dur=20.00'
+        )
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket counts accumulate and +Inf equals the total count"""
+        metrics = Metrics(buckets=(0.01, 0.1))
+        for seconds in (0.005, 0.05, 0.5):
+            metrics.observe('GET', '/orders', 200, seconds)
+
+        text = metrics.render()
+
+        self.assertIn('maid_cafe_request_duration_seconds_bucket'
+                      '{method="GET",route="/orders",status="200",le="0.01"} 1', text)
+        self.assertIn('maid_cafe_request_duration_seconds_bucket'
+                      '{method="GET",route="/orders",status="200",le="0.1"} 2', text)
+        self.assertIn('maid_cafe_request_duration_seconds_bucket'
+                      '{method="GET",route="/orders",status="200",le="+Inf"} 3', text)
+        self.assertIn('maid_cafe_request_duration_seconds_count'
+                      '{method="GET",route="/orders",status="200"} 3', text)
+
+    def test_db_totals_per_route(self):
+        """Test query counts are summed per route"""
+        metrics = Metrics()
+        for _ in range(2):
+            timing = RequestTiming()
+            timing.queries = 3
+            metrics.observe('GET', '/customers/<int:customer_id>', 200, 0.01, timing)
+
+        self.assertIn('maid_cafe_db_queries_total'
+                      '{method="GET",route="/customers/<int:customer_id>"} 6', metrics.render())
+
+    def test_failing_gauge_is_skipped(self):
+        """Test a broken gauge collector does not break the scrape"""
+        metrics = Metrics()
+        metrics.add_gauges(lambda: 1 / 0)
+        metrics.add_gauges(lambda: {'db_pool_size': 4})
+
+        self.assertIn('maid_cafe_db_pool_size 4', metrics.render())
+
+    def test_counters_are_typed_counter(self):
+        """Test add_counters values are exported as Prometheus counters, gauges as gauges"""
+        metrics = Metrics()
+        metrics.add_gauges(lambda: {'db_pool_idle': 2})
+        metrics.add_counters(lambda: {'db_pool_exhausted_total': 3})
+
+        lines = metrics.render().splitlines()
+
+        self.assertIn('# TYPE maid_cafe_db_pool_idle gauge', lines)
+        self.assertIn('# TYPE maid_cafe_db_pool_exhausted_total counter', lines)
+        self.assertIn('maid_cafe_db_pool_exhausted_total 3', lines)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,741 @@
+"""
+Shared behaviour tests run against both serving modes
+Every check in ParityChecks runs once against the Flask (WSGI) app and once
+against the Quart (ASGI) app, over the same mocked database, so the two stay
+behaviourally identical.
+Run with: python -m pytest test_parity.py -v
+"""
+
+import asyncio
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import jwt
+from MySQLdb import IntegrityError as MySQLdbIntegrityError
+from pymysql.err import IntegrityError as PyMySQLIntegrityError
+from quart import request
+from werkzeug.datastructures import FileStorage
+
+from app import app, resource_cache, token_cache, decode_cursor, shift_index, autoinc_settings
+from asgi_app import asgi_app
+from db_pool import PoolExhausted
+from exports import ExportManager
+
+SECRET = 'test-secret-key-123'
+
+
+class AsyncCursor:
+    """aiomysql-style cursor delegating to a MagicMock DB-API cursor"""
+
+    # Seconds each fetchmany() waits, like a slow server-side cursor
+    fetch_delay = 0
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    async def execute(self, query, params=None):
+        return self._cursor.execute(query, params)
+
+    async def fetchone(self):
+        return self._cursor.fetchone()
+
+    async def fetchall(self):
+        return self._cursor.fetchall()
+
+    async def fetchmany(self, size=None):
+        await asyncio.sleep(self.fetch_delay)
+        return self._cursor.fetchmany(size)
+
+    async def close(self):
+        return self._cursor.close()
+
+
+class AsyncConnection:
+    """aiomysql-style connection delegating to a MagicMock connection"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    async def cursor(self, *cursor_class):
+        return AsyncCursor(self._connection.cursor(*cursor_class))
+
+    async def commit(self):
+        return self._connection.commit()
+
+    async def rollback(self):
+        return self._connection.rollback()
+
+
+class FakeAsyncPool:
+    """Stands in for asgi_app.db, handing out the shared mock connection"""
+
+    def __init__(self, connection):
+        self.connection_mock = connection
+        self.pool_status_result = {'healthy': True, 'size': 2, 'idle': 2, 'in_use': 0}
+
+    async def acquire(self, timeout=None):
+        if isinstance(self.connection_mock, Exception):
+            raise self.connection_mock
+        return AsyncConnection(self.connection_mock)
+
+    async def checkout(self):
+        return None, await self.acquire()
+
+    async def connection(self):
+        return await self.acquire()
+
+    async def release(self, connection, pool=None):
+        pass
+
+    async def pool_status(self):
+        return self.pool_status_result
+
+
+class ParityChecks:
+    """Behaviour both apps must share; subclasses supply the transport and DB patch"""
+
+    def setUp(self):
+        self.saved_secret = (app.config['SECRET_KEY'], asgi_app.config['SECRET_KEY'])
+        app.config['SECRET_KEY'] = asgi_app.config['SECRET_KEY'] = SECRET
+        resource_cache.clear()
+        token_cache.clear()
+        autoinc_settings.update(lock_mode=1, increment=1)
+
+        self.cursor = MagicMock()
+        self.connection = MagicMock()
+        self.connection.cursor.return_value = self.cursor
+        self.patch_database()
+
+        self.token = jwt.encode({
+            'user': 'admin',
+            'exp': datetime.utcnow() + timedelta(hours=1)
+        }, SECRET, algorithm='HS256')
+
+    def tearDown(self):
+        app.config['SECRET_KEY'], asgi_app.config['SECRET_KEY'] = self.saved_secret
+
+    def get_json(self, path, **kwargs):
+        status, body, headers = self.call('GET', path, **kwargs)
+        return status, json.loads(body)
+
+    # ========== AUTHENTICATION ==========
+
+    def test_login_success(self):
+        """Test POST /login returns a token the other endpoints accept"""
+        status, body, _ = self.call('POST', '/login',
+                                    json={'username': 'admin', 'password': 'password'})
+        token = json.loads(body)['token']
+
+        self.assertEqual(status, 200)
+        self.assertEqual(jwt.decode(token, SECRET, algorithms=['HS256'])['user'], 'admin')
+
+    def test_login_invalid_credentials(self):
+        """Test POST /login with a wrong password"""
+        status, body, _ = self.call('POST', '/login',
+                                    json={'username': 'admin', 'password': 'wrong'})
+
+        self.assertEqual(status, 401)
+        self.assertEqual(json.loads(body), {'error': 'Invalid username or password'})
+
+    def test_missing_and_invalid_token(self):
+        """Test protected endpoints reject missing and forged tokens alike"""
+        self.assertEqual(self.get_json('/customers'), (401, {'error': 'Token is missing!'}))
+        self.assertEqual(self.get_json('/customers?token=forged'), (401, {'error': 'Invalid token!'}))
+
+    def test_auth_test_reports_user(self):
+        """Test GET /auth-test echoes the user from the token"""
+        status, data = self.get_json(f'/auth-test?token={self.token}')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data['user'], 'admin')
+
+    # ========== READS ==========
+
+    def test_get_customers_search(self):
+        """Test GET /customers?q= issues the same FULLTEXT query"""
+        for config in (app.config, asgi_app.config):
+            config['SEARCH_FULLTEXT'] = True
+            self.addCleanup(config.__setitem__, 'SEARCH_FULLTEXT', False)
+        self.cursor.fetchall.return_value = [{'customer_id': 1, 'name': 'Aying'}]
+
+        status, data = self.get_json(f'/customers?token={self.token}&q=Ay')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data, {'customers': [{'customer_id': 1, 'name': 'Aying'}], 'count': 1})
+        self.cursor.execute.assert_called_with(
+            'SELECT * FROM customer WHERE MATCH(name, email, phone_number) AGAINST (%s IN BOOLEAN MODE)'
+            ' ORDER BY MATCH(name, email, phone_number) AGAINST (%s IN BOOLEAN MODE) DESC',
+            ('+"Ay"', '+"Ay"')
+        )
+
+    def test_get_customers_xml(self):
+        """Test ?format=xml produces byte-identical documents"""
+        self.cursor.fetchall.return_value = [{'customer_id': 1, 'name': 'Aying'}]
+
+        status, body, headers = self.call('GET', f'/customers?token={self.token}&format=xml')
+
+        self.assertEqual(status, 200)
+        self.assertTrue(headers['Content-Type'].startswith('application/xml'))
+        self.assertEqual(body, b'<?xml version="1.0" encoding="UTF-8" ?><response><customers>'
+                               b'<item><customer_id>1</customer_id><name>Aying</name></item>'
+                               b'</customers><count>1</count></response>')
+
+    def test_maids_on_shift_overnight(self):
+        """Test GET /maids/on-shift finds a shift that crosses midnight on both sides of it"""
+        shift_index.invalidate()
+        self.cursor.fetchall.return_value = [
+            {'maid_id': 1, 'name': 'Aki', 'shift_start_time': timedelta(hours=9), 'shift_end_time': timedelta(hours=17)},
+            {'maid_id': 2, 'name': 'Mei', 'shift_start_time': timedelta(hours=22), 'shift_end_time': timedelta(hours=6)},
+        ]
+
+        _, late = self.get_json(f'/maids/on-shift?token={self.token}&at=23:15:00')
+        _, early = self.get_json(f'/maids/on-shift?token={self.token}&from=05:00:00&to=10:00:00')
+
+        self.assertEqual(([m['maid_id'] for m in late['maids']], late['at']), ([2], '23:15:00'))
+        self.assertEqual((early['from'], early['to'], early['count']), ('05:00:00', '10:00:00', 2))
+        self.cursor.execute.assert_called_once()
+
+    def test_get_orders_page(self):
+        """Test GET /orders?limit= builds the same keyset query and cursor"""
+        self.cursor.fetchall.return_value = [{'order_id': 1}, {'order_id': 2}, {'order_id': 3}]
+
+        status, data = self.get_json(f'/orders?token={self.token}&limit=2&maid_id=1')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(decode_cursor(data['next_cursor']), 2)
+        self.cursor.execute.assert_called_with(
+            'SELECT * FROM orders WHERE 1=1 AND maid_id = %s ORDER BY order_id LIMIT %s',
+            ('1', 3)
+        )
+
+    def test_get_orders_ndjson_stream(self):
+        """Test ?format=ndjson streams the same lines"""
+        self.cursor.fetchmany.side_effect = [[{'order_id': 1}, {'order_id': 2}], []]
+
+        status, body, headers = self.call('GET', f'/orders?token={self.token}&format=ndjson')
+
+        self.assertEqual(status, 200)
+        self.assertTrue(headers['Content-Type'].startswith('application/x-ndjson'))
+        self.assertEqual([json.loads(line) for line in body.decode().splitlines()],
+                         [{'order_id': 1}, {'order_id': 2}, {'count': 2}])
+        self.cursor.close.assert_called()
+
+    def test_slow_stream_is_not_cut_off(self):
+        """Test streamed bodies run to the end however long they take (no Quart RESPONSE_TIMEOUT)"""
+        self.addCleanup(asgi_app.config.__setitem__, 'RESPONSE_TIMEOUT', asgi_app.config['RESPONSE_TIMEOUT'])
+        asgi_app.config['RESPONSE_TIMEOUT'] = 0.05
+
+        for query in ('format=ndjson', 'stream=1&format=xml'):
+            self.cursor.fetchmany.side_effect = [[{'order_id': 1}], [{'order_id': 2}], []]
+            with patch.object(AsyncCursor, 'fetch_delay', 0.04):
+                status, body, _ = self.call('GET', f'/orders?token={self.token}&{query}')
+
+            self.assertEqual(status, 200)
+            self.assertTrue(body.rstrip().endswith((b'{"count":2}', b'</response>')), body)
+
+    def test_get_maids_xml_stream(self):
+        """Test ?stream=1&format=xml streams the same document"""
+        self.cursor.fetchmany.side_effect = [
+            [{'maid_id': 1, 'shift_start_time': timedelta(hours=9)}], []
+        ]
+
+        status, body, _ = self.call('GET', f'/maids?token={self.token}&stream=1&format=xml')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b'<?xml version="1.0" encoding="UTF-8" ?><response><maids>'
+                               b'<item><maid_id>1</maid_id><shift_start_time>9:00:00'
+                               b'</shift_start_time></item></maids><count>1</count></response>')
+
+    def test_get_maids_fields(self):
+        """Test ?fields= is validated and pushed into the SELECT the same way"""
+        self.cursor.fetchall.return_value = [{'maid_id': 1, 'name': 'Lucy'}]
+
+        status, data = self.get_json(f'/maids?token={self.token}&fields=name&q=Lucy')
+        bad_status, bad = self.get_json(f'/maids?token={self.token}&fields=salary')
+
+        self.assertEqual((status, data['maids']), (200, [{'maid_id': 1, 'name': 'Lucy'}]))
+        self.assertTrue(self.cursor.execute.call_args[0][0].startswith('SELECT maid_id, name FROM maid WHERE'))
+        self.assertEqual(bad_status, 400)
+        self.assertTrue(bad['error'].startswith('Unknown field(s): salary'))
+
+    def test_get_orders_include(self):
+        """Test ?include= embeds related rows with the same batched lookups"""
+        self.cursor.fetchall.side_effect = [
+            [{'order_id': 1, 'maid_id': 3}],
+            [{'maid_id': 3, 'shift_start_time': timedelta(hours=9)}],
+        ]
+
+        status, data = self.get_json(f'/orders?token={self.token}&fields=order_id&include=maid')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data['orders'], [{'order_id': 1, 'maid_id': 3,
+                                           'maid': {'maid_id': 3, 'shift_start_time': '9:00:00'}}])
+        self.assertEqual(self.cursor.execute.call_args_list[0][0][0],
+                         'SELECT order_id, maid_id FROM orders WHERE 1=1')
+        self.cursor.execute.assert_called_with('SELECT * FROM maid WHERE maid_id IN (%s)', (3,))
+
+    def test_get_customer_not_found(self):
+        """Test GET /customers/<id> for a missing row"""
+        self.cursor.fetchone.return_value = None
+
+        self.assertEqual(self.get_json(f'/customers/9?token={self.token}'),
+                         (404, {'error': 'Customer not found'}))
+
+    def test_get_customer_etag_304(self):
+        """Test both modes tag a row the same way and honour If-None-Match"""
+        self.cursor.fetchone.return_value = {'customer_id': 1, 'name': 'Aying'}
+
+        _, _, headers = self.call('GET', f'/customers/1?token={self.token}')
+        status, body, _ = self.call('GET', f'/customers/1?token={self.token}',
+                                    headers={'If-None-Match': headers['ETag']})
+
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+
+    def test_order_stats_unknown_group(self):
+        """Test GET /orders/stats rejects unknown group_by values"""
+        status, data = self.get_json(f'/orders/stats?token={self.token}&group_by=year')
+
+        self.assertEqual(status, 400)
+        self.assertEqual(data['error'], 'Unknown group_by value(s): year')
+
+    # ========== WRITES ==========
+
+    def test_create_customer(self):
+        """Test POST /customers inserts, commits and returns the new row"""
+        self.cursor.lastrowid = 3
+        self.cursor.fetchone.return_value = {'customer_id': 3, 'name': 'New'}
+
+        status, body, headers = self.call('POST', f'/customers?token={self.token}',
+                                          json={'name': 'New'})
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {'customer_id': 3, 'name': 'New'})
+        self.assertNotIn('ETag', headers)
+        self.cursor.execute.assert_any_call(
+            'INSERT INTO customer (name, email, phone_number) VALUES (%s, %s, %s)',
+            ('New', '', '')
+        )
+        self.connection.commit.assert_called()
+
+    def test_update_customer_no_changes(self):
+        """Test PUT /customers/<id> that changes nothing"""
+        self.cursor.rowcount = 0
+        self.cursor.fetchone.return_value = {'customer_id': 1, 'name': 'Aying'}
+
+        status, body, _ = self.call('PUT', f'/customers/1?token={self.token}',
+                                    json={'name': 'Aying'})
+
+        self.assertEqual((status, json.loads(body)), (400, {'error': 'No changes made'}))
+
+    def test_update_order_unknown_customer(self):
+        """Test PUT /orders/<id> maps the foreign key error to a 404"""
+        self.cursor.execute.side_effect = self.integrity_error(
+            1452, 'Cannot add or update a child row: FOREIGN KEY (`customer_id`)'
+        )
+
+        status, body, _ = self.call('PUT', f'/orders/1?token={self.token}',
+                                    json={'customer_id': 99})
+
+        self.assertEqual((status, json.loads(body)), (404, {'error': 'Customer not found'}))
+        self.connection.rollback.assert_called()
+
+    def test_update_order_null_reference(self):
+        """Test PUT /orders/<id> with a null customer_id/maid_id is a 404 and writes nothing"""
+        customer, customer_body, _ = self.call('PUT', f'/orders/1?token={self.token}',
+                                               json={'customer_id': None, 'total_amount': 5})
+        maid, maid_body, _ = self.call('PUT', f'/orders/1?token={self.token}', json={'maid_id': None})
+
+        self.assertEqual((customer, json.loads(customer_body)), (404, {'error': 'Customer not found'}))
+        self.assertEqual((maid, json.loads(maid_body)), (404, {'error': 'Maid not found'}))
+        self.cursor.execute.assert_not_called()
+
+    def test_delete_maid_with_orders(self):
+        """Test DELETE /maids/<id> refused by the orders foreign key"""
+        self.cursor.execute.side_effect = self.integrity_error(1451, 'foreign key constraint fails')
+
+        status, body, _ = self.call('DELETE', f'/maids/1?token={self.token}')
+
+        self.assertEqual(status, 400)
+        self.assertEqual(json.loads(body),
+                         {'error': 'Cannot delete maid with existing orders. Delete orders first.'})
+
+    def test_delete_order(self):
+        """Test DELETE /orders/<id> success body"""
+        self.cursor.rowcount = 1
+
+        status, body, _ = self.call('DELETE', f'/orders/5?token={self.token}')
+
+        self.assertEqual((status, json.loads(body)),
+                         (200, {'message': 'Order deleted successfully', 'order_id': 5}))
+
+    def test_delete_order_counts_the_delete(self):
+        """Test the 404 decision uses the DELETE's rowcount, not the daily_sales upsert's"""
+        self.enable_sales_summary()
+        self.cursor.fetchone.return_value = {'order_id': 5, 'customer_id': 3, 'maid_id': 1,
+                                             'order_date': datetime(2024, 1, 5, 9), 'total_amount': Decimal('7.50')}
+
+        def execute(statement, params=None):
+            self.cursor.rowcount = 0 if statement.startswith('DELETE') else 2
+        self.cursor.execute.side_effect = execute
+
+        status, body, _ = self.call('DELETE', f'/orders/5?token={self.token}')
+
+        self.assertEqual((status, json.loads(body)), (404, {'error': 'Order not found'}))
+
+    def test_create_orders_batch(self):
+        """Test POST /orders/batch checks references once and inserts in one statement"""
+        self.cursor.fetchall.side_effect = [[{'customer_id': 1}], [{'maid_id': 2}]]
+        self.cursor.lastrowid = 100
+
+        rows = [{'customer_id': 1, 'maid_id': 2}, {'customer_id': 7, 'maid_id': 2}]
+        status, body, _ = self.call('POST', f'/orders/batch?token={self.token}', json=rows)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {
+            'created': [{'index': 0, 'order_id': 100}],
+            'errors': [{'index': 1, 'error': 'Customer not found'}],
+            'count': 1
+        })
+        self.assertEqual(self.cursor.execute.call_count, 3)
+
+    def enable_table_versions(self):
+        for config in (app.config, asgi_app.config):
+            config['ETAG_TABLE_VERSIONS'] = True
+            self.addCleanup(config.__setitem__, 'ETAG_TABLE_VERSIONS', False)
+
+    def version_bumps(self):
+        return [c.args[1] for c in self.cursor.execute.call_args_list
+                if c.args[0].startswith('UPDATE table_version')]
+
+    def test_batch_bumps_table_version_once(self):
+        """Test a batch insert bumps the table's version marker once, not once per row"""
+        self.enable_table_versions()
+        self.cursor.lastrowid = 20
+
+        status, _, _ = self.call('POST', f'/customers/batch?token={self.token}',
+                                 json=[{'name': 'A'}, {'name': 'B'}, {'name': 'C'}])
+
+        self.assertEqual(status, 200)
+        self.assertEqual(self.version_bumps(), [('customer',)])
+
+    def test_missing_row_keeps_table_version(self):
+        """Test updates and deletes that touch no row leave the version marker alone"""
+        self.enable_table_versions()
+        self.cursor.rowcount = 0
+        self.cursor.fetchone.return_value = None
+
+        deleted, _, _ = self.call('DELETE', f'/maids/9?token={self.token}')
+        updated, _, _ = self.call('PUT', f'/customers/9?token={self.token}', json={'name': 'X'})
+
+        self.assertEqual((deleted, updated), (404, 404))
+        self.assertEqual(self.version_bumps(), [])
+
+    def enable_sales_summary(self):
+        for config in (app.config, asgi_app.config):
+            config['SALES_SUMMARY'] = True
+            self.addCleanup(config.__setitem__, 'SALES_SUMMARY', False)
+
+    def test_update_order_moves_daily_sales(self):
+        """Test PUT /orders/<id> moves the order's totals to its new maid in the same transaction"""
+        self.enable_sales_summary()
+        order = {'order_id': 5, 'customer_id': 1, 'maid_id': 1,
+                 'order_date': datetime(2024, 1, 5, 9, 30), 'total_amount': Decimal('10.00')}
+        self.cursor.fetchone.side_effect = [order, dict(order, maid_id=2, total_amount=Decimal('12.50'))]
+
+        status, body, _ = self.call('PUT', f'/orders/5?token={self.token}',
+                                    json={'maid_id': 2, 'total_amount': 12.5})
+
+        self.assertEqual(status, 200)
+        statements = [c.args[0] for c in self.cursor.execute.call_args_list]
+        self.assertTrue(statements[0].endswith('FOR UPDATE'))
+        self.assertTrue(statements[3].startswith('INSERT INTO daily_sales'))
+        self.assertEqual(self.cursor.execute.call_args_list[3].args[1], (
+            date(2024, 1, 5), 1, 1, -1, Decimal('-10.00'),
+            date(2024, 1, 5), 2, 1, 1, Decimal('12.50'),
+        ))
+        self.connection.commit.assert_called_once()
+
+    def test_daily_sales_from_summary(self):
+        """Test GET /orders/daily-sales reads the summary table when it is maintained"""
+        self.enable_sales_summary()
+        self.cursor.fetchall.return_value = [
+            {'day': date(2024, 1, 5), 'maid_id': 2, 'order_count': 3, 'total_amount': Decimal('40.00')}
+        ]
+
+        status, data = self.get_json(
+            f'/orders/daily-sales?token={self.token}&group_by=day,maid_id&start_date=2024-01-01&maid_id=2'
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data['stats'][0]['day'], '2024-01-05')
+        query, params = self.cursor.execute.call_args.args
+        self.assertIn('FROM daily_sales WHERE 1=1 AND maid_id = %s AND day >= %s', query)
+        self.assertTrue(query.endswith('GROUP BY day, maid_id HAVING order_count > 0 ORDER BY day, maid_id'))
+        self.assertEqual(params, (2, date(2024, 1, 1)))
+
+    def test_create_batch_per_row_ids(self):
+        """Test batch IDs come from one INSERT per row when the server interleaves auto-increments"""
+        autoinc_settings.update(lock_mode=2, increment=1)
+        type(self.cursor).lastrowid = PropertyMock(side_effect=[5, 9])
+
+        status, body, _ = self.call('POST', f'/maids/batch?token={self.token}',
+                                    json=[{'name': 'Lucy'}, {'name': 'Mina'}])
+
+        self.assertEqual(status, 200)
+        self.assertEqual([c['maid_id'] for c in json.loads(body)['created']], [5, 9])
+        self.assertEqual(self.cursor.execute.call_count, 2)
+
+    def test_batch_not_a_list(self):
+        """Test POST /maids/batch with an object instead of an array"""
+        status, body, _ = self.call('POST', f'/maids/batch?token={self.token}', json={'name': 'Lucy'})
+
+        self.assertEqual((status, json.loads(body)), (400, {'error': 'Expected a JSON array of objects'}))
+
+    # ========== POOL & HEALTH ==========
+
+    def test_pool_exhausted_returns_503(self):
+        """Test a request that cannot get a connection is answered with 503"""
+        self.exhaust_pool()
+
+        self.assertEqual(self.get_json(f'/orders?token={self.token}'),
+                         (503, {'error': 'Database is busy, please retry'}))
+
+    def test_health_and_info(self):
+        """Test /health and /api-info answer without touching a request connection"""
+        status, data = self.get_json('/health')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(data['database'], 'connected')
+        self.assertEqual(self.get_json('/api-info')[1]['name'], 'Maid Cafe REST API')
+        self.connection.cursor.assert_not_called()
+
+
+    def test_metrics_and_server_timing(self):
+        """Test both modes add Server-Timing and count the route in /metrics"""
+        self.cursor.fetchone.return_value = {'order_id': 1}
+
+        _, _, headers = self.call('GET', f'/orders/1?token={self.token}')
+        status, body, _ = self.call('GET', '/metrics')
+
+        self.assertIn('total;dur=', headers['Server-Timing'])
+        self.assertEqual(status, 200)
+        self.assertIn(b'route="/orders/<int:order_id>"', body)
+
+    # ========== EXPORTS ==========
+
+    def test_export_lifecycle(self):
+        """Test both modes queue, report and serve export jobs the same way"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.cursor.description = [('order_id',), ('total_amount',)]
+        self.cursor.fetchmany.side_effect = [[{'order_id': 1, 'total_amount': 10}], []]
+        jobs = ExportManager(directory, lambda: self.connection)
+
+        with patch('app.export_jobs', jobs), patch('asgi_app.export_jobs', jobs):
+            status, body, headers = self.call('POST', f'/exports?token={self.token}',
+                                              json={'min_amount': 5})
+            jobs.shutdown()
+            _, job = self.get_json(headers['Location'] + f'?token={self.token}')
+            _, csv_body, csv_headers = self.call('GET', f"{job['download']}?token={self.token}")
+
+        self.assertEqual((status, json.loads(body)['status']), (202, 'queued'))
+        self.assertEqual((job['status'], job['rows']), ('done', 1))
+        self.assertNotIn('owner', job)
+        self.assertEqual(csv_body.decode().splitlines(), ['order_id,total_amount', '1,10'])
+        self.assertTrue(csv_headers['Content-Type'].startswith('text/csv'))
+        self.cursor.execute.assert_called_with(
+            'SELECT * FROM orders WHERE 1=1 AND total_amount >= %s ORDER BY order_id', (5.0,)
+        )
+
+    def test_export_rejects_unusable_values(self):
+        """Test non-string fields and non-scalar filters are 400s, not 500s"""
+        bad_fields, fields_body, _ = self.call('POST', f'/exports?token={self.token}', json={'fields': ['order_id']})
+        bad_filter, filter_body, _ = self.call('POST', f'/exports?token={self.token}', json={'min_amount': [5]})
+
+        self.assertEqual((bad_fields, json.loads(fields_body)),
+                         (400, {'error': 'fields must be a comma-separated string'}))
+        self.assertEqual((bad_filter, json.loads(filter_body)),
+                         (400, {'error': 'Expected a string or number for: min_amount'}))
+
+    # ========== IMPORTS ==========
+
+    def test_import_csv(self):
+        """Test POST /imports/<name> loads a CSV body or upload and reports rejects the same way"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.addCleanup(app.config.__setitem__, 'IMPORT_REJECTS_DIR', app.config['IMPORT_REJECTS_DIR'])
+        app.config['IMPORT_REJECTS_DIR'] = directory
+        connection = self.mysql_open_connection()
+        text = 'name,email\nAying,a@cafe.com\n,nameless@cafe.com\n'
+
+        results = [self.post_csv(f'/imports/customers?token={self.token}', text, multipart)
+                   for multipart in (False, True)]
+        unknown, _, _ = self.post_csv(f'/imports/maids?token={self.token}', text)
+
+        for status, body, _ in results:
+            summary = json.loads(body)
+            self.assertEqual((status, summary['table'], summary['inserted'], summary['rejected']),
+                             (200, 'customer', 1, 1))
+            self.assertEqual(os.path.dirname(summary['rejects_file']), directory)
+        self.assertEqual(unknown, 404)
+        connection.cursor.return_value.execute.assert_called_with(
+            'INSERT INTO customer (name, email, phone_number) VALUES (%s, %s, %s)', ('Aying', 'a@cafe.com', '')
+        )
+        self.assertEqual(connection.close.call_count, 2)
+
+    def test_import_large_upload(self):
+        """Test /imports takes bodies over Quart's 16MB MAX_CONTENT_LENGTH and stops at IMPORT_MAX_BYTES"""
+        received = []
+
+        def run_import(name, stream, rejects_path):
+            received.append(len(stream.read()))
+            return {'table': 'customer', 'inserted': 0, 'rejected': 0, 'rejects_file': None}
+
+        text = 'name,email\n' + 'Aying,a@cafe.com\n' * (17 * 2 ** 20 // 17)
+        path = f'/imports/customers?token={self.token}'
+        with patch('app.run_import', run_import), patch('asgi_app.run_import', run_import):
+            statuses = [self.post_csv(path, text, multipart)[0] for multipart in (False, True)]
+            with patch.dict(app.config, IMPORT_MAX_BYTES=1024), \
+                    patch.dict(asgi_app.config, IMPORT_MAX_BYTES=1024):
+                too_large = [self.post_csv(path, text, multipart)[0] for multipart in (False, True)]
+
+        self.assertGreater(len(text), 16 * 2 ** 20)
+        self.assertEqual((statuses, received), ([200, 200], [len(text)] * 2))
+        self.assertEqual(too_large, [413, 413])
+
+    # ========== COMPRESSION ==========
+
+    def test_gzip_buffered_and_streamed(self):
+        """Test Accept-Encoding: gzip compresses large lists and NDJSON streams alike"""
+        rows = [{'order_id': i, 'total_amount': 10} for i in range(100)]
+        self.cursor.fetchall.return_value = rows
+        self.cursor.fetchmany.side_effect = [rows, []]
+        gzip_only = {'Accept-Encoding': 'gzip'}
+
+        status, body, headers = self.call('GET', f'/orders?token={self.token}', headers=gzip_only)
+        _, streamed, stream_headers = self.call('GET', f'/orders?token={self.token}&format=ndjson',
+                                                headers=gzip_only)
+
+        self.assertEqual((status, headers['Content-Encoding']), (200, 'gzip'))
+        self.assertIn('Accept-Encoding', headers['Vary'])
+        self.assertTrue(headers['ETag'].startswith('W/'))
+        self.assertEqual(json.loads(gzip.decompress(body))['count'], 100)
+        self.assertEqual(stream_headers['Content-Encoding'], 'gzip')
+        self.assertEqual(len(gzip.decompress(streamed).splitlines()), 101)
+
+
+    def test_not_modified_keeps_compressed_validators(self):
+        """Test the 304 for a compressed list repeats its weak ETag and Vary: Accept-Encoding"""
+        self.cursor.fetchall.return_value = [{'order_id': i, 'total_amount': 10} for i in range(100)]
+        gzip_only = {'Accept-Encoding': 'gzip'}
+
+        _, _, headers = self.call('GET', f'/orders?token={self.token}', headers=gzip_only)
+        status, body, not_modified = self.call('GET', f'/orders?token={self.token}',
+                                               headers=dict(gzip_only, **{'If-None-Match': headers['ETag']}))
+
+        self.assertEqual((status, body), (304, b''))
+        self.assertTrue(headers['ETag'].startswith('W/'))
+        self.assertEqual(not_modified['ETag'], headers['ETag'])
+        self.assertIn('Accept-Encoding', not_modified['Vary'])
+
+
+class TestWSGIApp(ParityChecks, unittest.TestCase):
+    """ParityChecks against the Flask app in app.py"""
+
+    integrity_error = MySQLdbIntegrityError
+
+    def patch_database(self):
+        patcher = patch('app.mysql')
+        self.mysql = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mysql.connection = self.connection
+        self.mysql.pool_status.return_value = {'healthy': True, 'size': 2, 'idle': 2, 'in_use': 0}
+        self.client = app.test_client()
+
+    def exhaust_pool(self):
+        type(self.mysql).connection = PropertyMock(side_effect=PoolExhausted('busy'))
+
+    def call(self, method, path, json=None, headers=None):
+        response = self.client.open(path, method=method, json=json, headers=headers)
+        return response.status_code, response.data, response.headers
+
+    def mysql_open_connection(self):
+        return self.mysql.open_connection.return_value
+
+    def post_csv(self, path, text, multipart=False):
+        if multipart:
+            response = self.client.post(path, data={'file': (io.BytesIO(text.encode()), 'data.csv')})
+        else:
+            response = self.client.post(path, data=text, content_type='text/csv')
+        return response.status_code, response.data, response.headers
+
+
+class TestASGIApp(ParityChecks, unittest.TestCase):
+    """ParityChecks against the Quart app in asgi_app.py"""
+
+    integrity_error = PyMySQLIntegrityError
+
+    def patch_database(self):
+        self.pool = FakeAsyncPool(self.connection)
+        patcher = patch('asgi_app.db', self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = asgi_app.test_client()
+
+    def exhaust_pool(self):
+        self.pool.connection_mock = PoolExhausted('busy')
+
+    def call(self, method, path, json=None, headers=None):
+        async def request():
+            response = await self.client.open(path, method=method, json=json, headers=headers)
+            return response.status_code, await response.get_data(), response.headers
+        return asyncio.run(request())
+
+    def mysql_open_connection(self):
+        # run_import opens its connection through app.py's pool in both modes
+        patcher = patch('app.mysql')
+        mysql = patcher.start()
+        self.addCleanup(patcher.stop)
+        return mysql.open_connection.return_value
+
+    def post_csv(self, path, text, multipart=False):
+        async def request():
+            if multipart:
+                upload = FileStorage(io.BytesIO(text.encode()), filename='data.csv')
+                response = await self.client.post(path, files={'file': upload})
+            else:
+                response = await self.client.post(path, data=text, headers={'Content-Type': 'text/csv'})
+            return response.status_code, await response.get_data(), response.headers
+        return asyncio.run(request())
+
+    def test_import_body_limits(self):
+        """Test only /imports requests swap Quart's body limits for IMPORT_MAX_BYTES/IMPORT_BODY_TIMEOUT"""
+        async def limits(path):
+            async with asgi_app.test_request_context(path, method='POST'):
+                return request.max_content_length, request.body_timeout
+
+        with patch.dict(asgi_app.config, IMPORT_MAX_BYTES=2 ** 30, IMPORT_BODY_TIMEOUT=600):
+            self.assertEqual(asyncio.run(limits('/imports/customers')), (2 ** 30, 600))
+            self.assertEqual(asyncio.run(limits('/customers'))[0], asgi_app.config['MAX_CONTENT_LENGTH'])
+
+
+if __name__ == '__main__':
+    unittest.main()
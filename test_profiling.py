@@ -0,0 +1,88 @@
+"""
+Unit tests for the opt-in profiling mode
+Run with: python -m pytest test_profiling.py -v
+"""
+
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import profiling
+from metrics import RequestTiming, TimedCursor
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.config = dict(profiling.DEFAULTS, PROFILE_ENABLED=True)
+        self.log = MagicMock()
+
+    def run_request(self, queries):
+        """Execute queries through a TimedCursor inside a profiled request"""
+        timing = RequestTiming()
+        profiling.begin(self.config, timing)
+        raw = MagicMock()
+        raw.rowcount = 1
+        cur = TimedCursor(raw, timing)
+        for query in queries:
+            cur.execute(query, (1,))
+        return timing
+
+    def test_statements_logged_with_rowcount(self):
+        """Test every statement is logged with duration and row count"""
+        timing = self.run_request(["SELECT *\n  FROM orders WHERE order_id = %s"])
+
+        warnings = profiling.finish(self.config, self.log, 'GET', '/orders/1',
+                                    '/orders/<int:order_id>', timing, 0.002)
+
+        self.assertEqual(warnings, [])
+        message, _, rows, query = self.log.info.call_args[0]
+        self.assertEqual((rows, query), (1, 'SELECT * FROM orders WHERE order_id = %s'))
+        self.log.warning.assert_not_called()
+
+    def test_repeated_statement_flagged_as_n_plus_one(self):
+        """Test the same statement run PROFILE_REPEAT_THRESHOLD times is flagged"""
+        timing = self.run_request(["SELECT * FROM maid WHERE maid_id = %s"] * 3)
+
+        warnings = profiling.finish(self.config, self.log, 'GET', '/orders', '/orders', timing, 0.01)
+
+        self.assertEqual(warnings, ['possible N+1: 3x SELECT * FROM maid WHERE maid_id = %s'])
+        self.log.warning.assert_called_once()
+
+    def test_query_count_and_db_time_limits(self):
+        """Test requests over the query-count or DB-time limits are flagged"""
+        self.config.update(PROFILE_MAX_QUERIES=1, PROFILE_MAX_DB_SECONDS=0.05)
+        timing = self.run_request(["SELECT 1", "SELECT 2"])
+        timing.db_seconds = 0.2
+
+        warnings = profiling.finish(self.config, self.log, 'PUT', '/orders/1',
+                                    '/orders/<int:order_id>', timing, 0.25)
+
+        self.assertEqual(warnings, ['2 queries (limit 1)', '200.0ms in the database (limit 50ms)'])
+
+    def test_sampled_request_dumps_profile(self):
+        """Test a sampled request writes a loadable cProfile file"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.config.update(PROFILE_SAMPLE_RATE=0.5, PROFILE_DIR=directory)
+        timing = RequestTiming()
+
+        profiler = profiling.begin(self.config, timing, sample=lambda: 0.1)
+        sum(range(1000))
+        profiling.finish(self.config, self.log, 'GET', '/maids', '/maids', timing, 0.01, profiler)
+
+        files = os.listdir(directory)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].endswith('-GET_maids.prof'))
+        pstats.Stats(os.path.join(directory, files[0]))
+
+    def test_unsampled_request_has_no_profiler(self):
+        """Test requests outside the sample rate are not profiled"""
+        self.config['PROFILE_SAMPLE_RATE'] = 0.1
+
+        self.assertIsNone(profiling.begin(self.config, RequestTiming(), sample=lambda: 0.5))
+
+if __name__ == '__main__':
+    unittest.main()
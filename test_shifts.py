@@ -0,0 +1,98 @@
+"""
+Unit tests for the maid shift interval index
+Run with: python -m pytest test_shifts.py -v
+"""
+
+import unittest
+from datetime import time, timedelta
+
+from shifts import ShiftIndex, format_seconds, seconds_of_day, spans
+
+
+def hours(value):
+    return int(value * 3600)
+
+
+MAIDS = [
+    {'maid_id': 1, 'name': 'Aki', 'shift_start_time': timedelta(hours=9), 'shift_end_time': timedelta(hours=17)},
+    {'maid_id': 2, 'name': 'Mei', 'shift_start_time': timedelta(hours=22), 'shift_end_time': timedelta(hours=6)},
+    {'maid_id': 3, 'name': 'Rin', 'shift_start_time': timedelta(hours=16), 'shift_end_time': timedelta(hours=23)},
+    {'maid_id': 4, 'name': 'Yui', 'shift_start_time': None, 'shift_end_time': timedelta(hours=12)},
+]
+
+
+class TestShiftHelpers(unittest.TestCase):
+
+    def test_seconds_of_day(self):
+        """Test TIME values, times and strings all become seconds after midnight"""
+        self.assertEqual(seconds_of_day(timedelta(hours=25, minutes=30)), hours(1.5))
+        self.assertEqual(seconds_of_day(time(14, 30)), hours(14.5))
+        self.assertEqual(seconds_of_day('06:15:30'), hours(6.25) + 30)
+        self.assertIsNone(seconds_of_day(None))
+        with self.assertRaises(ValueError):
+            seconds_of_day('25:00:00')
+        self.assertEqual(format_seconds(hours(6.25) + 30), '06:15:30')
+
+    def test_spans(self):
+        """Test shifts crossing midnight split in two and equal ends mean all day"""
+        self.assertEqual(spans(hours(9), hours(17)), [(hours(9), hours(17))])
+        self.assertEqual(spans(hours(22), hours(6)), [(hours(22), hours(24)), (0, hours(6))])
+        self.assertEqual(spans(hours(22), 0), [(hours(22), hours(24))])
+        self.assertEqual(spans(hours(8), hours(8)), [(0, hours(24))])
+
+
+class TestShiftIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.index = ShiftIndex(ttl=30.0, clock=lambda: self.now)
+        self.index.load(MAIDS)
+
+    def ids(self, maids):
+        return [maid['maid_id'] for maid in maids]
+
+    def test_at(self):
+        """Test point lookups, including shift edges and the overnight shift"""
+        self.assertEqual(self.ids(self.index.at(hours(3))), [2])
+        self.assertEqual(self.ids(self.index.at(hours(9))), [1])
+        self.assertEqual(self.ids(self.index.at(hours(16.5))), [1, 3])
+        self.assertEqual(self.ids(self.index.at(hours(17))), [3])
+        self.assertEqual(self.ids(self.index.at(hours(22.5))), [2, 3])
+        self.assertEqual(self.ids(self.index.at(hours(6))), [])
+
+    def test_overlapping(self):
+        """Test range lookups, including ranges that wrap past midnight"""
+        self.assertEqual(self.ids(self.index.overlapping(hours(5), hours(10))), [1, 2])
+        self.assertEqual(self.ids(self.index.overlapping(hours(23.5), hours(1))), [2])
+        self.assertEqual(self.ids(self.index.overlapping(hours(17), hours(22))), [3])
+        self.assertEqual(self.ids(self.index.overlapping(hours(6), hours(9))), [])
+        self.assertEqual(self.ids(self.index.overlapping(hours(12), hours(12))), [1])
+
+    def test_rows_are_returned(self):
+        """Test lookups answer with the indexed rows, not just ids"""
+        self.assertEqual(self.index.at(hours(2)), [MAIDS[1]])
+
+    def test_staleness(self):
+        """Test the index goes stale after its TTL or an invalidation"""
+        self.assertFalse(self.index.stale())
+        self.now = 30.0
+        self.assertTrue(self.index.stale())
+
+        self.index.load(MAIDS)
+        self.index.invalidate()
+        self.assertTrue(self.index.stale())
+
+    def test_reload_overlapping_a_write_stays_stale(self):
+        """Test rows read before an invalidation are served but not trusted"""
+        generation = self.index.generation
+        self.index.invalidate()
+        self.index.load(MAIDS[:1], generation)
+
+        self.assertTrue(self.index.stale())
+        self.assertEqual(self.ids(self.index.at(hours(10))), [1])
+        self.index.load(MAIDS, self.index.generation)
+        self.assertFalse(self.index.stale())
+
+
+if __name__ == '__main__':
+    unittest.main()
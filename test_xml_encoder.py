@@ -0,0 +1,54 @@
+"""
+Unit tests for the XML encoder
+Run with: python -m pytest test_xml_encoder.py -v
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+import xml_encoder
+
+
+class TestXMLEncoder(unittest.TestCase):
+    
+    def test_collection_shape(self):
+        """Test lists become <item> elements under the key, like dicttoxml"""
+        xml = xml_encoder.to_xml({'customers': [{'customer_id': 1, 'name': 'Aying'}], 'count': 1})
+        self.assertEqual(
+            xml,
+            b'<?xml version="1.0" encoding="UTF-8" ?><response><customers><item>'
+            b'<customer_id>1</customer_id><name>Aying</name></item></customers>'
+            b'<count>1</count></response>'
+        )
+    
+    def test_row_types(self):
+        """Test DictCursor value types are encoded natively"""
+        xml = xml_encoder.to_xml({
+            'total_amount': Decimal('25.50'),
+            'order_date': datetime(2023, 10, 1, 10, 30),
+            'shift_start_time': timedelta(hours=9),
+            'email': None,
+            'active': True
+        })
+        self.assertIn(b'<total_amount>25.50</total_amount>', xml)
+        self.assertIn(b'<order_date>2023-10-01T10:30:00</order_date>', xml)
+        self.assertIn(b'<shift_start_time>9:00:00</shift_start_time>', xml)
+        self.assertIn(b'<email></email>', xml)
+        self.assertIn(b'<active>true</active>', xml)
+    
+    def test_escaping_and_key_names(self):
+        """Test special characters are escaped and invalid tag names are wrapped"""
+        xml = xml_encoder.to_xml({'name': 'Tom & <Jerry>', 'bad key': 1, '1st': 2})
+        self.assertIn(b'<name>Tom &amp; &lt;Jerry&gt;</name>', xml)
+        self.assertIn(b'<bad_key>1</bad_key>', xml)
+        self.assertIn(b'<key name="1st">2</key>', xml)
+    
+    def test_collection_iterator_counts_rows(self):
+        """Test iter_xml_collection writes the count after consuming the rows"""
+        rows = iter([{'order_id': 1}, {'order_id': 2}])
+        xml = ''.join(xml_encoder.iter_xml_collection('orders', rows))
+        self.assertTrue(xml.endswith('</orders><count>2</count></response>'))
+        self.assertEqual(xml.count('<item>'), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Incremental XML encoder for API responses
+Produces the same <response>/<customers>/<item> shape as
+dicttoxml.dicttoxml(data, custom_root='response', attr_type=False, root=True)
+but builds one row at a time and understands the types DictCursor returns
+(Decimal, datetime, date, timedelta).
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" ?>'
+
+_VALID_TAG = re.compile(r'^[A-Za-z_][A-Za-z0-9_.\-]*$')
+_ESCAPE_CHARS = ('&', '<', '>', '"', "'")
+
+# key -> (open tag, close tag); keys repeat on every row so this stays tiny
+_tag_cache = {}
+
+
+def escape(text):
+    """Escape the five XML special characters, skipping the work when none are present"""
+    for ch in _ESCAPE_CHARS:
+        if ch in text:
+            break
+    else:
+        return text
+    return (text.replace('&', '&amp;')
+                .replace('<', '&lt;')
+                .replace('>', '&gt;')
+                .replace('"', '&quot;')
+                .replace("'", '&apos;'))
+
+
+def _tags(key):
+    """Return the (open, close) tags for a dict key, matching dicttoxml's naming rules"""
+    tags = _tag_cache.get(key)
+    if tags is None:
+        name = str(key).replace(' ', '_')
+        if _VALID_TAG.match(name):
+            tags = ('<%s>' % name, '</%s>' % name)
+        else:
+            tags = ('<key name="%s">' % escape(name), '</key>')
+        _tag_cache[key] = tags
+    return tags
+
+
+def _scalar(value):
+    """Convert a scalar value to escaped element text"""
+    kind = type(value)
+    if kind is str:
+        return escape(value)
+    if kind is int or kind is float or kind is Decimal:
+        return str(value)
+    if kind is bool:
+        return 'true' if value else 'false'
+    if value is None:
+        return ''
+    if kind is datetime or kind is date:
+        return value.isoformat()
+    if kind is timedelta:
+        return str(value)
+    return escape(str(value))
+
+
+def _write(parts, value):
+    """Append the XML content of value (without its own tags) to parts"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            open_tag, close_tag = _tags(key)
+            parts.append(open_tag)
+            _write(parts, item)
+            parts.append(close_tag)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            parts.append('<item>')
+            _write(parts, item)
+            parts.append('</item>')
+    else:
+        parts.append(_scalar(value))
+
+
+def encode_item(row):
+    """Encode one list element as an <item> string"""
+    parts = ['<item>']
+    _write(parts, row)
+    parts.append('</item>')
+    return ''.join(parts)
+
+
+def iter_xml(data, root='response'):
+    """
+    Yield the document for data in chunks
+    Top-level lists (or any iterable of rows) are yielded one <item> at a time
+    """
+    yield XML_DECLARATION + '<%s>' % root
+    if isinstance(data, dict):
+        for key, value in data.items():
+            open_tag, close_tag = _tags(key)
+            if isinstance(value, (dict, str)) or not hasattr(value, '__iter__'):
+                parts = [open_tag]
+                _write(parts, value)
+                parts.append(close_tag)
+                yield ''.join(parts)
+            else:
+                yield open_tag
+                for row in value:
+                    yield encode_item(row)
+                yield close_tag
+    else:
+        parts = []
+        _write(parts, data)
+        yield ''.join(parts)
+    yield '</%s>' % root
+
+
+def iter_xml_collection(name, rows, root='response'):
+    """
+    Yield {name: rows, 'count': N} as XML when rows is a one-shot iterator
+    The count is only known at the end, so it is written after the rows
+    """
+    open_tag, close_tag = _tags(name)
+    yield XML_DECLARATION + '<%s>' % root + open_tag
+    count = 0
+    for row in rows:
+        yield encode_item(row)
+        count += 1
+    yield close_tag + '<count>%d</count></%s>' % (count, root)
+
+
+async def aiter_xml_collection(name, rows, root='response'):
+    """iter_xml_collection for an async iterator of rows"""
+    open_tag, close_tag = _tags(name)
+    yield XML_DECLARATION + '<%s>' % root + open_tag
+    count = 0
+    async for row in rows:
+        yield encode_item(row)
+        count += 1
+    yield close_tag + '<count>%d</count></%s>' % (count, root)
+
+
+def to_xml(data, root='response'):
+    """Encode data as a complete XML document (bytes)"""
+    return ''.join(iter_xml(data, root)).encode('utf-8')